@@ -116,32 +116,17 @@ class VoiceService: ObservableObject {
 
                     if typeStr == "CHIP",
                        let payloadValue = dict["payload"],
-                       case .object(let payload) = payloadValue,
-                       let labelValue = payload["label"],
-                       case .string(let label) = labelValue,
-                       let categoryValue = payload["category"],
-                       case .string(let categoryStr) = categoryValue {
-
-                        // Parse optional fields
-                        var emoji = ""
-                        if let emojiValue = payload["emoji"], case .string(let e) = emojiValue {
-                            emoji = e
+                       case .object(let payload) = payloadValue {
+                        addChip(fromValue: payload)
+                    } else if typeStr == "CHIPS",
+                              let payloadValue = dict["payload"],
+                              case .array(let payloads) = payloadValue {
+                        // Coalesced burst of chips from the agent
+                        for item in payloads {
+                            if case .object(let payload) = item {
+                                addChip(fromValue: payload)
+                            }
                         }
-
-                        var chipId: String? = nil
-                        if let idValue = payload["id"], case .string(let id) = idValue {
-                            chipId = id
-                        }
-
-                        var confidence = 1.0
-                        if let confValue = payload["confidence"], case .number(let conf) = confValue {
-                            confidence = conf
-                        }
-
-                        print("[VoiceService] Parsed chip: \(emoji) \(label) (\(categoryStr))")
-                        let category = parseCategory(categoryStr)
-                        let chip = IntelligenceChip(id: chipId, label: label, category: category, emoji: emoji, confidence: confidence)
-                        addChip(chip)
                     }
                 }
             }
@@ -151,23 +136,62 @@ class VoiceService: ObservableObject {
             if let dict = data as? [String: Any] {
                 print("[VoiceService] Data is [String: Any] with keys: \(dict.keys)")
                 if let type = dict["type"] as? String, type == "CHIP",
-                   let payload = dict["payload"] as? [String: Any],
-                   let label = payload["label"] as? String,
-                   let categoryStr = payload["category"] as? String {
-
-                    let emoji = payload["emoji"] as? String ?? ""
-                    let chipId = payload["id"] as? String
-                    let confidence = payload["confidence"] as? Double ?? 1.0
-
-                    print("[VoiceService] Parsed chip from dict: \(emoji) \(label) (\(categoryStr))")
-                    let category = parseCategory(categoryStr)
-                    let chip = IntelligenceChip(id: chipId, label: label, category: category, emoji: emoji, confidence: confidence)
-                    addChip(chip)
+                   let payload = dict["payload"] as? [String: Any] {
+                    addChip(fromDict: payload)
+                } else if let type = dict["type"] as? String, type == "CHIPS",
+                          let payloads = dict["payload"] as? [[String: Any]] {
+                    payloads.forEach { addChip(fromDict: $0) }
                 }
             }
         }
     }
 
+    private func addChip(fromValue payload: [String: Value]) {
+        guard let labelValue = payload["label"],
+              case .string(let label) = labelValue,
+              let categoryValue = payload["category"],
+              case .string(let categoryStr) = categoryValue else {
+            return
+        }
+
+        // Parse optional fields
+        var emoji = ""
+        if let emojiValue = payload["emoji"], case .string(let e) = emojiValue {
+            emoji = e
+        }
+
+        var chipId: String? = nil
+        if let idValue = payload["id"], case .string(let id) = idValue {
+            chipId = id
+        }
+
+        var confidence = 1.0
+        if let confValue = payload["confidence"], case .number(let conf) = confValue {
+            confidence = conf
+        }
+
+        print("[VoiceService] Parsed chip: \(emoji) \(label) (\(categoryStr))")
+        let category = parseCategory(categoryStr)
+        let chip = IntelligenceChip(id: chipId, label: label, category: category, emoji: emoji, confidence: confidence)
+        addChip(chip)
+    }
+
+    private func addChip(fromDict payload: [String: Any]) {
+        guard let label = payload["label"] as? String,
+              let categoryStr = payload["category"] as? String else {
+            return
+        }
+
+        let emoji = payload["emoji"] as? String ?? ""
+        let chipId = payload["id"] as? String
+        let confidence = payload["confidence"] as? Double ?? 1.0
+
+        print("[VoiceService] Parsed chip from dict: \(emoji) \(label) (\(categoryStr))")
+        let category = parseCategory(categoryStr)
+        let chip = IntelligenceChip(id: chipId, label: label, category: category, emoji: emoji, confidence: confidence)
+        addChip(chip)
+    }
+
     private func parseCategory(_ str: String) -> ChipCategory {
         // Handle both old uppercase format and new title case format
         let lowercased = str.lowercased()
@@ -0,0 +1,158 @@
+"""
+Structured Logging
+
+Non-blocking JSON logging for the agent server and bot processes.
+
+Log calls only enqueue a record; a background QueueListener thread does
+the formatting and file I/O, so the event loop driving real-time audio
+never blocks on a write.
+
+- One JSON object per line, tagged with the current session (user_id, room)
+- Session tags live in a contextvar, so concurrent sessions in one
+  process are tagged correctly
+- Conversation transcripts go to the "brea.transcript" logger and are
+  only recorded when LOG_TRANSCRIPTS is enabled
+- Size-based rotation (LOG_MAX_BYTES, LOG_BACKUP_COUNT)
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import contextvars
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional, Dict, Any
+
+
+ROOT_LOGGER = "brea"
+TRANSCRIPT_LOGGER = "brea.transcript"
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_TRANSCRIPTS = os.getenv("LOG_TRANSCRIPTS", "true").lower() == "true"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "3"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_session_tags: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar(
+    "brea_session_tags", default={}
+)
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["_NonBlockingQueueHandler"] = None
+
+
+def set_session(**tags: str):
+    """Tag all records logged from the current context (and tasks it spawns)"""
+    _session_tags.set({**_session_tags.get(), **tags})
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the "brea" namespace, e.g. get_logger("bot")"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def get_transcript_logger() -> logging.Logger:
+    return logging.getLogger(TRANSCRIPT_LOGGER)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        session = getattr(record, "session", None)
+        if session:
+            entry.update(session)
+        data = getattr(record, "data", None)
+        if data:
+            entry["data"] = data
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that tags records with the session and drops (and counts) on overflow"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now (args may be mutated later), format in the listener
+        record.msg = record.getMessage()
+        record.args = None
+        record.session = _session_tags.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(log_file: Optional[str] = None, level: Optional[str] = None):
+    """
+    Route the "brea" loggers through a background writer.
+
+    Args:
+        log_file: Rotating JSON log file; stdout if not given
+        level: Log level name (defaults to LOG_LEVEL)
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    if log_file:
+        handler: logging.Handler = RotatingFileHandler(
+            log_file,
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = _NonBlockingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, handler, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [_queue_handler]
+    root.setLevel(level or LOG_LEVEL)
+    root.propagate = False
+
+    # Transcripts are gated separately so they can be turned off in production
+    logging.getLogger(TRANSCRIPT_LOGGER).setLevel(
+        logging.INFO if LOG_TRANSCRIPTS else logging.CRITICAL + 1
+    )
+
+
+def shutdown_logging():
+    """Flush queued records and close the log file"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()  # drains the queue before returning
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger(ROOT_LOGGER).handlers[:] = []
+    _listener = None
+    _queue_handler = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,98 @@
+"""
+/connect Token Benchmark
+
+Measures /connect latency with REST-issued meeting tokens versus locally
+signed tokens. Daily is replaced by an in-process mock transport with a
+fixed simulated round-trip time, and the bot spawn is skipped, so the
+difference between the two modes is the POST /meeting-tokens round trip.
+
+Usage:
+    python benchmarks/bench_connect_tokens.py [--requests 200] [--rtt-ms 40] [--room-pool]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import itertools
+import statistics
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from daily_client import DailyClient  # noqa: E402
+from meeting_tokens import MeetingTokenSigner  # noqa: E402
+from room_pool import RoomPool  # noqa: E402
+
+
+def mock_daily_transport(rtt_ms: float) -> httpx.AsyncBaseTransport:
+    """Mock Daily API that answers every request after `rtt_ms`"""
+    counter = itertools.count()
+
+    class _Transport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            await asyncio.sleep(rtt_ms / 1000)
+            if request.url.path.endswith("/meeting-tokens"):
+                return httpx.Response(200, json={"token": "rest-token"})
+            if request.url.path.endswith("/rooms"):
+                n = next(counter)
+                return httpx.Response(
+                    200, json={"name": f"bench-{n}", "url": f"https://bench.daily.co/bench-{n}"}
+                )
+            return httpx.Response(200, json={})
+
+    return _Transport()
+
+
+async def run_mode(mode: str, requests: int, rtt_ms: float, use_room_pool: bool):
+    main.daily = DailyClient("bench-key", api_url="http://daily.mock/v1", transport=mock_daily_transport(rtt_ms))
+    main.token_signer = MeetingTokenSigner("bench-key", "bench-domain") if mode == "local" else None
+    main.bot_pool = None
+    main.spawn_bot = lambda room_url, user_id: None
+    main.room_pool = None
+    if use_room_pool:
+        main.room_pool = RoomPool(main.daily, size=requests, session_exp_seconds=60)
+        await main.room_pool.start()
+        while len(main.room_pool._rooms) < requests:
+            await asyncio.sleep(0.01)
+
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        await main.connect(user_id=f"user-{i}")
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    if main.room_pool:
+        main.room_pool._rooms.clear()
+        await main.room_pool.stop()
+    await main.daily.aclose()
+
+    latencies.sort()
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+async def run(args):
+    print(f"/connect x{args.requests}, simulated Daily RTT {args.rtt_ms} ms, room pool {'on' if args.room_pool else 'off'}")
+    results = {}
+    for mode in ("rest", "local"):
+        results[mode] = await run_mode(mode, args.requests, args.rtt_ms, args.room_pool)
+        r = results[mode]
+        print(f"  {mode:<5}  mean {r['mean']:7.2f} ms   p50 {r['p50']:7.2f} ms   p95 {r['p95']:7.2f} ms")
+
+    saved = results["rest"]["mean"] - results["local"]["mean"]
+    print(f"  local signing saves {saved:.2f} ms per /connect ({saved / results['rest']['mean']:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=40.0)
+    parser.add_argument("--room-pool", action="store_true", help="Claim rooms from a pre-filled pool")
+    asyncio.run(run(parser.parse_args()))
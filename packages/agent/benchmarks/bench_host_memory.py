@@ -0,0 +1,124 @@
+"""
+Bot Host Memory Benchmark
+
+Compares memory per session between one bot process per session
+(`python bot.py`) and many sessions in one bot host (`python bot_host.py`).
+
+Both run stub sessions (BOT_STUB) with metrics reporting and room cleanup
+disabled, so nothing external is needed. A stub session never builds its
+pipeline, so the numbers are the fixed cost of a session: interpreter,
+pipecat/Daily/Gemini imports and the session's own bookkeeping. Pipeline
+objects and audio buffers come on top in both modes alike.
+
+Memory is PSS summed over all processes (see load_connect.sample_tree).
+
+Usage:
+    python benchmarks/bench_host_memory.py [--sessions 1,5,10,20] [--settle-seconds 8] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_connect import AGENT_DIR, sample_tree  # noqa: E402
+
+
+def _env(log_dir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "BOT_STUB": "true",
+        "BOT_STUB_SESSION_SECONDS": "3600",
+        "AGENT_SERVER_URL": "",  # no metrics reports
+        "DAILY_API_KEY": "",  # no room deletion
+        "BOT_LOG_DIR": log_dir,
+    })
+    return env
+
+
+def _room(i: int) -> str:
+    return f"https://bench.daily.co/bench-{i}"
+
+
+def measure(mode: str, sessions: int, settle_seconds: float, log_dir: str) -> Dict[str, Any]:
+    env = _env(log_dir)
+    if mode == "process":
+        commands = [[sys.executable, "bot.py", _room(i), f"bench-{i}"] for i in range(sessions)]
+    else:
+        pairs = [arg for i in range(sessions) for arg in (_room(i), f"bench-{i}")]
+        commands = [[sys.executable, "bot_host.py", *pairs]]
+
+    processes = [
+        subprocess.Popen(command, cwd=AGENT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for command in commands
+    ]
+    try:
+        time.sleep(settle_seconds)
+        if any(process.poll() is not None for process in processes):
+            raise RuntimeError(f"{mode} mode: a bot exited during warm-up")
+        sample = sample_tree([process.pid for process in processes])
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return {
+        "sessions": sessions,
+        "processes": sample["processes"],
+        "memory_mb": round(sample["memory_bytes"] / 2**20, 1),
+        "per_session_mb": round(sample["memory_bytes"] / 2**20 / sessions, 2),
+    }
+
+
+def main(args) -> int:
+    counts = [int(n) for n in args.sessions.split(",")]
+    log_dir = tempfile.mkdtemp(prefix="brea-host-bench-")
+    results: Dict[str, List[Dict[str, Any]]] = {"process": [], "host": []}
+
+    print(f"{'sessions':>8}  {'process/session':>24}  {'bot host':>24}  {'saving':>7}")
+    for count in counts:
+        process = measure("process", count, args.settle_seconds, log_dir)
+        host = measure("host", count, args.settle_seconds, log_dir)
+        results["process"].append(process)
+        results["host"].append(host)
+        print(
+            f"{count:>8}  "
+            f"{process['memory_mb']:>8.1f}MB {process['per_session_mb']:>7.2f}MB/sess  "
+            f"{host['memory_mb']:>8.1f}MB {host['per_session_mb']:>7.2f}MB/sess  "
+            f"{1 - host['memory_mb'] / process['memory_mb']:>6.0%}"
+        )
+
+    if len(counts) > 1:
+        # Slope between the smallest and largest run: what one more session costs
+        for mode in ("process", "host"):
+            first, last = results[mode][0], results[mode][-1]
+            marginal = (last["memory_mb"] - first["memory_mb"]) / (last["sessions"] - first["sessions"])
+            results[f"{mode}_marginal_mb"] = round(marginal, 2)
+        print(
+            f"\nMarginal cost of a session: {results['process_marginal_mb']:.2f}MB as a process, "
+            f"{results['host_marginal_mb']:.2f}MB in a bot host"
+        )
+
+    print(f"Bot logs in {log_dir}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,5,10,20", help="Comma-separated session counts")
+    parser.add_argument("--settle-seconds", type=float, default=8.0, help="Wait for imports before sampling")
+    parser.add_argument("--json", help="Write results to this file")
+    sys.exit(main(parser.parse_args()))
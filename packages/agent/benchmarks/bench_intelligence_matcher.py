@@ -0,0 +1,107 @@
+"""
+Intelligence Matcher Benchmark
+
+Compares the compiled single-pass PatternMatcher used by
+IntelligenceExtractor against the previous nested-loop substring scan
+over the same pattern tables, on realistic user transcription frames.
+
+Usage:
+    python benchmarks/bench_intelligence_matcher.py [--iterations 2000]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intelligence import IntelligenceExtractor  # noqa: E402
+
+
+TRANSCRIPTS = [
+    "honestly i can't stand smokers, that's a hard no for me",
+    "um so i guess the biggest thing is i really don't like people who lie to me",
+    "family is super important to me, i'm really close to my parents and my sister",
+    "i work a lot, i'm pretty driven, i'd say my career matters but i also love to travel",
+    "i'm more of a homebody, like a quiet night in with a movie is perfect",
+    "my friends would say i have a pretty dry sense of humor, kind of sarcastic",
+    "i believe in being open and honest and i want someone who's ambitious",
+    "i go to the gym most mornings and try to eat well, an active lifestyle matters",
+    "yeah i don't know, i just want someone kind who makes me laugh",
+    "jealousy is a dealbreaker, if someone's controlling or possessive i'm out",
+    "i'm into meditation and mindfulness, trying to better myself every day",
+    "i love trying new things, spontaneous weekend trips, that kind of adventure",
+]
+
+
+def legacy_scan(text: str):
+    """The previous per-table nested loop with substring `in` checks"""
+    hits = []
+    for table_name, table in (
+        ("DEALBREAKER", IntelligenceExtractor.DEALBREAKER_PATTERNS),
+        ("VALUE", IntelligenceExtractor.VALUE_PATTERNS),
+    ):
+        for key, patterns in table.items():
+            for pattern in patterns:
+                if pattern in text:
+                    context = [
+                        f"can't stand {pattern}",
+                        f"hate {pattern}",
+                        f"no {pattern}",
+                        f"won't tolerate {pattern}",
+                        f"dealbreaker is {pattern}",
+                        f"can't do {pattern}",
+                        f"don't like {pattern}",
+                    ]
+                    if any(c in text for c in context) or pattern in text:
+                        hits.append((table_name, key))
+                    break
+    for table_name, table in (
+        ("ENERGY", IntelligenceExtractor.ENERGY_PATTERNS),
+        ("HUMOR", IntelligenceExtractor.HUMOR_PATTERNS),
+    ):
+        for key, patterns in table.items():
+            for pattern in patterns:
+                if pattern in text:
+                    hits.append((table_name, key))
+                    break
+    return hits
+
+
+def bench(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in TRANSCRIPTS:
+            fn(text)
+    return (time.perf_counter() - started) / (iterations * len(TRANSCRIPTS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    matcher = IntelligenceExtractor.MATCHER
+    legacy_us = bench(legacy_scan, args.iterations)
+    compiled_us = bench(matcher.scan, args.iterations)
+
+    print(f"{len(TRANSCRIPTS)} transcripts x {args.iterations} iterations")
+    print(f"  legacy nested loops   {legacy_us:8.2f} us/frame")
+    print(f"  compiled matcher      {compiled_us:8.2f} us/frame")
+    print(f"  speedup               {legacy_us / compiled_us:8.2f}x")
+
+    print("\nHit differences (legacy substring vs word-boundary matcher):")
+    for text in TRANSCRIPTS:
+        legacy = set(legacy_scan(text))
+        compiled = set(matcher.scan(text))
+        if legacy != compiled:
+            print(f"  {text!r}")
+            for hit in sorted(legacy - compiled):
+                print(f"    - {hit} (substring false hit)")
+            for hit in sorted(compiled - legacy):
+                print(f"    + {hit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Observer Stage Benchmark
+
+Compares per-frame overhead of the fused FrameObserver stage against the
+previous TranscriptionLogger -> ResponseLogger processor chain, on a
+synthetic conversation timeline dominated by output audio frames (as the
+post-LLM section of the bot pipeline is).
+
+Two measurements:
+
+- Stage work: each variant's process_frame() called directly for every
+  frame, with push_frame() stubbed out. This is exactly the code the
+  change replaced, timed over many passes, so it is stable run to run.
+- End to end: the stages inside pipecat's run_test pipeline, including the
+  real push between stages. Pipeline start-up, queueing and scheduling
+  are most of this figure and vary by more than the stages cost, so
+  treat its differences as noise unless they repeat.
+
+Usage:
+    python benchmarks/bench_observer.py [--turns 100] [--audio-per-text 5] [--repeats 3] [--passes 50]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import contextlib
+
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipecat.frames.frames import (  # noqa: E402
+    Frame,
+    TextFrame,
+    LLMTextFrame,
+    TranscriptionFrame,
+    InterimTranscriptionFrame,
+    LLMFullResponseStartFrame,
+    LLMFullResponseEndFrame,
+    TTSAudioRawFrame,
+)
+from pipecat.pipeline.pipeline import Pipeline  # noqa: E402
+from pipecat.processors.frame_processor import FrameProcessor, FrameDirection  # noqa: E402
+from pipecat.tests.utils import run_test  # noqa: E402
+
+from bot import ResponseTracker, log_transcription  # noqa: E402
+from observer import FrameObserver  # noqa: E402
+
+
+class LegacyTranscriptionLogger(FrameProcessor):
+    """The previous standalone TranscriptionLogger stage"""
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, TranscriptionFrame):
+            print(f"[USER] {frame.text}")
+        await self.push_frame(frame, direction)
+
+
+class LegacyResponseLogger(FrameProcessor):
+    """The previous standalone ResponseLogger stage"""
+
+    def __init__(self):
+        super().__init__()
+        self._current_response = []
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMFullResponseStartFrame):
+            self._current_response = []
+        elif isinstance(frame, TextFrame):
+            self._current_response.append(frame.text)
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            full_response = "".join(self._current_response)
+            if full_response.strip():
+                print(f"[BREA] {full_response}")
+            self._current_response = []
+        await self.push_frame(frame, direction)
+
+
+def timeline(turns: int, audio_per_text: int):
+    frames = []
+    for turn in range(turns):
+        frames.append(InterimTranscriptionFrame(text="i really", user_id="u", timestamp=""))
+        frames.append(TranscriptionFrame(text=f"i really value honesty {turn}", user_id="u", timestamp=""))
+        frames.append(LLMFullResponseStartFrame())
+        for word in "Mmhmm, honesty matters. What else won't you tolerate?".split():
+            frames.append(LLMTextFrame(text=word + " "))
+            for _ in range(audio_per_text):
+                frames.append(TTSAudioRawFrame(audio=bytes(960), sample_rate=24000, num_channels=1))
+        frames.append(LLMFullResponseEndFrame())
+    return frames
+
+
+def legacy_stage():
+    return Pipeline([LegacyTranscriptionLogger(), LegacyResponseLogger()])
+
+
+def observer_stage():
+    observer = FrameObserver()
+    observer.ignore(InterimTranscriptionFrame)
+    observer.on(TranscriptionFrame, log_transcription, upstream=True)
+    ResponseTracker().register(observer)
+    return Pipeline([observer])
+
+
+class PassThrough(FrameProcessor):
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        await self.push_frame(frame, direction)
+
+
+def baseline_stage():
+    return Pipeline([PassThrough()])
+
+
+def stub_pushes(stage):
+    """Processors of `stage` with push_frame() replaced by a counter"""
+    processors = stage.processors[1:-1]  # skip the pipeline's own source and sink
+    hops = [0]
+
+    async def push_frame(frame, direction=FrameDirection.DOWNSTREAM):
+        hops[0] += 1
+
+    for processor in processors:
+        processor.push_frame = push_frame
+    return processors, hops
+
+
+async def time_stage_work(make_stage, frames, passes: int):
+    """(best microseconds per frame, pushes per frame) for the stage's own process_frame() code"""
+    processors, hops = stub_pushes(make_stage())
+    best = float("inf")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(passes):
+            started = time.perf_counter()
+            for frame in frames:
+                for processor in processors:
+                    await processor.process_frame(frame, FrameDirection.DOWNSTREAM)
+            best = min(best, time.perf_counter() - started)
+    return best / len(frames) * 1e6, hops[0] / (passes * len(frames))
+
+
+async def time_stage(make_stage, frames, repeats: int) -> float:
+    """Best-of-`repeats` wall time per frame, in microseconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        stage = make_stage()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            await run_test(stage, frames_to_send=frames, expected_down_frames=None)
+            elapsed = time.perf_counter() - started
+        best = min(best, elapsed)
+    return best / len(frames) * 1e6
+
+
+async def run(args):
+    frames = timeline(args.turns, args.audio_per_text)
+    logger.remove()  # pipecat's per-frame debug logging would dominate the timings
+
+    print(f"{len(frames)} frames per run ({args.turns} turns, {args.audio_per_text} audio frames per text frame)")
+    print("  stage work (process_frame, pushes stubbed)")
+    work = {}
+    for name, make_stage in (("legacy two-stage chain", legacy_stage), ("fused observer", observer_stage)):
+        work[name], hops = await time_stage_work(make_stage, frames, args.passes)
+        print(f"    {name:<24} {work[name]:8.2f} us/frame   {hops:.0f} push(es)/frame")
+    legacy, fused = work["legacy two-stage chain"], work["fused observer"]
+    print(f"    saved per frame        {legacy - fused:8.2f} us ({(legacy - fused) / legacy:.0%}), plus one push")
+
+    print("  end to end (run_test pipeline; noisy)")
+    await time_stage(baseline_stage, frames, 1)  # warm-up
+    for name, make_stage in (
+        ("one pass-through stage", baseline_stage),
+        ("legacy two-stage chain", legacy_stage),
+        ("fused observer", observer_stage),
+    ):
+        print(f"    {name:<24} {await time_stage(make_stage, frames, args.repeats):8.2f} us/frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--audio-per-text", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3, help="run_test runs per stage (end to end)")
+    parser.add_argument("--passes", type=int, default=50, help="Passes over the timeline (stage work)")
+    asyncio.run(run(parser.parse_args()))
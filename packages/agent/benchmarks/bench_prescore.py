@@ -0,0 +1,158 @@
+"""
+Candidate Pre-Scoring Benchmark
+
+Scores one user against a pool of synthetic candidate profiles with the
+batched CandidatePool, and with a per-pair Python loop computing the same
+score, and checks that both agree on the top-k shortlist. Then rebuilds
+each user chip by chip with IncrementalRanking, as the live match preview
+does, and checks its scores equal the batched ones.
+
+Usage:
+    python benchmarks/bench_prescore.py [--candidates 10000] [--users 50] [--k 10]
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matching import CandidatePool, IncrementalRanking, DEFAULT_WEIGHTS, _concepts, _flags, _tags  # noqa: E402
+
+VALUES = [
+    "Family", "Career", "Travel", "Stability", "Growth", "Fitness", "Creativity", "Spirituality",
+    "Loyalty", "Honesty", "Independence", "Nature", "Music", "Kindness", "Community", "Learning",
+]
+DEALBREAKERS = [
+    "Smoking", "Dishonesty", "Cheating", "Laziness", "Jealousy", "Drugs", "Rudeness",
+    "Poor communication", "Negativity", "Drama", "Materialism", "Workaholism",
+]
+TRAITS = ["Smoker", "Vapes", "Jealous", "Lazy", "Rude"]
+TAGS = {
+    "humor": ["dry", "playful", "silly", "sarcastic"],
+    "energy": ["chill", "balanced", "high"],
+    "planning": ["spontaneous", "planned"],
+    "conflict": ["direct", "avoidant", "collaborative"],
+}
+
+
+def random_profile(rng: random.Random):
+    return {
+        "values": rng.sample(VALUES, rng.randint(1, 4)),
+        "dealbreakers": rng.sample(DEALBREAKERS, rng.randint(0, 3)),
+        "personalityTags": {tag: rng.choice(options) for tag, options in TAGS.items() if rng.random() < 0.8},
+        "traits": rng.sample(TRAITS, 1) if rng.random() < 0.1 else [],
+    }
+
+
+def pair_score(user, candidate):
+    """The same score for one pair, with Python sets"""
+    user_values, cand_values = set(_concepts("VALUE", user["values"])), set(_concepts("VALUE", candidate["values"]))
+    user_db = set(_concepts("DEALBREAKER", user["dealbreakers"]))
+    cand_db = set(_concepts("DEALBREAKER", candidate["dealbreakers"]))
+    if user_db & set(_flags(candidate)) or cand_db & set(_flags(user)):
+        return -math.inf
+
+    def cosine(a, b):
+        return len(a & b) / math.sqrt(len(a) * len(b)) if a and b else 0.0
+
+    user_tags, cand_tags = _tags(user), _tags(candidate)
+    both = [tag for tag in user_tags if tag in cand_tags]
+    personality = sum(user_tags[tag] == cand_tags[tag] for tag in both) / len(both) if both else 0.0
+    total = sum(DEFAULT_WEIGHTS.values())
+    return (
+        DEFAULT_WEIGHTS["values"] * cosine(user_values, cand_values)
+        + DEFAULT_WEIGHTS["dealbreakers"] * cosine(user_db, cand_db)
+        + DEFAULT_WEIGHTS["personality"] * personality
+    ) / total
+
+
+def profile_chips(user):
+    """The chips a conversation would produce for `user`, labelled like the extractor's"""
+    chips = [("Value", label) for label in user["values"]]
+    chips += [("Dealbreaker", label) for label in user["dealbreakers"]]
+    for tag, value in user["personalityTags"].items():
+        if tag == "energy":
+            chips.append(("Energy", f"{value.title()} ⚡"))
+        elif tag == "humor":
+            chips.append(("Humor", f"{value.title()} Humor"))
+        else:
+            chips.append(("Style", value.title()))
+    return chips
+
+
+def loop_top_k(user, ids, candidates, k):
+    scored = [(candidate_id, pair_score(user, c)) for candidate_id, c in zip(ids, candidates)]
+    scored = [pair for pair in scored if pair[1] != -math.inf]
+    return sorted(scored, key=lambda pair: -pair[1])[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    candidates = [random_profile(rng) for _ in range(args.candidates)]
+    ids = [f"c{i}" for i in range(args.candidates)]
+    users = [random_profile(rng) for _ in range(args.users)]
+
+    start = time.perf_counter()
+    pool = CandidatePool(ids, candidates)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    batched = [pool.top_k(user, args.k) for user in users]
+    batched_ms = (time.perf_counter() - start) * 1000 / args.users
+
+    start = time.perf_counter()
+    looped = [loop_top_k(user, ids, candidates, args.k) for user in users]
+    loop_ms = (time.perf_counter() - start) * 1000 / args.users
+
+    # Ties may order differently; compare the shortlisted scores
+    agree = all(
+        len(a) == len(b) and all(abs(x[1] - y[1]) < 1e-5 for x, y in zip(a, b)) for a, b in zip(batched, looped)
+    )
+    excluded = sum(int(pool.excluded(user).sum()) for user in users) / args.users
+
+    # Chip by chip; traits never arrive as chips, so compare against the profile without them
+    chip_ms, chip_count, incremental_agree = 0.0, 0, True
+    for user in users:
+        ranking = IncrementalRanking(pool)
+        chips = profile_chips(user)
+        start = time.perf_counter()
+        for category, label in chips:
+            ranking.add_chip(category, label)
+            ranking.top_k(args.k)
+        chip_ms += (time.perf_counter() - start) * 1000
+        chip_count += len(chips)
+        expected = pool.score({**user, "traits": []})
+        actual = ranking.scores()
+        finite = np.isfinite(expected)
+        incremental_agree &= bool(
+            np.array_equal(finite, np.isfinite(actual)) and np.allclose(expected[finite], actual[finite], atol=1e-5)
+        )
+        top = [score for _, score in ranking.top_k(args.k)]
+        batch_top = [score for _, score in pool.top_k({**user, "traits": []}, args.k)]
+        incremental_agree &= len(top) == len(batch_top) and np.allclose(top, batch_top, atol=1e-5)
+
+    print(f"{args.candidates} candidates, {args.users} users, top {args.k}")
+    print(f"  pool build (once)     {build_ms:8.1f} ms")
+    print(f"  per-pair Python loop  {loop_ms:8.2f} ms/user")
+    print(f"  batched NumPy         {batched_ms:8.2f} ms/user")
+    print(f"  speedup               {loop_ms / batched_ms:8.1f}x")
+    print(f"  excluded by dealbreakers  {excluded:.0f} per user on average")
+    print(f"  shortlists agree      {agree}")
+    print(f"  incremental chip + top_k  {chip_ms / max(1, chip_count):.3f} ms/chip")
+    print(f"  incremental equals batch  {incremental_agree}")
+
+
+if __name__ == "__main__":
+    main()
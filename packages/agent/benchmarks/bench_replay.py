@@ -0,0 +1,174 @@
+"""
+Frame Replay Benchmark
+
+Replays recorded bot sessions through the agent processors (see
+benchmarks/replay.py) and reports throughput, per-frame latency and
+retained memory per session, so regressions show up offline.
+
+Recordings come from bots run with RECORD_FRAMES_DIR set, or the
+synthetic sample in benchmarks/recordings/.
+
+Usage:
+    python benchmarks/bench_replay.py [recording ...] [--sessions 20] [--repeats 3]
+        [--no-extract] [--json results.json] [--baseline results.json] [--tolerance 0.2]
+"""
+
+import os
+import sys
+import glob
+import json
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from replay import ReplaySession, load_frames  # noqa: E402
+from agent_logging import configure_logging, shutdown_logging  # noqa: E402
+
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+
+def percentile_us(sorted_seconds: List[float], q: float) -> float:
+    index = min(len(sorted_seconds) - 1, int(q * len(sorted_seconds)))
+    return sorted_seconds[index] * 1e6
+
+
+async def time_recording(frames, args) -> Dict[str, Any]:
+    """Best-of-`repeats` throughput plus latency percentiles from the best run"""
+    best_elapsed = float("inf")
+    best_timings: List[Tuple[str, float]] = []
+    for _ in range(args.repeats):
+        elapsed = 0.0
+        timings: List[Tuple[str, float]] = []
+        for _ in range(args.sessions):
+            session = ReplaySession(extract=args.extract)
+            elapsed += await session.replay(frames, timings)
+        if elapsed < best_elapsed:
+            best_elapsed, best_timings = elapsed, timings
+
+    all_seconds = sorted(seconds for _, seconds in best_timings)
+    by_kind: Dict[str, List[float]] = {}
+    for kind, seconds in best_timings:
+        by_kind.setdefault(kind, []).append(seconds)
+
+    return {
+        "frames_per_sec": round(len(best_timings) / best_elapsed),
+        "p50_us": round(percentile_us(all_seconds, 0.50), 2),
+        "p95_us": round(percentile_us(all_seconds, 0.95), 2),
+        "p99_us": round(percentile_us(all_seconds, 0.99), 2),
+        "max_us": round(all_seconds[-1] * 1e6, 2),
+        "by_kind": {
+            kind: {
+                "count": len(values) // args.sessions,
+                "mean_us": round(sum(values) / len(values) * 1e6, 2),
+                "p99_us": round(percentile_us(sorted(values), 0.99), 2),
+            }
+            for kind, values in sorted(by_kind.items())
+        },
+    }
+
+
+async def measure_memory(frames, args) -> Dict[str, Any]:
+    """Memory retained by each replayed session (peak is across all of them)"""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        sessions = []
+        for _ in range(args.sessions):
+            session = ReplaySession(extract=args.extract)
+            await session.replay(frames)
+            sessions.append(session)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "retained_kb_per_session": round((current - baseline) / args.sessions / 1024, 1),
+        "peak_kb": round((peak - baseline) / 1024, 1),
+        "chips_sent_per_session": sum(
+            len(message["payload"]) if message["type"] == "CHIPS" else 1
+            for message in sessions[0].rtvi.messages
+        ),
+    }
+
+
+def check_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (fraction) in throughput, p99 latency or memory"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["frames_per_sec"] < base["frames_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: frames/sec {base['frames_per_sec']} -> {result['frames_per_sec']}")
+        if result["p99_us"] > base["p99_us"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {base['p99_us']}us -> {result['p99_us']}us")
+        if result["retained_kb_per_session"] > base["retained_kb_per_session"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: memory {base['retained_kb_per_session']}KB -> {result['retained_kb_per_session']}KB"
+            )
+    return regressions
+
+
+async def run(args) -> int:
+    paths = args.recordings or sorted(glob.glob(os.path.join(RECORDINGS_DIR, "*.jsonl*")))
+    if not paths:
+        print("No recordings found")
+        return 1
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Include the cost of enqueueing log records, as in a live bot
+        configure_logging(log_file=os.path.join(log_dir, "replay.log"))
+        try:
+            for path in paths:
+                header, frames = load_frames(path)
+                await ReplaySession(extract=args.extract).replay(frames)  # warm-up
+                result = await time_recording(frames, args)
+                result.update(await measure_memory(frames, args))
+                result["frames"] = len(frames)
+                results[os.path.basename(path)] = result
+        finally:
+            shutdown_logging()
+
+    print(f"{args.sessions} sessions per run, best of {args.repeats}, extraction {'on' if args.extract else 'off'}")
+    for name, result in results.items():
+        print(f"\n{name} ({result['frames']} frames, {result['chips_sent_per_session']} chips delivered)")
+        print(f"  throughput           {result['frames_per_sec']:>10,} frames/s")
+        print(
+            f"  per-frame latency    p50 {result['p50_us']:.2f}us  p95 {result['p95_us']:.2f}us  "
+            f"p99 {result['p99_us']:.2f}us  max {result['max_us']:.2f}us"
+        )
+        for kind, stats in result["by_kind"].items():
+            print(f"    {kind:<28} x{stats['count']:<5} mean {stats['mean_us']:8.2f}us  p99 {stats['p99_us']:8.2f}us")
+        print(f"  memory per session   {result['retained_kb_per_session']:.1f} KB retained, {result['peak_kb']:.1f} KB peak")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = check_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", nargs="*", help="Recording files (default: benchmarks/recordings/)")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-extract", dest="extract", action="store_false", help="Skip the IntelligenceExtractor")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Fail if results regress against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    sys.exit(asyncio.run(run(parser.parse_args())))
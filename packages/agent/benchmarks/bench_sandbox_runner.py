@@ -0,0 +1,111 @@
+"""
+Sandbox Runner Benchmark
+
+Throughput of the batch sandbox runner against the offline StubBackend,
+whose fixed per-call latency stands in for the model. For each
+concurrency level, reports simulations per second and the bulk-write
+count; then interrupts a run partway and reruns it to show that resume
+only does the remaining jobs.
+
+Usage:
+    python benchmarks/bench_sandbox_runner.py [--users 200] [--shortlist 5] [--latency 0.05]
+        [--failure-rate 0.05]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sandbox_runner import SandboxRunner, SQLiteResultStore, StubBackend, shortlist_jobs  # noqa: E402
+
+VALUES = ["family", "adventure", "honesty", "ambition", "faith", "humor", "growth", "kindness"]
+DEALBREAKERS = ["smoking", "poor communication", "flakiness", "rudeness", "no ambition"]
+TAGS = {"energy": ["chill", "balanced", "high"], "planning": ["spontaneous", "planner"], "conflict": ["direct", "avoidant"]}
+
+
+def make_profiles(count: int):
+    rng = random.Random(5)
+    return [
+        {
+            "id": f"u{i}",
+            "values": rng.sample(VALUES, 3),
+            "dealbreakers": rng.sample(DEALBREAKERS, 1),
+            "personalityTags": {tag: rng.choice(options) for tag, options in TAGS.items()},
+        }
+        for i in range(count)
+    ]
+
+
+class CountingStore(SQLiteResultStore):
+    writes = 0
+
+    async def write(self, results):
+        self.writes += 1
+        await super().write(results)
+
+
+async def timed_run(profiles, args, concurrency, path, stop_after=None):
+    backend = StubBackend(latency=args.latency, failure_rate=args.failure_rate)
+    store = CountingStore(path)
+    runner = SandboxRunner(backend, store, concurrency=concurrency, backoff=0.01, batch_size=100)
+    jobs = list(shortlist_jobs(profiles, k=args.shortlist))
+    start = time.perf_counter()
+    try:
+        if stop_after is None:
+            await runner.run(jobs)
+        else:
+            task = asyncio.create_task(runner.run(jobs))
+            await asyncio.sleep(stop_after)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    finally:
+        await store.close()
+    return len(jobs), time.perf_counter() - start, runner.stats(), store.writes, backend.calls
+
+
+async def main_async(args):
+    profiles = make_profiles(args.users)
+    with tempfile.TemporaryDirectory(prefix="sandbox_bench_") as tmp:
+        print(f"{args.users} users x {args.shortlist} candidates x 3 scenarios, {args.latency * 1000:.0f}ms per call, "
+              f"{args.failure_rate:.0%} failures")
+        print(f"  {'concurrency':>11} {'jobs':>6} {'seconds':>8} {'sims/s':>8} {'retries':>8} {'failed':>7} {'writes':>7}")
+        for concurrency in (1, 8, 32, 128):
+            if concurrency == 1 and args.users > 20:
+                # Serial is the baseline; a slice is enough to time it
+                sample = profiles[:20]
+            else:
+                sample = profiles
+            jobs, seconds, stats, writes, _ = await timed_run(sample, args, concurrency, os.path.join(tmp, f"c{concurrency}.db"))
+            print(f"  {concurrency:>11} {jobs:>6} {seconds:8.2f} {stats['succeeded'] / seconds:8.0f} "
+                  f"{stats['retries']:>8} {stats['failed']:>7} {writes:>7}")
+
+        path = os.path.join(tmp, "resume.db")
+        jobs, seconds, stats, _, _ = await timed_run(profiles, args, 32, path, stop_after=args.interrupt_after)
+        print(f"  interrupted after {seconds:.2f}s: {stats['succeeded']} of {jobs} done")
+        jobs, seconds, stats, _, calls = await timed_run(profiles, args, 32, path)
+        print(f"  resumed: skipped {stats['skipped']}, ran {stats['succeeded'] + stats['failed']} "
+              f"({calls} model calls) in {seconds:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--shortlist", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per simulated model call")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--interrupt-after", type=float, default=0.5, help="Seconds before the resume demo is interrupted")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
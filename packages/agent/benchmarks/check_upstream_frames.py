@@ -0,0 +1,208 @@
+"""
+Upstream Frame Checks
+
+Runs the bot's frame handlers in a real pipecat pipeline shaped like
+bot.py's (observer tap -> LLM -> observer), with a fake Gemini Live stage
+that, like the real one, pushes the user's TranscriptionFrames upstream
+and Brea's audio and text downstream. Frame replays dispatch everything
+downstream, so they cannot catch a handler that never sees user speech
+in a live session; these checks do.
+
+Exits non-zero if any check fails.
+
+Usage:
+    python benchmarks/check_upstream_frames.py
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+from dataclasses import dataclass
+
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipecat.frames.frames import (  # noqa: E402
+    DataFrame,
+    LLMFullResponseEndFrame,
+    LLMFullResponseStartFrame,
+    LLMTextFrame,
+    TranscriptionFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.pipeline.pipeline import Pipeline  # noqa: E402
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor  # noqa: E402
+from pipecat.tests.utils import SleepFrame, run_test  # noqa: E402
+
+from lifecycle import SessionLifecycle  # noqa: E402
+from observer import FrameObserver  # noqa: E402
+from persistence import SessionWriter, Sink  # noqa: E402
+from recording import FrameRecorder  # noqa: E402
+from session_metrics import SessionMetrics  # noqa: E402
+
+
+@dataclass
+class UserSays(DataFrame):
+    """Script step: the user says `text`"""
+
+    text: str = ""
+
+
+@dataclass
+class BreaSays(DataFrame):
+    """Script step: Brea answers with `text`"""
+
+    text: str = ""
+
+
+class FakeGeminiLive(FrameProcessor):
+    """Plays the script the way GeminiLiveLLMService emits frames"""
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, UserSays):
+            await self.push_frame(
+                TranscriptionFrame(text=frame.text, user_id="user", timestamp=""), FrameDirection.UPSTREAM
+            )
+        elif isinstance(frame, BreaSays):
+            await self.push_frame(TTSStartedFrame())
+            await self.push_frame(LLMFullResponseStartFrame())
+            for word in frame.text.split():
+                await self.push_frame(LLMTextFrame(text=word + " "))
+            await self.push_frame(LLMFullResponseEndFrame())
+            await self.push_frame(TTSStoppedFrame())
+        else:
+            await self.push_frame(frame, direction)
+
+
+async def run_session(observer: FrameObserver, script):
+    """Run the script through observer tap -> fake LLM -> observer"""
+    await run_test(
+        Pipeline([observer.upstream_tap(), FakeGeminiLive(), observer]),
+        frames_to_send=script,
+        expected_down_frames=None,
+    )
+
+
+async def check_observer_directions():
+    """upstream=True handlers get the user's upstream transcription once; others never do"""
+    observer = FrameObserver()
+    both, downstream_only = [], []
+    observer.on(TranscriptionFrame, lambda frame: _append(both, frame.text), upstream=True)
+    observer.on(TTSStartedFrame, lambda frame: _append(downstream_only, "tts"))
+    await run_session(observer, [UserSays("hi there"), BreaSays("Hello!")])
+    assert both == ["hi there"], both
+    assert downstream_only == ["tts"], downstream_only
+
+
+async def check_response_latency():
+    """User end of speech (an upstream transcription) to Brea's audio is measured"""
+    metrics = SessionMetrics("room", "user")
+    observer = FrameObserver()
+    metrics.register(observer)
+    metrics.participant_joined()
+    await run_session(
+        observer,
+        [BreaSays("Hey, I'm Brea."), UserSays("I love hiking"), SleepFrame(0.05), BreaSays("Nice!")],
+    )
+    assert metrics.totals.get("greeting_latency") == 1, metrics.totals
+    assert metrics.totals.get("response_latency") == 1, metrics.totals
+    (latency,) = metrics._pending["response_latency"]
+    assert latency >= 40, latency
+
+
+class MemorySink(Sink):
+    """Keeps every written turn in memory"""
+
+    def __init__(self):
+        self.turns = []
+
+    async def write(self, session_id, user_id, turns, chips, ended):
+        self.turns.extend(turns)
+
+
+async def check_transcript_persistence():
+    """The saved transcript has the user's turns as well as Brea's, in order"""
+    sink = MemorySink()
+    writer = SessionWriter(sink, "room", "user")
+    observer = FrameObserver()
+    writer.register(observer)
+    await run_session(
+        observer,
+        [BreaSays("What matters to you?"), UserSays("Honesty, mostly"), SleepFrame(0.05), BreaSays("Love that.")],
+    )
+    await writer.close()
+    turns = [(turn["speaker"], turn["text"]) for turn in sink.turns]
+    assert turns == [
+        ("brea", "What matters to you?"),
+        ("user", "Honesty, mostly"),
+        ("brea", "Love that."),
+    ], turns
+
+
+async def check_user_speech_keeps_session_alive():
+    """A user talking to a quiet Brea resets the idle timeout; silence still ends it"""
+    expired = []
+    lifecycle = SessionLifecycle(
+        join_timeout=0, idle_timeout=0.3, max_duration=0,
+        on_expire=lambda reason: _append(expired, reason), check_interval=0.05,
+    )
+    observer = FrameObserver()
+    lifecycle.register(observer)
+    lifecycle.participant_joined()
+    lifecycle.start()
+    try:
+        script = []
+        for i in range(6):
+            script += [UserSays(f"still here {i}"), SleepFrame(0.1)]
+        await run_session(observer, script)
+        assert expired == [], expired
+        await asyncio.sleep(0.4)
+        assert expired == ["idle_timeout"], expired
+    finally:
+        await lifecycle.stop()
+
+
+async def check_recording_has_user_turns():
+    """Recordings capture the user's upstream transcriptions, so replays have both sides"""
+    recorder = FrameRecorder()
+    observer = FrameObserver()
+    recorder.register(observer)
+    await run_session(observer, [BreaSays("Hi!"), UserSays("Hey Brea"), SleepFrame(0.05), BreaSays("Hello!")])
+    kinds = [kind for _, kind, _ in recorder.events if kind in ("user", "start")]
+    assert kinds == ["start", "user", "start"], kinds
+
+
+async def _append(items, item):
+    items.append(item)
+
+
+CHECKS = [
+    check_observer_directions,
+    check_response_latency,
+    check_transcript_persistence,
+    check_user_speech_keeps_session_alive,
+    check_recording_has_user_turns,
+]
+
+
+async def run(args):
+    logger.remove()  # pipecat's per-frame debug logging
+    failed = 0
+    for check in CHECKS:
+        try:
+            await check()
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {check.__name__}: {e}")
+        else:
+            print(f"ok   {check.__name__}")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sys.exit(1 if asyncio.run(run(parser.parse_args())) else 0)
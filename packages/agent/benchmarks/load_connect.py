@@ -0,0 +1,357 @@
+"""
+/connect Load Test
+
+Ramps concurrent POST /connect calls against the agent server and reports,
+per concurrency stage, latency percentiles, throughput, error rate and host
+resource usage per live session.
+
+By default it starts its own stack: the mock Daily API
+(benchmarks/mock_daily.py) and the agent server with stub bots (BOT_STUB),
+which hold each session open for --session-seconds without joining Daily
+or Gemini. Pool settings (BOT_POOL_SIZE, ROOM_POOL_SIZE, ...) are taken
+from the environment as usual. Use --url to target a running server
+instead (pass --server-pid to also sample its resources).
+
+Resource usage is read from /proc (Linux) across the server and all of its
+descendant processes. Memory is PSS where available, so pages shared by
+forked bot workers are not double counted.
+
+Usage:
+    python benchmarks/load_connect.py [--stages 1,2,4,8] [--stage-seconds 15]
+        [--session-seconds 30] [--daily-latency-ms 40] [--daily-error-rate 0.0]
+        [--no-retry-after] [--url http://localhost:8000 --server-pid PID]
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_stat(pid: int) -> Optional[Tuple[int, float, int]]:
+    """(ppid, cpu seconds, rss bytes) from /proc/<pid>/stat"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    fields = stat[stat.rfind(")") + 2:].split()
+    return int(fields[1]), (int(fields[11]) + int(fields[12])) / CLK_TCK, int(fields[21]) * PAGE_SIZE
+
+
+def _read_pss(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def sample_tree(root_pids: List[int]) -> Optional[Dict[str, float]]:
+    """Memory, CPU time and process count of `root_pids` and all their descendants"""
+    stats = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            stat = _read_stat(int(entry))
+            if stat:
+                stats[int(entry)] = stat
+    roots = [pid for pid in root_pids if pid in stats]
+    if not roots:
+        return None
+
+    children: Dict[int, List[int]] = {}
+    for pid, (ppid, _, _) in stats.items():
+        children.setdefault(ppid, []).append(pid)
+    tree, stack = [], list(roots)
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, ()))
+
+    memory = 0
+    for pid in tree:
+        pss = _read_pss(pid)
+        memory += pss if pss is not None else stats[pid][2]
+    return {
+        "memory_bytes": memory,
+        "cpu_seconds": sum(stats[pid][1] for pid in tree),
+        "processes": len(tree),
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def wait_until_up(client: httpx.AsyncClient, url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url)).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_stack(args, log_dir: str) -> List[subprocess.Popen]:
+    """Start the mock Daily API and an agent server with stub bots"""
+    mock = subprocess.Popen(
+        [
+            sys.executable, os.path.join(AGENT_DIR, "benchmarks", "mock_daily.py"),
+            "--port", str(args.daily_port),
+            "--latency-ms", str(args.daily_latency_ms),
+            "--jitter-ms", str(args.daily_jitter_ms),
+            "--error-rate", str(args.daily_error_rate),
+            "--rate-limit-rate", str(args.daily_rate_limit_rate),
+        ],
+        start_new_session=True,
+    )
+    env = {
+        **os.environ,
+        "DAILY_API_KEY": "mock-key",
+        "DAILY_API_URL": f"http://127.0.0.1:{args.daily_port}",
+        "DAILY_DOMAIN_ID": "",
+        "BOT_STUB": "true",
+        "BOT_STUB_SESSION_SECONDS": str(args.session_seconds),
+        "BOT_LOG_DIR": log_dir,
+        "AGENT_SERVER_URL": f"http://127.0.0.1:{args.port}",
+        "METRICS_PUSH_INTERVAL": "1",
+    }
+    if args.nodes:
+        env["BOT_DISPATCH"] = "nodes"
+
+    with open(os.path.join(log_dir, "server.out"), "w") as out:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=AGENT_DIR,
+            env=env,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+    nodes = []
+    for i in range(args.nodes):
+        port = args.port + 1 + i
+        with open(os.path.join(log_dir, f"node-{i + 1}.out"), "w") as out:
+            nodes.append(subprocess.Popen(
+                [
+                    sys.executable, os.path.join(AGENT_DIR, "node.py"),
+                    "--host", "127.0.0.1",
+                    "--port", str(port),
+                    "--node-id", f"node-{i + 1}",
+                    "--url", f"http://127.0.0.1:{port}",
+                ],
+                cwd=AGENT_DIR,
+                env={**env, "DISPATCHER_URL": f"http://127.0.0.1:{args.port}", "NODE_HEARTBEAT_INTERVAL": "1"},
+                stdout=out,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            ))
+    return [server, *nodes, mock]
+
+
+def stop_stack(processes: List[subprocess.Popen]):
+    """Stop each process group in order (the server's includes its bots)"""
+    for process in processes:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=10)
+        except ProcessLookupError:
+            pass
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+async def run_stage(
+    client: httpx.AsyncClient,
+    url: str,
+    stage: int,
+    concurrency: int,
+    seconds: float,
+    root_pids: List[int],
+    idle: Optional[Dict[str, float]],
+    honor_retry_after: bool = True,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    deadline = time.monotonic() + seconds
+    sequence = 0
+
+    async def connect_loop():
+        nonlocal sequence
+        while time.monotonic() < deadline:
+            sequence += 1
+            user_id = f"load-{stage}-{sequence}"
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/connect", params={"user_id": user_id})
+                if response.status_code != 200:
+                    errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                    retry_after = response.headers.get("Retry-After")
+                    if response.status_code == 503 and retry_after and honor_retry_after:
+                        # Back off like a real client instead of hammering a saturated host
+                        await asyncio.sleep(min(float(retry_after), max(0.0, deadline - time.monotonic())))
+                    continue
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    samples: List[Dict[str, float]] = []
+
+    async def sample_loop():
+        while time.monotonic() < deadline:
+            sample = await asyncio.to_thread(sample_tree, root_pids) if root_pids else None
+            if sample:
+                try:
+                    health = (await client.get(f"{url}/health")).json()
+                    # Bot processes the scheduler (or node dispatcher) tracks,
+                    # else bots heartbeating their metrics
+                    sessions = health.get("sessions") or {}
+                    nodes = health.get("nodes") or {}
+                    sample["live_sessions"] = sessions.get(
+                        "live",
+                        nodes.get("sessions", (health.get("voice_metrics") or {}).get("live_sessions", 0)),
+                    )
+                except (httpx.HTTPError, ValueError):
+                    sample["live_sessions"] = 0
+                sample["at"] = time.monotonic()
+                samples.append(sample)
+            await asyncio.sleep(1.0)
+
+    started = time.monotonic()
+    await asyncio.gather(sample_loop(), *(connect_loop() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    total = len(latencies) + sum(errors.values())
+    result: Dict[str, Any] = {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+    }
+
+    if len(samples) >= 2:
+        last = samples[-1]
+        cpu_percent = (last["cpu_seconds"] - samples[0]["cpu_seconds"]) / (last["at"] - samples[0]["at"]) * 100
+        live = last["live_sessions"]
+        # Per-session memory is what the stack grew by over its idle footprint (server + warm pools)
+        session_memory = last["memory_bytes"] - (idle["memory_bytes"] if idle else 0)
+        result.update({
+            "live_sessions": live,
+            "processes": last["processes"],
+            "memory_mb": round(last["memory_bytes"] / 2**20, 1),
+            "cpu_percent": round(cpu_percent, 1),
+            "memory_mb_per_session": round(session_memory / 2**20 / live, 2) if live else None,
+            "cpu_percent_per_session": round(cpu_percent / live, 2) if live else None,
+        })
+    return result
+
+
+def print_stage(result: Dict[str, Any]):
+    print(
+        f"c={result['concurrency']:<4} {result['requests']:>6} req  {result['throughput_rps']:>7.1f} req/s  "
+        f"err {result['error_rate']:.2%}  p50 {result['p50_ms']:.1f}ms  p95 {result['p95_ms']:.1f}ms  "
+        f"p99 {result['p99_ms']:.1f}ms"
+    )
+    if "live_sessions" in result:
+        per_session = ""
+        if result["memory_mb_per_session"] is not None:
+            per_session = (
+                f"  per session {result['memory_mb_per_session']:.2f}MB, "
+                f"{result['cpu_percent_per_session']:.2f}% CPU"
+            )
+        print(
+            f"       {result['live_sessions']:>4} live sessions  {result['processes']} processes  "
+            f"{result['memory_mb']:.0f}MB  {result['cpu_percent']:.0f}% CPU{per_session}"
+        )
+    if result["errors"]:
+        print(f"       errors: {result['errors']}")
+
+
+async def run(args) -> int:
+    stages = [int(c) for c in args.stages.split(",")]
+    processes: List[subprocess.Popen] = []
+    log_dir = tempfile.mkdtemp(prefix="brea-load-")
+    url = args.url
+    root_pids = [args.server_pid] if args.server_pid else []
+
+    if not url:
+        processes = start_stack(args, log_dir)
+        url = f"http://127.0.0.1:{args.port}"
+        root_pids = [process.pid for process in processes[:-1]]  # server and nodes, not the mock
+        print(
+            f"Started mock Daily on :{args.daily_port}, agent server on :{args.port}"
+            f"{f' and {args.nodes} nodes' if args.nodes else ''} (bot logs in {log_dir})"
+        )
+
+    limits = httpx.Limits(max_connections=max(stages) + 4, max_keepalive_connections=max(stages) + 4)
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            await wait_until_up(client, f"{url}/health")
+            idle = None
+            if root_pids:
+                await asyncio.sleep(args.settle_seconds)  # let warm pools fill
+                idle = sample_tree(root_pids)
+                if idle:
+                    print(f"Idle footprint: {idle['processes']} processes, {idle['memory_bytes'] / 2**20:.0f}MB")
+            for stage, concurrency in enumerate(stages):
+                print_stage(
+                    await run_stage(
+                        client, url, stage, concurrency, args.stage_seconds, root_pids, idle, args.honor_retry_after
+                    )
+                )
+    finally:
+        stop_stack(processes)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--stage-seconds", type=float, default=15.0)
+    parser.add_argument("--session-seconds", type=float, default=30.0, help="How long each stub bot stays live")
+    parser.add_argument("--settle-seconds", type=float, default=5.0, help="Wait before sampling the idle footprint")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--port", type=int, default=8100, help="Port for the spawned agent server")
+    parser.add_argument(
+        "--nodes", type=int, default=0,
+        help="Run bots on this many local node.py workers (BOT_DISPATCH=nodes), on the ports after --port",
+    )
+    parser.add_argument("--daily-port", type=int, default=9000)
+    parser.add_argument("--daily-latency-ms", type=float, default=40.0)
+    parser.add_argument("--daily-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--daily-error-rate", type=float, default=0.0)
+    parser.add_argument("--daily-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--no-retry-after", dest="honor_retry_after", action="store_false",
+        help="Retry immediately after a 503 instead of waiting for Retry-After",
+    )
+    parser.add_argument("--url", help="Target a running agent server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url server, for resource sampling")
+    sys.exit(asyncio.run(run(parser.parse_args())))
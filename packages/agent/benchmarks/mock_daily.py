@@ -0,0 +1,134 @@
+"""
+Mock Daily API
+
+Local stand-in for the parts of the Daily REST API the agent uses, for
+load testing without real rooms. Point the agent at it with
+DAILY_API_URL=http://localhost:9000 (any DAILY_API_KEY works).
+
+- GET /                    domain info (domain_id for local token signing)
+- GET /rooms               list rooms, newest first (limit, starting_after)
+- POST /rooms              create a room
+- DELETE /rooms/{name}     delete a room (404 if unknown)
+- POST /meeting-tokens     issue an opaque token
+- GET /_stats              request counts and live rooms
+
+Every request waits `latency_ms` +/- `jitter_ms`, then fails with a 503
+with probability `error_rate`, or a 429 (with Retry-After) with
+probability `rate_limit_rate`.
+
+Usage:
+    python benchmarks/mock_daily.py [--port 9000] [--latency-ms 40] [--jitter-ms 10]
+        [--error-rate 0.0] [--rate-limit-rate 0.0]
+"""
+
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+DOMAIN_NAME = "mock"
+DOMAIN_ID = "00000000-0000-4000-8000-000000000000"
+
+
+def create_app(
+    latency_ms: float = 40.0,
+    jitter_ms: float = 10.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+) -> FastAPI:
+    app = FastAPI(title="Mock Daily API")
+    rooms: Dict[str, Dict[str, Any]] = {}
+    requests: Counter = Counter()
+    injected: Counter = Counter()
+
+    @app.middleware("http")
+    async def simulate_network(request: Request, call_next):
+        if request.url.path == "/_stats":
+            return await call_next(request)
+        path = "/rooms/{name}" if request.url.path.startswith("/rooms/") else request.url.path
+        requests[f"{request.method} {path}"] += 1
+
+        delay_ms = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms))
+        await asyncio.sleep(delay_ms / 1000)
+
+        roll = random.random()
+        if roll < error_rate:
+            injected["503"] += 1
+            return JSONResponse({"error": "mock-unavailable"}, status_code=503)
+        if roll < error_rate + rate_limit_rate:
+            injected["429"] += 1
+            return JSONResponse({"error": "rate-limit"}, status_code=429, headers={"Retry-After": "1"})
+        return await call_next(request)
+
+    @app.get("/")
+    async def domain():
+        return {"domain_name": DOMAIN_NAME, "domain_id": DOMAIN_ID}
+
+    @app.get("/rooms")
+    async def list_rooms(limit: int = 100, starting_after: Optional[str] = None):
+        newest_first = list(reversed(rooms.values()))
+        if starting_after:
+            ids = [room["id"] for room in newest_first]
+            newest_first = newest_first[ids.index(starting_after) + 1:] if starting_after in ids else []
+        return {"total_count": len(rooms), "data": newest_first[:limit]}
+
+    @app.post("/rooms")
+    async def create_room(body: Dict[str, Any]):
+        name = body.get("name") or uuid.uuid4().hex[:12]
+        room = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "url": f"https://{DOMAIN_NAME}.daily.co/{name}",
+            "privacy": body.get("privacy", "public"),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "config": body.get("properties", {}),
+        }
+        rooms[name] = room
+        return room
+
+    @app.delete("/rooms/{name}")
+    async def delete_room(name: str):
+        if rooms.pop(name, None) is None:
+            return JSONResponse({"error": "not-found", "info": f"room {name} not found"}, status_code=404)
+        return {"deleted": True, "name": name}
+
+    @app.post("/meeting-tokens")
+    async def create_meeting_token(body: Dict[str, Any]):
+        return {"token": f"mock-{uuid.uuid4().hex}"}
+
+    @app.get("/_stats")
+    async def stats():
+        return {
+            "live_rooms": len(rooms),
+            "requests": dict(requests),
+            "injected_errors": dict(injected),
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
@@ -0,0 +1,110 @@
+"""
+Frame Replay Harness
+
+Drives the bot's per-session processors (transcript logging, response
+tracking, IntelligenceExtractor and the chip tool handler) from a frame
+recording, with a fake RTVI sink in place of the Daily transport, so they
+can be measured without a live room or Gemini.
+
+Frames are dispatched straight through the FrameObserver's handlers (no
+pipeline, no pacing), so timings are the processors' own cost.
+"""
+
+import os
+import sys
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipecat.frames.frames import InterimTranscriptionFrame, TranscriptionFrame  # noqa: E402
+
+from bot import ChipToolHandler, ResponseTracker, log_transcription  # noqa: E402
+from intelligence import IntelligenceExtractor  # noqa: E402
+from observer import FrameObserver  # noqa: E402
+from outbound import OutboundChannel  # noqa: E402
+from recording import load_recording, to_frames  # noqa: E402
+
+
+class FakeRTVI:
+    """Stands in for RTVIProcessor: keeps every server message, with an optional send delay"""
+
+    def __init__(self, send_delay: float = 0.0):
+        self.send_delay = send_delay
+        self.messages: List[Dict[str, Any]] = []
+
+    async def send_server_message(self, message: Dict[str, Any]):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.messages.append(message)
+
+
+async def _ack(result):
+    pass
+
+
+def frame_kind(item: Any) -> str:
+    """Short label for per-kind timings"""
+    return "tool" if isinstance(item, dict) else type(item).__name__
+
+
+class ReplaySession:
+    """
+    One bot session's processors, wired as bot.main() wires them.
+
+    Args:
+        extract: Also run the keyword IntelligenceExtractor (LOCAL_CHIP_EXTRACTION)
+        ack_first: Ack chip tool calls before delivery (CHIP_ACK_FIRST)
+        send_delay: Seconds each fake RTVI send takes
+    """
+
+    def __init__(self, user_id: str = "replay", extract: bool = True, ack_first: bool = True, send_delay: float = 0.0):
+        self.rtvi = FakeRTVI(send_delay)
+        self.outbound = OutboundChannel(self.rtvi.send_server_message)
+        self.chip_handler = ChipToolHandler(self.outbound, ack_first=ack_first)
+
+        self.observer = FrameObserver()
+        self.observer.ignore(InterimTranscriptionFrame)
+        self.observer.on(TranscriptionFrame, log_transcription, upstream=True)
+        ResponseTracker().register(self.observer)
+        self.extractor = None
+        if extract:
+            self.extractor = IntelligenceExtractor(user_id, self.rtvi, outbound=self.outbound)
+            self.extractor.register(self.observer)
+
+    async def replay(
+        self,
+        frames: List[Tuple[float, Any]],
+        timings: Optional[List[Tuple[str, float]]] = None,
+    ) -> float:
+        """
+        Feed every frame through the session and flush the outbound queue.
+
+        Appends (kind, seconds) per frame to `timings` if given; returns
+        the wall time of the dispatch loop in seconds.
+        """
+        observer = self.observer
+        chip_handler = self.chip_handler
+        perf_counter = time.perf_counter
+        self.outbound.start()
+
+        started = perf_counter()
+        for _, item in frames:
+            frame_started = perf_counter()
+            if isinstance(item, dict):
+                await chip_handler(item["name"], item["id"], item["args"], None, None, _ack)
+            else:
+                await observer.dispatch(item)
+            if timings is not None:
+                timings.append((frame_kind(item), perf_counter() - frame_started))
+        elapsed = perf_counter() - started
+
+        await self.outbound.stop()
+        return elapsed
+
+
+def load_frames(path: str) -> Tuple[Dict[str, Any], List[Tuple[float, Any]]]:
+    """Load a recording and build its frames once, for reuse across sessions"""
+    header, events = load_recording(path)
+    return header, list(to_frames(events))
@@ -11,13 +11,16 @@ import os
 import sys
 import asyncio
 import uuid
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
 import httpx
 from dotenv import load_dotenv
 
 from pipecat.frames.frames import (
-    Frame,
     TextFrame,
     TranscriptionFrame,
+    InterimTranscriptionFrame,
     LLMFullResponseStartFrame,
     LLMFullResponseEndFrame,
     LLMMessagesUpdateFrame,
@@ -25,15 +28,70 @@ from pipecat.frames.frames import (
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineTask, PipelineParams
-from pipecat.processors.frame_processor import FrameProcessor, FrameDirection
 from pipecat.processors.aggregators.llm_context import LLMContext
 from pipecat.processors.aggregators.llm_response_universal import LLMContextAggregatorPair
 from pipecat.processors.frameworks.rtvi import RTVIProcessor
 from pipecat.transports.daily.transport import DailyTransport, DailyParams
 from pipecat.services.google.gemini_live.llm import GeminiLiveLLMService
 
+import daily_client
+from daily_client import DailyAPIError, DailyClient
+from outbound import OutboundChannel
+from metrics import ToolCallTimer
+from observer import FrameObserver
+from session_metrics import SessionMetrics
+from lifecycle import SessionLifecycle
+from persistence import SessionWriter, get_sink
+from matching import CandidatePool
+from match_preview import MatchPreview
+from recording import FrameRecorder
+from intelligence import IntelligenceExtractor
+from agent_logging import configure_logging, get_logger, get_transcript_logger, set_session
+
 load_dotenv()
 
+logger = get_logger("bot")
+transcript_log = get_transcript_logger()
+
+# Acknowledge show_intelligence_chip to Gemini before delivering the chip
+# (set to "false" to ack only after the client has been sent the chip)
+CHIP_ACK_FIRST = os.getenv("CHIP_ACK_FIRST", "true").lower() != "false"
+
+# Also run the keyword-based IntelligenceExtractor alongside Gemini's chip tool
+LOCAL_CHIP_EXTRACTION = os.getenv("LOCAL_CHIP_EXTRACTION", "false").lower() == "true"
+
+# Agent server that aggregates voice latency metrics (empty to disable pushing)
+AGENT_SERVER_URL = os.getenv("AGENT_SERVER_URL", "http://localhost:8000")
+METRICS_PUSH_INTERVAL = float(os.getenv("METRICS_PUSH_INTERVAL", "10"))
+METRICS_PUSH_URL = f"{AGENT_SERVER_URL.rstrip('/')}/sessions/metrics" if AGENT_SERVER_URL else None
+
+# Candidate profiles to rank live as chips arrive (JSON list of profiles with "id";
+# empty = no MATCH_PREVIEW messages), candidates per preview, and seconds between previews
+MATCH_CANDIDATES_FILE = os.getenv("MATCH_CANDIDATES_FILE", "")
+MATCH_PREVIEW_K = int(os.getenv("MATCH_PREVIEW_K", "5"))
+MATCH_PREVIEW_INTERVAL = float(os.getenv("MATCH_PREVIEW_INTERVAL", "3"))
+
+# Seconds Brea's greeting waits for the user's stored profile before starting fresh
+PROFILE_FETCH_TIMEOUT = float(os.getenv("PROFILE_FETCH_TIMEOUT", "2"))
+
+# Directory to save each session's frame timeline to (empty = don't record)
+RECORD_FRAMES_DIR = os.getenv("RECORD_FRAMES_DIR", "")
+
+# Where transcripts and chips are persisted (empty = off; see persistence.py),
+# how often buffered records are flushed, and how many trigger an early flush
+PERSISTENCE_URL = os.getenv("PERSISTENCE_URL", "")
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "5"))
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "50"))
+
+# Session limits in seconds (0 = off): the user never joins, nobody speaks, hard cap
+BOT_JOIN_TIMEOUT_SECONDS = float(os.getenv("BOT_JOIN_TIMEOUT_SECONDS", "60"))
+BOT_IDLE_TIMEOUT_SECONDS = float(os.getenv("BOT_IDLE_TIMEOUT_SECONDS", "120"))
+BOT_MAX_SESSION_SECONDS = float(os.getenv("BOT_MAX_SESSION_SECONDS", "1800"))
+
+# Load testing: skip Daily and Gemini, hold the session open for a fixed time, then clean up
+BOT_STUB = os.getenv("BOT_STUB", "false").lower() == "true"
+BOT_STUB_SESSION_SECONDS = float(os.getenv("BOT_STUB_SESSION_SECONDS", "30"))
+
 # Brea's personality and behavior - includes tool usage instructions
 BREA_SYSTEM_INSTRUCTION = """You are Brea, a professional dating liaison having a real-time voice conversation.
 
@@ -87,6 +145,39 @@ NEVER:
 
 Remember: You're a friend who happens to be really good at matchmaking, not a therapist or life coach. Keep it natural and flowing."""
 
+GREETING_PROMPT = "Start the conversation. Introduce yourself briefly as Brea and ask me one thing I absolutely won't tolerate in a partner."
+
+
+def greeting_prompt(profile: Optional[Dict[str, Any]]) -> str:
+    """Opening turn: a fresh interview, or for a returning user one that skips what's known"""
+    if not profile:
+        return GREETING_PROMPT
+
+    known = []
+    if profile.get("dealbreakers"):
+        known.append("Dealbreakers: " + ", ".join(profile["dealbreakers"]))
+    if profile.get("values"):
+        known.append("Values: " + ", ".join(profile["values"]))
+    tags = {tag: value for tag, value in (profile.get("personalityTags") or {}).items() if value}
+    if tags:
+        known.append("Personality: " + ", ".join(f"{tag} {value}" for tag, value in tags.items()))
+    gaps = [gap["question"] for gap in profile.get("knowledgeGaps") or [] if gap.get("question")]
+    if not known and not gaps:
+        return GREETING_PROMPT
+
+    lines = ["Start the conversation. We've talked before."]
+    if known:
+        lines.append("What you already know about me (don't ask about these again or show chips for them):")
+        lines.extend(f"- {line}" for line in known)
+    if gaps:
+        lines.append("Open questions from last time:")
+        lines.extend(f"- {question}" for question in gaps)
+    lines.append(
+        "Welcome me back briefly as Brea, mention one thing you remember, "
+        "and ask me about something you don't know yet."
+    )
+    return "\n".join(lines)
+
 
 # Tool definition for intelligence chip extraction using Pipecat schemas
 from pipecat.adapters.schemas.tools_schema import ToolsSchema
@@ -115,56 +206,181 @@ CHIP_FUNCTION = FunctionSchema(
 INTELLIGENCE_CHIP_TOOLS = ToolsSchema(standard_tools=[CHIP_FUNCTION])
 
 
-class TranscriptionLogger(FrameProcessor):
-    """Logs transcriptions for debugging"""
+async def fetch_profile(user_id: str, client: Optional[httpx.AsyncClient] = None) -> Optional[Dict[str, Any]]:
+    """The user's stored profile from the agent server's cache, or None (new user, or unavailable)"""
+    if not AGENT_SERVER_URL:
+        return None
+    url = f"{AGENT_SERVER_URL.rstrip('/')}/users/{quote(user_id, safe='')}/profile"
+    try:
+        if client:
+            response = await client.get(url, timeout=PROFILE_FETCH_TIMEOUT)
+        else:
+            async with httpx.AsyncClient(timeout=PROFILE_FETCH_TIMEOUT) as client:
+                response = await client.get(url)
+        response.raise_for_status()
+        return response.json().get("profile")
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Couldn't fetch the user's profile, starting fresh: %s", e)
+        return None
+
+
+_candidate_pools: Dict[str, asyncio.Future] = {}
 
-    async def process_frame(self, frame: Frame, direction: FrameDirection):
-        await super().process_frame(frame, direction)
 
-        if isinstance(frame, TranscriptionFrame):
-            print(f"[USER] {frame.text}")
+def load_candidate_pool(path: str) -> asyncio.Future:
+    """The candidate pool in `path`, loaded once per process off the event loop"""
+    if path not in _candidate_pools:
+        _candidate_pools[path] = asyncio.ensure_future(asyncio.to_thread(CandidatePool.from_file, path))
+    # Shielded: one session being cancelled must not cancel the load for the others
+    return asyncio.shield(_candidate_pools[path])
 
-        await self.push_frame(frame, direction)
 
+async def log_transcription(frame: TranscriptionFrame):
+    """Logs user transcriptions for debugging"""
+    transcript_log.info(frame.text, extra={"data": {"speaker": "user"}})
 
-class ResponseLogger(FrameProcessor):
+
+class ResponseTracker:
     """Logs Brea's responses and detects conversation end"""
 
     def __init__(self, on_conversation_end=None):
-        super().__init__()
         self._current_response = []
         self._on_conversation_end = on_conversation_end
 
-    async def process_frame(self, frame: Frame, direction: FrameDirection):
-        await super().process_frame(frame, direction)
+    def register(self, observer: FrameObserver):
+        observer.on(LLMFullResponseStartFrame, self.on_response_start)
+        observer.on(TextFrame, self.on_text)
+        observer.on(LLMFullResponseEndFrame, self.on_response_end)
 
-        if isinstance(frame, LLMFullResponseStartFrame):
-            self._current_response = []
-        elif isinstance(frame, TextFrame):
-            self._current_response.append(frame.text)
-        elif isinstance(frame, LLMFullResponseEndFrame):
-            full_response = "".join(self._current_response)
-            if full_response.strip():
-                print(f"[BREA] {full_response}")
-                if "talk soon" in full_response.lower():
-                    print("[SESSION] Brea signed off - ending conversation")
-                    if self._on_conversation_end:
-                        asyncio.create_task(self._on_conversation_end())
-            self._current_response = []
+    async def on_response_start(self, frame: LLMFullResponseStartFrame):
+        self._current_response = []
 
-        await self.push_frame(frame, direction)
+    async def on_text(self, frame: TextFrame):
+        self._current_response.append(frame.text)
+
+    async def on_response_end(self, frame: LLMFullResponseEndFrame):
+        full_response = "".join(self._current_response)
+        if full_response.strip():
+            transcript_log.info(full_response, extra={"data": {"speaker": "brea"}})
+            if "talk soon" in full_response.lower():
+                logger.info("Brea signed off - ending conversation")
+                if self._on_conversation_end:
+                    asyncio.create_task(self._on_conversation_end())
+        self._current_response = []
 
 
-async def main(room_url: str, user_id: str):
+class ChipToolHandler:
+    """
+    Handles show_intelligence_chip calls from Gemini.
+
+    Chips are stored for the session summary and queued on the outbound
+    channel; with ack_first, Gemini gets its result before any I/O.
+    """
+
+    def __init__(
+        self,
+        outbound: OutboundChannel,
+        session_metrics: Optional[SessionMetrics] = None,
+        recorder: Optional[FrameRecorder] = None,
+        ack_first: bool = CHIP_ACK_FIRST,
+        writer: Optional[SessionWriter] = None,
+        preview: Optional[MatchPreview] = None,
+    ):
+        self.outbound = outbound
+        self.session_metrics = session_metrics
+        self.recorder = recorder
+        self.writer = writer
+        self.preview = preview
+        self.ack_first = ack_first
+        # received -> acked -> delivered timings for each chip tool call
+        self.tool_timer = ToolCallTimer()
+        # Store collected chips for this session
+        self.collected_chips = []
+
+    def deliver(self, tool_call_id: str, chip_data: dict) -> asyncio.Future:
+        """Store and queue a chip; the returned future resolves once it is sent"""
+        delivered = asyncio.get_running_loop().create_future()
+
+        def on_sent(error):
+            self.tool_timer.delivered(tool_call_id, error)
+            if error is not None:
+                logger.warning("Failed to deliver chip %s: %s", chip_data["payload"]["label"], error)
+            if not delivered.done():
+                delivered.set_result(error)
+
+        logger.info("Chip detected", extra={"data": chip_data["payload"]})
+
+        # Store for session summary, and persist behind the conversation
+        self.collected_chips.append(chip_data["payload"])
+        if self.writer:
+            self.writer.add_chip(chip_data["payload"])
+
+        # Queue for the client via RTVI server message (this is what the iOS SDK listens to)
+        self.outbound.put(chip_data, on_sent=on_sent)
+        # After the chip, so a preview it triggers never overtakes it
+        if self.preview:
+            self.preview.on_chip(chip_data["payload"]["category"], chip_data["payload"]["label"])
+        return delivered
+
+    async def __call__(self, function_name, tool_call_id, args, llm, context, result_callback):
+        """Handle the show_intelligence_chip function call from Gemini"""
+        self.tool_timer.received(tool_call_id)
+        if self.recorder:
+            self.recorder.tool_call(tool_call_id, function_name, args)
+        chip_data = {
+            "type": "CHIP",
+            "payload": {
+                "id": str(uuid.uuid4()),
+                "category": args.get("category", "Unknown"),
+                "label": args.get("text", ""),
+                "emoji": args.get("emoji", ""),
+                "confidence": 1.0,
+            }
+        }
+
+        if self.ack_first:
+            # Tell Gemini the tool succeeded before any I/O so it keeps talking;
+            # delivery failures are reported from on_sent
+            await result_callback({"status": "displayed"})
+            turnaround_ms = self.tool_timer.acked(tool_call_id)
+            self.deliver(tool_call_id, chip_data)
+        else:
+            await self.deliver(tool_call_id, chip_data)
+            await result_callback({"status": "displayed"})
+            turnaround_ms = self.tool_timer.acked(tool_call_id)
+        if turnaround_ms is not None and self.session_metrics:
+            self.session_metrics.observe("tool_call", turnaround_ms)
+
+
+async def main(
+    room_url: str,
+    user_id: str,
+    http_client: Optional[httpx.AsyncClient] = None,
+    hosted: bool = False,
+    daily: Optional[DailyClient] = None,
+):
     """
     Main bot entry point.
 
     Args:
         room_url: Daily room URL to join
         user_id: User ID for this session
+        http_client: Shared client for metrics reports (bot host)
+        hosted: Running as one of many sessions in a bot host (bot_host.py):
+            leave signals to the host and collect garbage when done
+        daily: Shared Daily REST client for room deletion (bot host); a
+            standalone bot makes its own
     """
-    print(f"Starting Brea bot for user {user_id}")
-    print(f"Joining room: {room_url}")
+    room_name = room_url.rstrip("/").split("/")[-1]
+    set_session(user_id=user_id, room=room_name)
+    logger.info("Starting Brea bot", extra={"data": {"room_url": room_url}})
+
+    if BOT_STUB:
+        await run_stub_session(room_url, room_name, user_id, http_client, daily)
+        return
+
+    # What earlier sessions learned about the user, fetched while we join the room
+    profile_fetch = asyncio.create_task(fetch_profile(user_id, http_client))
 
     # Initialize Daily transport
     transport = DailyTransport(
@@ -179,42 +395,44 @@ async def main(room_url: str, user_id: str):
         ),
     )
 
-    # Store collected chips for this session
-    collected_chips = []
-
     # Create RTVI processor for sending messages to client
     rtvi = RTVIProcessor()
 
-    # Function call handler for intelligence chips
-    async def handle_show_chip(function_name, tool_call_id, args, llm, context, result_callback):
-        """Handle the show_intelligence_chip function call from Gemini"""
-        chip_data = {
-            "type": "CHIP",
-            "payload": {
-                "id": str(uuid.uuid4()),
-                "category": args.get("category", "Unknown"),
-                "label": args.get("text", ""),
-                "emoji": args.get("emoji", ""),
-                "confidence": 1.0,
-            }
-        }
-
-        print(f"✨ [CHIP] {chip_data['payload']['emoji']} {chip_data['payload']['category']}: {chip_data['payload']['label']}")
+    # Chips go out through a queue so a slow client never stalls Gemini or the pipeline
+    outbound = OutboundChannel(rtvi.send_server_message)
 
-        # Store for session summary
-        collected_chips.append(chip_data["payload"])
+    # Greeting/response/tool latency and session duration, pushed to the agent server
+    session_metrics = SessionMetrics(
+        room_name,
+        user_id,
+        push_url=METRICS_PUSH_URL,
+        push_interval=METRICS_PUSH_INTERVAL,
+        client=http_client,
+    )
 
-        # Send to client via RTVI server message (this is what the iOS SDK listens to)
-        try:
-            await rtvi.send_server_message(chip_data)
-            print(f"[CHIP] Sent to client via RTVI")
-        except Exception as e:
-            print(f"[CHIP] Failed to send: {e}")
-            import traceback
-            traceback.print_exc()
+    # Optional frame timeline for offline replay (benchmarks/bench_replay.py)
+    recorder = FrameRecorder({"user_id": user_id, "room": room_name}) if RECORD_FRAMES_DIR else None
+
+    # Transcript turns and chips, buffered and written behind to PERSISTENCE_URL
+    sink = get_sink(PERSISTENCE_URL)
+    writer = SessionWriter(
+        sink,
+        room_name,
+        user_id,
+        flush_interval=PERSIST_FLUSH_INTERVAL,
+        batch_size=PERSIST_BATCH_SIZE,
+    ) if sink else None
+
+    # Live shortlist of candidates, re-ranked as chips arrive
+    preview = None
+    if MATCH_CANDIDATES_FILE:
+        preview = MatchPreview(outbound, k=MATCH_PREVIEW_K, min_interval=MATCH_PREVIEW_INTERVAL)
+        preview.start(load_candidate_pool(MATCH_CANDIDATES_FILE), exclude_ids=[user_id])
 
-        # Tell Gemini the tool succeeded (so it keeps talking)
-        await result_callback({"status": "displayed"})
+    # Function call handler for intelligence chips
+    handle_show_chip = ChipToolHandler(
+        outbound, session_metrics=session_metrics, recorder=recorder, writer=writer, preview=preview
+    )
 
     # Initialize Gemini Live LLM with tools
     llm = GeminiLiveLLMService(
@@ -231,9 +449,30 @@ async def main(room_url: str, user_id: str):
     context = LLMContext()
     context_aggregator = LLMContextAggregatorPair(context)
 
-    # Initialize processors
-    transcription_logger = TranscriptionLogger()
-    response_logger = ResponseLogger()
+    # One observer stage routes frames to logging, sign-off detection and chip extraction.
+    # Gemini Live pushes user transcriptions upstream, so those handlers (upstream=True)
+    # get them from the observer's tap in front of the LLM
+    observer = FrameObserver()
+    observer.ignore(InterimTranscriptionFrame)
+    observer.on(TranscriptionFrame, log_transcription, upstream=True)
+    response_tracker = ResponseTracker()
+    response_tracker.register(observer)
+    session_metrics.register(observer)
+    lifecycle = SessionLifecycle(
+        join_timeout=BOT_JOIN_TIMEOUT_SECONDS,
+        idle_timeout=BOT_IDLE_TIMEOUT_SECONDS,
+        max_duration=BOT_MAX_SESSION_SECONDS,
+        on_expire=lambda reason: task.cancel(),
+    )
+    lifecycle.register(observer)
+    if writer:
+        writer.register(observer)
+    if recorder:
+        recorder.register(observer)
+    if LOCAL_CHIP_EXTRACTION:
+        IntelligenceExtractor(
+            user_id, rtvi, outbound=outbound, on_chip=preview.on_chip if preview else None
+        ).register(observer)
 
     # Build the pipeline (RTVI processor handles client messaging)
     pipeline = Pipeline(
@@ -241,9 +480,9 @@ async def main(room_url: str, user_id: str):
             transport.input(),
             rtvi,  # RTVI processor for sending messages to client
             context_aggregator.user(),
+            observer.upstream_tap(),  # user transcriptions, pushed upstream by the LLM
             llm,
-            transcription_logger,
-            response_logger,
+            observer,
             context_aggregator.assistant(),
             transport.output(),
         ]
@@ -260,22 +499,30 @@ async def main(room_url: str, user_id: str):
     # Session end callback
     async def end_session():
         """End the session after Brea says goodbye"""
-        print("[SESSION] Waiting 2 seconds for audio to finish...")
+        # The shortlist is current already; send it while Brea's goodbye plays
+        if preview:
+            shortlist = preview.finish()
+            logger.info("Final match shortlist", extra={"data": {"candidates": shortlist}})
+
+        logger.info("Waiting 2 seconds for audio to finish")
         await asyncio.sleep(2)
 
         # Log collected intelligence
-        if collected_chips:
-            print(f"\n[SESSION] Collected {len(collected_chips)} intelligence chips:")
-            for chip in collected_chips:
-                print(f"  {chip['emoji']} {chip['category']}: {chip['label']}")
+        if handle_show_chip.collected_chips:
+            logger.info(
+                "Collected %d intelligence chips",
+                len(handle_show_chip.collected_chips),
+                extra={"data": {"chips": handle_show_chip.collected_chips}},
+            )
 
-        print("[SESSION] Ending session...")
+        logger.info("Ending session")
         await task.cancel()
 
-    response_logger._on_conversation_end = end_session
+    response_tracker._on_conversation_end = end_session
 
-    # Track greeting state
+    # Track greeting state, and why the session ended (for the metrics report)
     greeted = False
+    end_reason = "completed"
 
     @transport.event_handler("on_participant_joined")
     async def on_participant_joined(transport, participant, *args):
@@ -284,75 +531,147 @@ async def main(room_url: str, user_id: str):
         participant_id = participant.get("id", "unknown")
         is_local = participant.get("info", {}).get("isLocal", False)
 
-        print(f"Participant joined: {participant_id}, isLocal: {is_local}")
+        logger.info("Participant joined: %s, isLocal: %s", participant_id, is_local)
 
         if is_local or greeted:
             return
 
         greeted = True
-        print("Triggering Brea's greeting...")
+        session_metrics.participant_joined()
+        lifecycle.participant_joined()
+        profile = await profile_fetch
+        logger.info("Triggering Brea's greeting", extra={"data": {"returning_user": bool(profile)}})
 
         await task.queue_frame(LLMMessagesUpdateFrame(
-            messages=[{"role": "user", "content": "Start the conversation. Introduce yourself briefly as Brea and ask me one thing I absolutely won't tolerate in a partner."}],
+            messages=[{"role": "user", "content": greeting_prompt(profile)}],
             run_llm=True
         ))
 
     @transport.event_handler("on_participant_left")
     async def on_participant_left(transport, participant, reason):
         """When the user leaves, end the session"""
-        print(f"Participant left: {participant.get('id', 'unknown')}, reason: {reason}")
+        nonlocal end_reason
+        logger.info("Participant left: %s, reason: %s", participant.get("id", "unknown"), reason)
+        end_reason = "user_left"
         await task.cancel()
 
     @transport.event_handler("on_call_state_updated")
     async def on_call_state_updated(transport, state):
         """Monitor call state changes"""
-        print(f"Call state: {state}")
+        nonlocal end_reason
+        logger.info("Call state: %s", state)
         if state == "left":
+            # Ejected at room expiry, or the call dropped
+            end_reason = "call_left"
             await task.cancel()
 
-    # Run the pipeline
-    runner = PipelineRunner()
+    # Run the pipeline. SIGTERM (scheduler/reaper) cancels it like SIGINT,
+    # so the room is still deleted; a bot host handles signals itself.
+    # A bot host's other sessions keep running after this one, so its
+    # pipeline cycles are collected now rather than at process exit
+    runner = PipelineRunner(handle_sigint=not hosted, handle_sigterm=not hosted, force_gc=hosted)
+    outbound.start()
+    session_metrics.start()
+    lifecycle.start()
+    if writer:
+        writer.start()
 
     try:
         await runner.run(task)
     except asyncio.CancelledError:
-        print("Bot task cancelled")
+        logger.info("Bot task cancelled")
     except LookupError as e:
         if "punkt" in str(e).lower() or "nltk" in str(e).lower():
-            print(f"NLTK resource error: {e}")
-            print("Please run: python -c \"import nltk; nltk.download('punkt_tab')\"")
+            logger.error("NLTK resource error: %s", e)
+            logger.error("Please run: python -c \"import nltk; nltk.download('punkt_tab')\"")
         else:
             raise
     except Exception as e:
-        print(f"Bot error: {e}")
-        import traceback
-        traceback.print_exc()
+        end_reason = "error"
+        logger.exception("Bot error: %s", e)
     finally:
-        print(f"Bot session ended for user {user_id}")
-        await delete_room(room_url)
+        profile_fetch.cancel()
+        if preview:
+            await preview.stop()
+        await lifecycle.stop()
+        end_reason = lifecycle.end_reason or end_reason
+        await outbound.stop()
+        # Final bulk flush, whether Brea signed off or the session was cancelled
+        if writer:
+            await writer.close()
+        await session_metrics.stop(end_reason=end_reason)
+        logger.info(
+            "Bot session ended",
+            extra={
+                "data": {
+                    "end_reason": end_reason,
+                    "outbound": outbound.stats(),
+                    "tool_calls": handle_show_chip.tool_timer.stats(),
+                    "voice_metrics": session_metrics.totals,
+                }
+            },
+        )
+        if recorder:
+            path = os.path.join(RECORD_FRAMES_DIR, f"{room_name}.jsonl.gz")
+            try:
+                await asyncio.to_thread(recorder.save, path)
+            except OSError as e:
+                logger.warning("Failed to save frame recording: %s", e)
+        await delete_room(room_url, daily)
+
+
+async def run_stub_session(
+    room_url: str,
+    room_name: str,
+    user_id: str,
+    http_client: Optional[httpx.AsyncClient] = None,
+    daily: Optional[DailyClient] = None,
+):
+    """
+    Stand-in for a conversation when BOT_STUB is set.
 
+    Keeps the process, metrics heartbeat and room cleanup of a real session
+    without joining Daily or opening a Gemini Live connection.
+    """
+    session_metrics = SessionMetrics(
+        room_name,
+        user_id,
+        push_url=METRICS_PUSH_URL,
+        push_interval=METRICS_PUSH_INTERVAL,
+        client=http_client,
+    )
+    session_metrics.start()
+    end_reason = "cancelled"
+    try:
+        await asyncio.sleep(BOT_STUB_SESSION_SECONDS)
+        end_reason = "completed"
+    finally:
+        await session_metrics.stop(end_reason=end_reason)
+        logger.info("Stub session ended")
+        await delete_room(room_url, daily)
 
-async def delete_room(room_url: str):
-    """Delete the Daily room after the session ends"""
+
+async def delete_room(room_url: str, daily: Optional[DailyClient] = None):
+    """Delete the Daily room after the session ends, with `daily` or a client of its own"""
     try:
         room_name = room_url.rstrip("/").split("/")[-1]
-        api_key = os.getenv("DAILY_API_KEY")
+        if daily:
+            await daily.delete_room(room_name)
+            logger.info("Deleted room: %s", room_name)
+            return
 
-        if not api_key:
-            print("[CLEANUP] No Daily API key, skipping room deletion")
+        daily = daily_client.from_env()
+        if not daily:
+            logger.warning("No Daily API key, skipping room deletion")
             return
 
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"https://api.daily.co/v1/rooms/{room_name}",
-                headers={"Authorization": f"Bearer {api_key}"},
-            )
-            if response.status_code == 200:
-                print(f"[CLEANUP] Deleted room: {room_name}")
-            else:
-                print(f"[CLEANUP] Failed to delete room: {response.status_code}")
+        async with daily:
+            await daily.delete_room(room_name)
+            logger.info("Deleted room: %s", room_name)
+    except DailyAPIError as e:
+        logger.warning("Failed to delete room: %s", e)
     except Exception as e:
-        print(f"[CLEANUP] Error deleting room: {e}")
+        logger.exception("Error deleting room: %s", e)
 
 
 if __name__ == "__main__":
@@ -363,4 +682,8 @@ if __name__ == "__main__":
     room_url = sys.argv[1]
     user_id = sys.argv[2]
 
+    # This process owns its rotating JSON log; raw stdout/stderr go wherever the spawner sent them
+    log_dir = os.getenv("BOT_LOG_DIR") or os.path.dirname(os.path.abspath(__file__))
+    configure_logging(log_file=os.path.join(log_dir, f"bot_{user_id}.log"))
+
     asyncio.run(main(room_url, user_id))
@@ -0,0 +1,218 @@
+"""
+Bot Host
+
+Runs many bot sessions as asyncio tasks in one process, instead of one
+`python bot.py` process per conversation. Sessions share the interpreter,
+the imported pipecat/Daily/Gemini modules, the Daily SDK context, one
+HTTP client for metrics reports and one Daily REST client (connection
+pool, concurrency limit and circuit breaker) for room deletion, so each
+extra session only costs its own pipeline objects.
+
+- Each session is a task running bot.main() with its own log tags
+- An exception in one session is logged and ends only that session
+- Sessions can be cancelled one at a time; the bot's cleanup (final
+  metrics report, room deletion) still runs
+- Signals are handled by the host, not by each session's pipeline runner
+
+A native crash (e.g. in the Daily SDK) or a blocked event loop still
+affects every session on the host, and a host uses at most one core:
+cap MAX_BOT_SESSIONS per host and run one host per core.
+
+Used by node.py with BOT_HOST_MODE=tasks, or standalone:
+
+    python bot_host.py <room_url> <user_id> [<room_url> <user_id> ...]
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+from typing import Any, Dict, Optional
+
+import httpx
+
+import daily_client
+from daily_client import DailyClient
+from agent_logging import configure_logging, shutdown_logging, get_logger
+
+logger = get_logger("bot_host")
+
+
+class HostedSession:
+    """
+    A bot session running as a task in a BotHost.
+
+    Has the pid, exitcode, is_alive(), terminate() and kill() of a bot
+    process, so the SessionScheduler tracks it like one.
+    """
+
+    __slots__ = ("session_id", "user_id", "room_url", "task", "started_at", "pid", "exitcode")
+
+    def __init__(self, session_id: str, user_id: str, room_url: str, task: asyncio.Task):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.room_url = room_url
+        self.task = task
+        self.started_at = time.monotonic()
+        self.pid = os.getpid()
+        self.exitcode: Optional[int] = None  # 0 once the bot returns, 1 if it crashed or was cut short
+
+    def is_alive(self) -> bool:
+        return not self.task.done()
+
+    def terminate(self):
+        self.task.cancel()
+
+    def kill(self):
+        # A task can't be killed; cancelling again interrupts its cleanup too
+        self.task.cancel()
+
+
+class BotHost:
+    """
+    Runs bot sessions as tasks on the current event loop.
+
+    Args:
+        max_sessions: Refuse launch() beyond this many live sessions (None: no limit)
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None):
+        self.max_sessions = max_sessions
+        self._bot = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._daily: Optional[DailyClient] = None
+        self._sessions: Dict[str, HostedSession] = {}
+
+        self.launched = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.crashed = 0
+
+    async def start(self):
+        # Imported here rather than at module level so settings the caller
+        # puts in the environment first (e.g. AGENT_SERVER_URL) are seen by bot.py
+        import bot
+
+        self._bot = bot
+        self._client = httpx.AsyncClient(timeout=5.0)
+        self._daily = daily_client.from_env()
+
+    async def stop(self, timeout: float = 10.0):
+        """Cancel every session and wait up to `timeout` for their cleanup"""
+        tasks = [session.task for session in self._sessions.values()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+        if self._daily:
+            await self._daily.aclose()
+            self._daily = None
+
+    @property
+    def live(self) -> int:
+        return len(self._sessions)
+
+    def launch(self, room_url: str, user_id: str) -> HostedSession:
+        """Start a session for the room; the session id is the room name"""
+        if self.max_sessions is not None and self.live >= self.max_sessions:
+            raise RuntimeError(f"Bot host is full ({self.live} sessions)")
+
+        session_id = room_url.rstrip("/").split("/")[-1]
+        task = asyncio.create_task(self._run(room_url, user_id), name=f"bot-{session_id}")
+        session = HostedSession(session_id, user_id, room_url, task)
+        self._sessions[session_id] = session
+        task.add_done_callback(lambda done: self._finished(session, done))
+        self.launched += 1
+        return session
+
+    def cancel(self, session_id: str) -> bool:
+        """Cancel one session; its cleanup runs before the task finishes"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        self.cancelled += 1
+        session.terminate()
+        return True
+
+    async def _run(self, room_url: str, user_id: str) -> bool:
+        """Run one session; False if it crashed"""
+        # Each task runs in a copy of the launching context, so the log tags
+        # bot.main() sets stay with this session
+        try:
+            await self._bot.main(room_url, user_id, http_client=self._client, hosted=True, daily=self._daily)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.crashed += 1
+            logger.exception("Bot session crashed: %s", e)
+            return False
+        return True
+
+    def _finished(self, session: HostedSession, task: asyncio.Task):
+        # bot.main() handles its own cancellation, so a cancelled task means
+        # its cleanup was interrupted
+        session.exitcode = 0 if not task.cancelled() and task.result() else 1
+        if self._sessions.get(session.session_id) is session:
+            del self._sessions[session.session_id]
+        self.completed += 1
+        logger.info(
+            "Hosted session %s finished after %.0fs",
+            session.session_id,
+            time.monotonic() - session.started_at,
+            extra={"data": {"user_id": session.user_id, "live": self.live}},
+        )
+
+    def sessions(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            session_id: {"user_id": session.user_id, "age_seconds": round(now - session.started_at, 1)}
+            for session_id, session in self._sessions.items()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live": self.live,
+            "max_sessions": self.max_sessions,
+            "launched": self.launched,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "crashed": self.crashed,
+        }
+
+
+async def run_sessions(pairs):
+    """Host the given (room_url, user_id) sessions until they end or a signal arrives"""
+    host = BotHost()
+    await host.start()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    sessions = [host.launch(room_url, user_id) for room_url, user_id in pairs]
+    logger.info("Hosting %d sessions", len(sessions))
+    stop_wait = asyncio.create_task(stopping.wait())
+    all_done = asyncio.gather(*(s.task for s in sessions), return_exceptions=True)
+    await asyncio.wait([stop_wait, all_done], return_when=asyncio.FIRST_COMPLETED)
+    stop_wait.cancel()
+    await host.stop()
+    await asyncio.gather(all_done, return_exceptions=True)
+    logger.info("Bot host stopped", extra={"data": host.stats()})
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or len(args) % 2:
+        print("Usage: python bot_host.py <room_url> <user_id> [<room_url> <user_id> ...]")
+        sys.exit(1)
+
+    log_dir = os.getenv("BOT_LOG_DIR") or os.path.dirname(os.path.abspath(__file__))
+    configure_logging(log_file=os.path.join(log_dir, "bot_host.log"))
+    try:
+        asyncio.run(run_sessions(list(zip(args[::2], args[1::2]))))
+    finally:
+        shutdown_logging()
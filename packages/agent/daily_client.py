@@ -0,0 +1,267 @@
+"""
+Daily REST Client
+
+Single shared client for the Daily REST API, used by the agent server
+(/connect, room pool) and by each bot process (room cleanup).
+
+- Keep-alive connection pooling via one long-lived httpx.AsyncClient
+- Bounded concurrency with an asyncio semaphore
+- Retry with jittered exponential backoff on 429, 5xx and transport errors;
+  calls that are not safe to repeat (POST /rooms) only retry when Daily
+  cannot have acted on them: a 429, or a connection that never opened
+- Circuit breaker that fails fast while Daily is unhealthy
+- Per-endpoint latency histograms
+"""
+
+import os
+import time
+import random
+import asyncio
+from typing import Optional, Dict, Any, List
+
+import httpx
+
+from metrics import LatencyHistogram
+
+
+DEFAULT_API_URL = "https://api.daily.co/v1"
+
+# Transport errors raised before the request was sent, so Daily never saw it
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class DailyAPIError(RuntimeError):
+    """Raised when a Daily API call fails after retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(DailyAPIError):
+    """Raised without calling Daily while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed -> open after `failure_threshold` failed requests in a row,
+    open -> half-open after `reset_timeout` seconds (one trial request),
+    half-open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._trial_started = None
+        # half-open: let a single trial request through (re-armed if it never reported back)
+        now = time.monotonic()
+        if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+            return False
+        self._trial_started = now
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self._failures = 0
+        self._trial_started = None
+
+    def record_failure(self):
+        self._failures += 1
+        self._trial_started = None
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+class DailyClient:
+    """
+    Pooled, retrying client for the Daily REST API.
+
+    Create one per process and reuse it; call aclose() (or use it as an
+    async context manager) when done.
+    """
+
+    RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        api_key: str,
+        api_url: Optional[str] = None,
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.1,
+        backoff_cap: float = 2.0,
+        timeout: float = 10.0,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.api_url = (api_url or os.getenv("DAILY_API_URL", DEFAULT_API_URL)).rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=self.api_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+            transport=transport,
+        )
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.retries = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    # -- Endpoints ---------------------------------------------------------
+
+    async def get_domain_id(self) -> str:
+        """GET / (domain configuration), returning the domain_id"""
+        response = await self._request("GET", "/", "GET /")
+        return response.json()["domain_id"]
+
+    async def create_room(self, properties: Dict[str, Any]) -> Dict[str, Any]:
+        """POST /rooms"""
+        response = await self._request(
+            "POST", "/rooms", "POST /rooms", json={"properties": properties}
+        )
+        return response.json()
+
+    async def list_rooms(self, limit: int = 100, starting_after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """GET /rooms, one page, newest first; pass the last room's id as `starting_after` for the next"""
+        params: Dict[str, Any] = {"limit": limit}
+        if starting_after:
+            params["starting_after"] = starting_after
+        response = await self._request("GET", "/rooms", "GET /rooms", params=params)
+        return response.json().get("data", [])
+
+    async def create_meeting_token(self, properties: Dict[str, Any]) -> str:
+        """POST /meeting-tokens, returning the token string"""
+        # Minting a token creates nothing on Daily's side, so a repeat is harmless
+        response = await self._request(
+            "POST",
+            "/meeting-tokens",
+            "POST /meeting-tokens",
+            idempotent=True,
+            json={"properties": properties},
+        )
+        return response.json()["token"]
+
+    async def delete_room(self, room_name: str) -> bool:
+        """DELETE /rooms/{name}; a room that is already gone counts as deleted"""
+        try:
+            await self._request("DELETE", f"/rooms/{room_name}", "DELETE /rooms/{name}")
+        except DailyAPIError as e:
+            if e.status_code == 404:
+                return True
+            raise
+        return True
+
+    # -- Transport ---------------------------------------------------------
+
+    async def _request(
+        self, method: str, path: str, endpoint: str, idempotent: Optional[bool] = None, **kwargs
+    ) -> httpx.Response:
+        """
+        Send one request with retries.
+
+        `idempotent` defaults to True for everything but POST. Requests that
+        are not idempotent are only retried on 429 or UNSENT_ERRORS, so a
+        5xx or a dropped response never creates a second room.
+        """
+        if idempotent is None:
+            idempotent = method != "POST"
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Daily API circuit open, skipping {endpoint}")
+
+        histogram = self.histograms.setdefault(endpoint, LatencyHistogram())
+        attempt = 0
+        while True:
+            retry_after: Optional[float] = None
+            started = time.perf_counter()
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                error: DailyAPIError = DailyAPIError(f"{endpoint} failed: {e}")
+                retryable = idempotent or isinstance(e, UNSENT_ERRORS)
+            else:
+                histogram.observe((time.perf_counter() - started) * 1000)
+                if response.status_code < 400:
+                    self.breaker.record_success()
+                    return response
+                error = DailyAPIError(
+                    f"{endpoint} returned {response.status_code}: {response.text}",
+                    status_code=response.status_code,
+                )
+                if response.status_code not in self.RETRY_STATUS:
+                    # Client errors mean Daily is healthy; don't trip the breaker
+                    self.breaker.record_success()
+                    raise error
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                retryable = idempotent or response.status_code == 429
+
+            if not retryable or attempt >= self.max_retries:
+                self.breaker.record_failure()
+                raise error
+
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After up to the cap"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state, retry count and per-endpoint latency histograms"""
+        return {
+            "circuit": self.breaker.state,
+            "retries": self.retries,
+            "endpoints": {name: h.to_dict() for name, h in self.histograms.items()},
+        }
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def from_env(**kwargs) -> Optional[DailyClient]:
+    """Build a client from DAILY_API_KEY / DAILY_API_URL, or None if unconfigured"""
+    api_key = os.getenv("DAILY_API_KEY")
+    if not api_key:
+        return None
+    return DailyClient(api_key, **kwargs)
@@ -0,0 +1,289 @@
+"""
+Node Dispatcher
+
+Places bot sessions on remote worker nodes (see node.py) instead of
+spawning them on the agent server's own host.
+
+- Nodes register and report free capacity with periodic heartbeats
+- Each session goes to the least-loaded node with room for it; a node
+  that refuses (503) is skipped in favour of the next one
+- Capacity handed out since a node's last heartbeat is counted against
+  it, so a burst doesn't pile onto one node between heartbeats
+- A node that misses heartbeats for `node_timeout` is marked lost and
+  its sessions failed
+- Sessions a node stops reporting are treated as ended
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import httpx
+
+from metrics import LatencyHistogram
+from agent_logging import get_logger
+
+logger = get_logger("dispatcher")
+
+
+# Header carrying NODE_SHARED_SECRET between the agent server and its nodes
+SECRET_HEADER = "X-Brea-Node-Secret"
+
+
+class NodeUnavailableError(RuntimeError):
+    """Raised when no node can take a session"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Node:
+    __slots__ = ("node_id", "url", "capacity", "free", "inflight", "cpu_percent", "last_seen", "lost")
+
+    def __init__(self, node_id: str, url: str):
+        self.node_id = node_id
+        self.url = url
+        self.capacity = 0
+        self.free = 0
+        self.inflight = 0  # sessions placed since the last heartbeat
+        self.cpu_percent: Optional[float] = None
+        self.last_seen = 0.0
+        self.lost = False
+
+    @property
+    def available(self) -> int:
+        return self.free - self.inflight
+
+    @property
+    def load(self) -> float:
+        if self.capacity <= 0:
+            return 1.0
+        return 1 - self.available / self.capacity
+
+
+class _DispatchedSession:
+    __slots__ = ("session_id", "user_id", "room_url", "node_id", "status", "dispatched_at")
+
+    def __init__(self, session_id: str, user_id: str, room_url: str, node_id: str):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.room_url = room_url
+        self.node_id = node_id
+        self.status = "starting"
+        self.dispatched_at = time.monotonic()
+
+
+# Called with (session_id, room_url, reason) when a session is marked failed
+FailureCallback = Callable[[str, str, str], None]
+
+
+class NodeDispatcher:
+    """
+    Registry of worker nodes and placement of sessions onto them.
+
+    Args:
+        node_timeout: Seconds without a heartbeat before a node is lost
+        dispatch_timeout: Seconds to wait for a node to accept a session
+        retry_after: Retry-After seconds suggested when no node has room
+        report_grace: Seconds a new session may be missing from heartbeats
+        secret: Shared secret sent to nodes (and expected on heartbeats)
+        on_session_failed: Called for each session lost with its node
+        transport: httpx transport override (tests)
+    """
+
+    def __init__(
+        self,
+        node_timeout: float = 15.0,
+        dispatch_timeout: float = 5.0,
+        retry_after: int = 10,
+        report_grace: float = 10.0,
+        secret: Optional[str] = None,
+        on_session_failed: Optional[FailureCallback] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.node_timeout = node_timeout
+        self.dispatch_timeout = dispatch_timeout
+        self.retry_after = retry_after
+        self.report_grace = report_grace
+        self.secret = secret
+        self.on_session_failed = on_session_failed
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._nodes: Dict[str, _Node] = {}
+        self._sessions: Dict[str, _DispatchedSession] = {}
+        self.recent_failures: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self.dispatched = 0
+        self.refused = 0
+        self.ended = 0
+        self.failed = 0
+        self.dispatch_latency = LatencyHistogram()
+
+    async def start(self):
+        headers = {SECRET_HEADER: self.secret} if self.secret else None
+        self._client = httpx.AsyncClient(
+            timeout=self.dispatch_timeout, headers=headers, transport=self._transport
+        )
+        self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def heartbeat(self, report: Dict[str, Any]):
+        """
+        Record a node's heartbeat.
+
+        `report` has node_id, url, capacity, free, and the session ids
+        currently live on the node (plus optional cpu_percent).
+        """
+        node = self._nodes.get(report["node_id"])
+        if node is None:
+            node = self._nodes[report["node_id"]] = _Node(report["node_id"], report["url"])
+            logger.info("Node %s registered at %s", node.node_id, node.url)
+        elif node.lost:
+            logger.info("Node %s is back", node.node_id)
+        node.url = report["url"]
+        node.capacity = report["capacity"]
+        node.free = report["free"]
+        node.cpu_percent = report.get("cpu_percent")
+        node.inflight = 0
+        node.last_seen = time.monotonic()
+        node.lost = False
+
+        live = set(report.get("sessions", ()))
+        for session in [s for s in self._sessions.values() if s.node_id == node.node_id]:
+            if session.session_id in live:
+                session.status = "live"
+            elif node.last_seen - session.dispatched_at > self.report_grace:
+                del self._sessions[session.session_id]
+                self.ended += 1
+
+    def has_session(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def has_capacity(self) -> bool:
+        return any(not node.lost and node.available > 0 for node in self._nodes.values())
+
+    def _candidates(self) -> List[_Node]:
+        """Live nodes with room, least loaded first"""
+        nodes = [node for node in self._nodes.values() if not node.lost and node.available > 0]
+        return sorted(nodes, key=lambda node: (node.load, -node.available))
+
+    async def dispatch(self, room_url: str, user_id: str, session_id: str) -> str:
+        """
+        Start a session on the least-loaded node and return its node_id.
+
+        Returns once a node has accepted the session (not when the bot has
+        joined the room).
+        """
+        started = time.perf_counter()
+        for node in self._candidates():
+            node.inflight += 1
+            try:
+                response = await self._client.post(
+                    f"{node.url}/sessions",
+                    json={"room_url": room_url, "user_id": user_id, "session_id": session_id},
+                )
+            except httpx.HTTPError as e:
+                logger.warning("Node %s did not accept session: %s", node.node_id, e)
+                node.inflight -= 1
+                continue
+
+            if response.status_code == 503:
+                # Saturated: treat as full until its next heartbeat
+                self.refused += 1
+                node.inflight = max(node.inflight, node.free)
+                continue
+            if response.status_code >= 400:
+                node.inflight -= 1
+                logger.warning(
+                    "Node %s rejected session: %s %s", node.node_id, response.status_code, response.text
+                )
+                continue
+
+            self._sessions[session_id] = _DispatchedSession(session_id, user_id, room_url, node.node_id)
+            self.dispatched += 1
+            self.dispatch_latency.observe((time.perf_counter() - started) * 1000)
+            return node.node_id
+
+        raise NodeUnavailableError("No bot node has capacity", self.retry_after)
+
+    def _mark_lost(self, node: _Node):
+        node.lost = True
+        node.free = 0
+        node.inflight = 0
+        lost = [s for s in self._sessions.values() if s.node_id == node.node_id]
+        logger.warning("Node %s lost; failing %d sessions", node.node_id, len(lost))
+        for session in lost:
+            del self._sessions[session.session_id]
+            self.failed += 1
+            self.recent_failures.append({
+                "session_id": session.session_id,
+                "user_id": session.user_id,
+                "node_id": node.node_id,
+                "reason": "node lost",
+                "at": time.time(),
+            })
+            if self.on_session_failed:
+                try:
+                    self.on_session_failed(session.session_id, session.room_url, "node lost")
+                except Exception as e:
+                    logger.exception("Session failure callback failed: %s", e)
+
+    def sweep(self):
+        """Mark nodes that stopped heartbeating as lost"""
+        cutoff = time.monotonic() - self.node_timeout
+        for node in self._nodes.values():
+            if not node.lost and node.last_seen < cutoff:
+                self._mark_lost(node)
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(min(self.node_timeout / 3, 5.0))
+            self.sweep()
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        sessions_per_node: Dict[str, int] = {}
+        for session in self._sessions.values():
+            sessions_per_node[session.node_id] = sessions_per_node.get(session.node_id, 0) + 1
+        return [
+            {
+                "node_id": node.node_id,
+                "url": node.url,
+                "lost": node.lost,
+                "capacity": node.capacity,
+                "free": node.free,
+                "inflight": node.inflight,
+                "sessions": sessions_per_node.get(node.node_id, 0),
+                "cpu_percent": node.cpu_percent,
+                "last_seen_seconds": round(now - node.last_seen, 1),
+            }
+            for node in self._nodes.values()
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "nodes": len([node for node in self._nodes.values() if not node.lost]),
+            "lost_nodes": len([node for node in self._nodes.values() if node.lost]),
+            "capacity": sum(node.capacity for node in self._nodes.values() if not node.lost),
+            "free": sum(max(0, node.available) for node in self._nodes.values() if not node.lost),
+            "sessions": len(self._sessions),
+            "dispatched": self.dispatched,
+            "refused": self.refused,
+            "ended": self.ended,
+            "failed": self.failed,
+            "dispatch_latency": self.dispatch_latency.to_dict(),
+        }
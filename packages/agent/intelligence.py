@@ -7,7 +7,8 @@ conversation and sends them to the client via Daily data channel.
 
 import json
 import re
-from typing import Optional, List, Dict, Any
+from collections import deque
+from typing import Optional, List, Dict, Any, Tuple, Callable
 
 from pipecat.frames.frames import (
     Frame,
@@ -17,10 +18,17 @@ from pipecat.frames.frames import (
 )
 from pipecat.processors.frame_processor import FrameProcessor, FrameDirection
 
+from outbound import OutboundChannel
+from agent_logging import get_logger
+
+logger = get_logger("intelligence")
+
 
 class IntelligenceChip:
     """Represents an intelligence chip to display in the UI"""
 
+    __slots__ = ("label", "category", "confidence")
+
     def __init__(self, label: str, category: str, confidence: float = 1.0):
         self.label = label
         self.category = category
@@ -40,6 +48,167 @@ class IntelligenceChip:
         return json.dumps(self.to_dict())
 
 
+# Words: letters/digits, allowing inner apostrophes and hyphens ("can't", "self-improvement")
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+# Trie node key holding the (category, key) hits that end at that node
+_HITS = ""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, normalizing curly apostrophes from STT output"""
+    return _WORD_RE.findall(text.lower().replace("\u2019", "'"))
+
+
+def normalize_label(label: str) -> str:
+    """Case, punctuation and emoji-insensitive form of a chip label"""
+    return " ".join(tokenize(label))
+
+
+class ChipStore:
+    """
+    Indexed store of detected chips.
+
+    - O(1) dedup by (category, normalized label)
+    - Per-category lists in detection order
+    - (category, word) index for confirming chips from Brea's responses
+    """
+
+    def __init__(self):
+        self._by_key: Dict[Tuple[str, str], IntelligenceChip] = {}
+        self._by_category: Dict[str, List[IntelligenceChip]] = {}
+        self._by_word: Dict[Tuple[str, str], List[IntelligenceChip]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def __iter__(self):
+        return iter(self._by_key.values())
+
+    def add(self, chip: IntelligenceChip) -> bool:
+        """Store a chip, returning False if it was already detected"""
+        normalized = normalize_label(chip.label)
+        key = (chip.category, normalized)
+        if key in self._by_key:
+            return False
+
+        self._by_key[key] = chip
+        self._by_category.setdefault(chip.category, []).append(chip)
+        for word in normalized.split():
+            self._by_word.setdefault((chip.category, word), []).append(chip)
+        return True
+
+    def get(self, category: str, label: str) -> Optional[IntelligenceChip]:
+        return self._by_key.get((category, normalize_label(label)))
+
+    def by_category(self, category: str) -> List[IntelligenceChip]:
+        return self._by_category.get(category, [])
+
+    def matching_word(self, category: str, word: str) -> List[IntelligenceChip]:
+        """Chips in `category` whose label contains `word` (or its singular)"""
+        chips = self._by_word.get((category, word))
+        if chips is None and word.endswith("s"):
+            chips = self._by_word.get((category, word[:-1]))
+        return chips or []
+
+    def profile_snapshot(self) -> Dict[str, Any]:
+        """Profile fields in the shape the backend stores"""
+        energy = self._by_category.get("ENERGY")
+        humor = self._by_category.get("HUMOR")
+        return {
+            "dealbreakers": [c.label for c in self.by_category("DEALBREAKER")],
+            "values": [c.label for c in self.by_category("VALUE")],
+            "personalityTags": {
+                "energy": energy[0].label if energy else None,
+                "humor": humor[0].label if humor else None,
+            },
+        }
+
+
+class PatternMatcher:
+    """
+    Word-boundary-aware multi-pattern matcher.
+
+    Every phrase from every pattern table is compiled into one word-level
+    trie, so a single pass over the tokens reports all category hits,
+    including overlapping ones ("active" and "active lifestyle"). A
+    trailing plural "s" is accepted on each word ("smokers" hits "smoker"),
+    but partial words never match ("lie" does not hit "believe").
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, List[str]]]):
+        self._root: Dict[str, Any] = {}
+        self.max_words = 1
+        for category, table in tables.items():
+            for key, phrases in table.items():
+                for phrase in phrases:
+                    words = tokenize(phrase)
+                    self.max_words = max(self.max_words, len(words))
+                    node = self._root
+                    for word in words:
+                        # Plural variant shares the node, so matching is a plain dict lookup
+                        child = node.setdefault(word, {})
+                        node.setdefault(word + "s", child)
+                        node = child
+                    node.setdefault(_HITS, []).append((category, key))
+
+    def scan_tokens(self, tokens: List[str], min_end: int = 0) -> List[Tuple[str, str]]:
+        """
+        Unique (category, key) hits in order of first occurrence.
+
+        Only hits ending after token index `min_end` are reported, so a
+        caller can prepend already-scanned context without re-reporting it.
+        """
+        root = self._root
+        if root.keys().isdisjoint(tokens):
+            return []
+
+        hits: Dict[Tuple[str, str], None] = {}
+        end = len(tokens)
+        for start, word in enumerate(tokens):
+            node = root.get(word)
+            index = start + 1
+            while node is not None:
+                if index > min_end:
+                    for hit in node.get(_HITS, ()):
+                        hits[hit] = None
+                if index == end:
+                    break
+                node = node.get(tokens[index])
+                index += 1
+        return list(hits)
+
+    def scan(self, text: str) -> List[Tuple[str, str]]:
+        return self.scan_tokens(tokenize(text))
+
+
+class TranscriptWindow:
+    """
+    Bounded sliding window of user speech tokens, scanned incrementally.
+
+    Each append only scans the new tokens plus the last `max_words - 1`
+    tokens of earlier frames, so phrases split across transcription
+    frames ("laid" | "back") are still found, and per-frame cost stays
+    constant however long the session runs.
+    """
+
+    def __init__(self, matcher: PatternMatcher, max_tokens: int = 64):
+        self.matcher = matcher
+        self.overlap = matcher.max_words - 1
+        self.tokens: deque = deque(maxlen=max(max_tokens, self.overlap))
+
+    def append(self, text: str) -> List[Tuple[str, str]]:
+        """Add a frame of speech and return the hits it completes"""
+        new_tokens = tokenize(text)
+        if not new_tokens:
+            return []
+
+        carried = min(self.overlap, len(self.tokens))
+        context = [self.tokens[i] for i in range(-carried, 0)]
+        self.tokens.extend(new_tokens)
+        return self.matcher.scan_tokens(context + new_tokens, min_end=carried)
+
+
 class IntelligenceExtractor(FrameProcessor):
     """
     Extracts intelligence chips from conversation and sends to client.
@@ -52,7 +221,8 @@ class IntelligenceExtractor(FrameProcessor):
     - Planning style (spontaneous vs planned)
     - Conflict style (direct vs avoidant)
 
-    Uses RTVIProcessor to send chips to the client via RTVI protocol.
+    Uses RTVIProcessor to send chips to the client via RTVI protocol,
+    through the session's OutboundChannel when one is given.
     """
 
     # Patterns for dealbreaker detection (from user speech)
@@ -94,12 +264,42 @@ class IntelligenceExtractor(FrameProcessor):
         "dark": ["dark humor", "morbid", "edgy"],
     }
 
-    def __init__(self, user_id: str, rtvi_processor):
+    # All tables compiled once into a single matcher
+    MATCHER = PatternMatcher(
+        {
+            "DEALBREAKER": DEALBREAKER_PATTERNS,
+            "VALUE": VALUE_PATTERNS,
+            "ENERGY": ENERGY_PATTERNS,
+            "HUMOR": HUMOR_PATTERNS,
+        }
+    )
+
+    ENERGY_EMOJI = {"chill": "😌", "high": "⚡"}
+
+    # Brea's confirmations of what she learned (from bot responses)
+    CONFIRMATION_PATTERNS = [
+        (re.compile(r"so you value (\w+)"), "VALUE"),
+        (re.compile(r"you're looking for (\w+)"), "VALUE"),
+        (re.compile(r"no (\w+)s? for you"), "DEALBREAKER"),
+        (re.compile(r"got it.* no (\w+)"), "DEALBREAKER"),
+        (re.compile(r"you seem (\w+)"), "ENERGY"),
+    ]
+
+    def __init__(
+        self,
+        user_id: str,
+        rtvi_processor,
+        outbound: Optional[OutboundChannel] = None,
+        on_chip: Optional[Callable[[str, str], None]] = None,
+    ):
         super().__init__()
         self.user_id = user_id
         self.rtvi = rtvi_processor
-        self.detected_chips: List[IntelligenceChip] = []
-        self._current_user_text = []
+        self.outbound = outbound
+        # Called with (category, label) for each new chip, e.g. MatchPreview.on_chip
+        self.on_chip = on_chip
+        self.chips = ChipStore()
+        self._user_window = TranscriptWindow(self.MATCHER)
         self._current_bot_text = []
 
     async def process_frame(self, frame: Frame, direction: FrameDirection):
@@ -109,99 +309,50 @@ class IntelligenceExtractor(FrameProcessor):
 
         # Capture user transcriptions
         if isinstance(frame, TranscriptionFrame):
-            text = frame.text.lower()
-            self._current_user_text.append(text)
-            await self._analyze_user_speech(text)
+            await self.on_transcription(frame)
 
         # Capture bot responses (Brea's confirmations of what she learned)
         elif isinstance(frame, TextFrame) and direction == FrameDirection.DOWNSTREAM:
-            self._current_bot_text.append(frame.text)
+            await self.on_bot_text(frame)
 
         # When bot finishes responding, analyze for confirmed insights
         elif isinstance(frame, LLMFullResponseEndFrame):
-            full_response = " ".join(self._current_bot_text).lower()
-            await self._analyze_bot_response(full_response)
-            self._current_bot_text = []
+            await self.on_response_end(frame)
 
         # CRITICAL: Push frame downstream (super() doesn't do this!)
         await self.push_frame(frame, direction)
 
-    async def _analyze_user_speech(self, text: str):
-        """Analyze user speech for patterns"""
-
-        # Check for dealbreakers
-        for dealbreaker, patterns in self.DEALBREAKER_PATTERNS.items():
-            for pattern in patterns:
-                if pattern in text:
-                    # Check for negation context (user saying they DON'T want this)
-                    negation_patterns = [
-                        f"can't stand {pattern}",
-                        f"hate {pattern}",
-                        f"no {pattern}",
-                        f"won't tolerate {pattern}",
-                        f"dealbreaker is {pattern}",
-                        f"can't do {pattern}",
-                        f"don't like {pattern}",
-                    ]
-                    for neg_pattern in negation_patterns:
-                        if neg_pattern in text or pattern in text:
-                            await self._emit_chip(
-                                IntelligenceChip(
-                                    label=f"{dealbreaker.title()}",
-                                    category="DEALBREAKER",
-                                )
-                            )
-                            break
-                    break
+    def register(self, observer):
+        """Run extraction as handlers on a FrameObserver instead of as its own stage"""
+        observer.on(TranscriptionFrame, self.on_transcription, upstream=True)
+        observer.on(TextFrame, self.on_bot_text)
+        observer.on(LLMFullResponseEndFrame, self.on_response_end)
 
-        # Check for values (what user wants/cares about)
-        for value, patterns in self.VALUE_PATTERNS.items():
-            for pattern in patterns:
-                if pattern in text:
-                    # Check for positive context
-                    positive_patterns = [
-                        f"value {pattern}",
-                        f"important to me",
-                        f"love {pattern}",
-                        f"care about {pattern}",
-                        f"want {pattern}",
-                        f"looking for {pattern}",
-                    ]
-                    # Simple heuristic: if the pattern appears, it's likely a value
-                    if any(pos in text for pos in positive_patterns) or pattern in text:
-                        await self._emit_chip(
-                            IntelligenceChip(
-                                label=value.title(),
-                                category="VALUE",
-                            )
-                        )
-                        break
-                    break
+    async def on_transcription(self, frame: TranscriptionFrame):
+        await self._analyze_user_speech(frame.text)
 
-        # Check for energy level
-        for energy, patterns in self.ENERGY_PATTERNS.items():
-            for pattern in patterns:
-                if pattern in text:
-                    emoji = "😌" if energy == "chill" else "⚡"
-                    await self._emit_chip(
-                        IntelligenceChip(
-                            label=f"{energy.title()} {emoji}",
-                            category="ENERGY",
-                        )
-                    )
-                    break
+    async def on_bot_text(self, frame: TextFrame):
+        self._current_bot_text.append(frame.text)
 
-        # Check for humor style
-        for humor, patterns in self.HUMOR_PATTERNS.items():
-            for pattern in patterns:
-                if pattern in text:
-                    await self._emit_chip(
-                        IntelligenceChip(
-                            label=f"{humor.title()} Humor",
-                            category="HUMOR",
-                        )
-                    )
-                    break
+    async def on_response_end(self, frame: LLMFullResponseEndFrame):
+        full_response = " ".join(self._current_bot_text).lower()
+        await self._analyze_bot_response(full_response)
+        self._current_bot_text = []
+
+    async def _analyze_user_speech(self, text: str):
+        """Analyze newly transcribed speech in the context of the previous frames"""
+        for category, key in self._user_window.append(text):
+            await self._emit_chip(self._chip_for(category, key))
+
+    def _chip_for(self, category: str, key: str) -> IntelligenceChip:
+        """Build the chip for a matcher hit"""
+        if category == "ENERGY":
+            label = f"{key.title()} {self.ENERGY_EMOJI[key]}"
+        elif category == "HUMOR":
+            label = f"{key.title()} Humor"
+        else:
+            label = key.title()
+        return IntelligenceChip(label=label, category=category)
 
     async def _analyze_bot_response(self, text: str):
         """
@@ -210,63 +361,39 @@ class IntelligenceExtractor(FrameProcessor):
         When Brea says things like "So you value family" or "Got it, no smokers",
         we can confirm the chip with higher confidence.
         """
-        # Look for confirmation patterns
-        confirmation_patterns = [
-            (r"so you value (\w+)", "VALUE"),
-            (r"you're looking for (\w+)", "VALUE"),
-            (r"no (\w+)s? for you", "DEALBREAKER"),
-            (r"got it.* no (\w+)", "DEALBREAKER"),
-            (r"you seem (\w+)", "ENERGY"),
-        ]
-
-        for pattern, category in confirmation_patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                # Find the chip and increase confidence
-                for chip in self.detected_chips:
-                    if match.lower() in chip.label.lower():
-                        chip.confidence = min(1.0, chip.confidence + 0.2)
+        for pattern, category in self.CONFIRMATION_PATTERNS:
+            for match in pattern.findall(text):
+                # Increase confidence of the chips this confirms
+                for chip in self.chips.matching_word(category, match.lower()):
+                    chip.confidence = min(1.0, chip.confidence + 0.2)
 
     async def _emit_chip(self, chip: IntelligenceChip):
         """Send a chip to the client via RTVI protocol"""
 
-        # Check if we already have this chip
-        for existing in self.detected_chips:
-            if (
-                existing.label == chip.label
-                and existing.category == chip.category
-            ):
-                return  # Already detected
+        if not self.chips.add(chip):
+            return  # Already detected
 
-        self.detected_chips.append(chip)
-        print(f"[CHIP] {chip.category}: {chip.label}")
+        logger.info("Chip detected", extra={"data": {"category": chip.category, "label": chip.label}})
+        if self.on_chip:
+            self.on_chip(chip.category, chip.label)
+
+        if self.outbound:
+            if not self.outbound.put(chip.to_dict()):
+                logger.warning("Outbound queue full, dropped chip %s", chip.label)
+            return
 
         # Send via RTVI server message
         try:
             await self.rtvi.send_server_message(chip.to_dict())
-            print(f"[CHIP] Sent to client via RTVI")
+            logger.debug("Sent chip to client via RTVI")
         except Exception as e:
-            print(f"Failed to send chip: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Failed to send chip: %s", e)
+
+    @property
+    def detected_chips(self) -> List[IntelligenceChip]:
+        """All detected chips in detection order"""
+        return list(self.chips)
 
     def get_profile_data(self) -> Dict[str, Any]:
         """Get all detected chips as profile data"""
-        return {
-            "dealbreakers": [
-                c.label for c in self.detected_chips if c.category == "DEALBREAKER"
-            ],
-            "values": [
-                c.label for c in self.detected_chips if c.category == "VALUE"
-            ],
-            "personalityTags": {
-                "energy": next(
-                    (c.label for c in self.detected_chips if c.category == "ENERGY"),
-                    None,
-                ),
-                "humor": next(
-                    (c.label for c in self.detected_chips if c.category == "HUMOR"),
-                    None,
-                ),
-            },
-        }
+        return self.chips.profile_snapshot()
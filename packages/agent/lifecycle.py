@@ -0,0 +1,110 @@
+"""
+Session Lifecycle
+
+Bot-side timeouts, so a session that nobody uses gives its slot back
+instead of holding it until the process is killed:
+
+- join timeout: nobody joined the room within `join_timeout` seconds
+- idle timeout: nobody spoke (user or Brea) for `idle_timeout` seconds
+- max duration: the session ran for `max_duration` seconds
+
+The first limit hit ends the session through `on_expire(reason)`; the
+reason is kept in `end_reason` for the session's final metrics report.
+A limit of 0 disables it.
+"""
+
+import time
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from pipecat.frames.frames import TranscriptionFrame, TTSStartedFrame
+
+from observer import FrameObserver
+from agent_logging import get_logger
+
+logger = get_logger("lifecycle")
+
+
+class SessionLifecycle:
+    """
+    Watches one session and ends it when a timeout expires.
+
+    Args:
+        join_timeout: Seconds to wait for the user to join
+        idle_timeout: Seconds of silence (after joining) before ending
+        max_duration: Hard cap on the session length in seconds
+        on_expire: Coroutine called once with the reason
+        check_interval: Seconds between checks
+    """
+
+    def __init__(
+        self,
+        join_timeout: float,
+        idle_timeout: float,
+        max_duration: float,
+        on_expire: Callable[[str], Awaitable[None]],
+        check_interval: float = 1.0,
+    ):
+        self.join_timeout = join_timeout
+        self.idle_timeout = idle_timeout
+        self.max_duration = max_duration
+        self.on_expire = on_expire
+        self.check_interval = check_interval
+        self.started_at = time.monotonic()
+        self.joined_at: Optional[float] = None
+        self.last_activity = self.started_at
+        self.end_reason: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, observer: FrameObserver):
+        # The user's speech arrives upstream from Gemini Live, through the observer's tap
+        observer.on(TranscriptionFrame, self.on_activity, upstream=True)
+        observer.on(TTSStartedFrame, self.on_activity)
+
+    def participant_joined(self):
+        if self.joined_at is None:
+            self.joined_at = self.last_activity = time.monotonic()
+
+    async def on_activity(self, frame):
+        self.last_activity = time.monotonic()
+
+    def expired(self, now: Optional[float] = None) -> Optional[str]:
+        """The limit this session has hit, or None"""
+        now = now if now is not None else time.monotonic()
+        if self.max_duration and now - self.started_at >= self.max_duration:
+            return "max_duration"
+        if self.joined_at is None:
+            if self.join_timeout and now - self.started_at >= self.join_timeout:
+                return "join_timeout"
+        elif self.idle_timeout and now - self.last_activity >= self.idle_timeout:
+            return "idle_timeout"
+        return None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            reason = self.expired()
+            if reason:
+                self.end_reason = reason
+                logger.info(
+                    "Ending session: %s", reason,
+                    extra={"data": {"age_seconds": round(time.monotonic() - self.started_at)}},
+                )
+                # Clear the handle first: on_expire may cancel the pipeline,
+                # whose cleanup calls stop() on this very task
+                self._task = None
+                await self.on_expire(reason)
+                return
@@ -9,17 +9,223 @@ import os
 import time
 import asyncio
 import subprocess
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Tuple
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-import httpx
 from dotenv import load_dotenv
 
+from daily_client import DailyClient, DailyAPIError
+from worker_pool import BotWorkerPool, cold_spawn
+from room_pool import RoomPool, room_properties
+from meeting_tokens import MeetingTokenSigner
+from metrics import VoiceMetricsRegistry
+from scheduler import SessionScheduler, HostSaturatedError
+from reaper import SessionReaper
+from session_index import UserSessionIndex
+from profile_cache import ProfileCache
+from persistence import get_sink
+from dispatcher import NodeDispatcher, NodeUnavailableError, SECRET_HEADER
+from agent_logging import configure_logging, shutdown_logging, get_logger
+
 load_dotenv()
 
-app = FastAPI(title="Brea Agent Server")
+logger = get_logger("server")
+
+DAILY_API_KEY = os.getenv("DAILY_API_KEY")
+DAILY_API_URL = os.getenv("DAILY_API_URL", "https://api.daily.co/v1")
+
+# Bot session limits (bot.py enforces them; the reaper below is the backstop)
+BOT_JOIN_TIMEOUT_SECONDS = float(os.getenv("BOT_JOIN_TIMEOUT_SECONDS", "60"))
+BOT_MAX_SESSION_SECONDS = float(os.getenv("BOT_MAX_SESSION_SECONDS", "1800"))
+# Seconds between reaper sweeps, and the grace before overdue bots are terminated/killed
+REAPER_INTERVAL_SECONDS = float(os.getenv("REAPER_INTERVAL_SECONDS", "30"))
+REAPER_GRACE_SECONDS = float(os.getenv("REAPER_GRACE_SECONDS", "15"))
+
+# Seconds a claimed room stays joinable (default: the join timeout plus a full session);
+# participants are ejected when it expires
+DAILY_ROOM_EXP_SECONDS = int(
+    os.getenv("DAILY_ROOM_EXP_SECONDS") or BOT_JOIN_TIMEOUT_SECONDS + (BOT_MAX_SESSION_SECONDS or 3600)
+)
+
+# Pre-created Daily rooms kept ready for /connect (0 = create per request)
+ROOM_POOL_SIZE = int(os.getenv("ROOM_POOL_SIZE", "4"))
+ROOM_POOL_MAX_IDLE_SECONDS = int(os.getenv("ROOM_POOL_MAX_IDLE_SECONDS", "600"))
+
+# How participant tokens are issued: "local" (self-signed JWT) or "rest" (POST /meeting-tokens)
+DAILY_TOKEN_MODE = os.getenv("DAILY_TOKEN_MODE", "local")
+# Fetched from the Daily API at startup if not set
+DAILY_DOMAIN_ID = os.getenv("DAILY_DOMAIN_ID")
+# Participant token lifetime (0 = no expiry)
+DAILY_TOKEN_EXP_SECONDS = int(os.getenv("DAILY_TOKEN_EXP_SECONDS", "0"))
+
+# Number of pre-imported idle bot workers to keep warm (0 = cold spawn per /connect)
+BOT_POOL_SIZE = int(os.getenv("BOT_POOL_SIZE", "2"))
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Where bot_{user_id}.log/.out files are written (passed on to the bots)
+BOT_LOG_DIR = os.getenv("BOT_LOG_DIR") or SCRIPT_DIR
+
+# Admission control: live bot sessions allowed on this host, and the headroom kept free
+MAX_BOT_SESSIONS = int(os.getenv("MAX_BOT_SESSIONS") or 4 * (os.cpu_count() or 1))
+MAX_HOST_CPU_PERCENT = float(os.getenv("MAX_HOST_CPU_PERCENT", "85"))
+MIN_FREE_MEMORY_MB = float(os.getenv("MIN_FREE_MEMORY_MB", "512"))
+# /connect calls that may wait for a slot, how long they wait, and the Retry-After on a 503
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "16"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "10"))
+
+# Where bots run: "local" (this host) or "nodes" (remote node.py workers that heartbeat in)
+BOT_DISPATCH = os.getenv("BOT_DISPATCH", "local")
+# Seconds without a heartbeat before a node and its sessions are given up on
+NODE_TIMEOUT_SECONDS = float(os.getenv("NODE_TIMEOUT_SECONDS", "15"))
+NODE_SHARED_SECRET = os.getenv("NODE_SHARED_SECRET") or None
+
+# Seconds a retried /connect for the same user keeps getting its live session
+SESSION_REUSE_TTL_SECONDS = float(os.getenv("SESSION_REUSE_TTL_SECONDS", "60"))
+
+# Where earlier sessions' transcripts and chips were persisted (see persistence.py),
+# and how many returning users' profiles to keep cached, for how many seconds
+PERSISTENCE_URL = os.getenv("PERSISTENCE_URL", "")
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "1024"))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+
+daily: Optional[DailyClient] = None
+token_signer: Optional[MeetingTokenSigner] = None
+bot_pool: Optional[BotWorkerPool] = None
+room_pool: Optional[RoomPool] = None
+scheduler: Optional[SessionScheduler] = None
+dispatcher: Optional[NodeDispatcher] = None
+reaper: Optional[SessionReaper] = None
+
+# Voice latency pushed by bots, aggregated across sessions
+voice_metrics = VoiceMetricsRegistry()
+
+
+def session_is_live(room_name: str) -> bool:
+    """Whether the bot for a room is still running (locally or on a node)"""
+    if dispatcher:
+        return dispatcher.has_session(room_name)
+    return bool(scheduler and scheduler.has_session(room_name))
+
+
+# Each user's current session, so retried /connect calls don't start another bot
+user_sessions = UserSessionIndex(session_is_live, ttl=SESSION_REUSE_TTL_SECONDS)
+
+
+async def load_profile(user_id: str) -> Optional[Dict[str, Any]]:
+    store = get_sink(PERSISTENCE_URL)
+    return await store.load_profile(user_id) if store else None
+
+
+# Returning users' profiles, prefetched on /connect for the bot's opening context
+profiles = ProfileCache(load_profile, max_entries=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the shared Daily client and warm pools, and release them on shutdown"""
+    global daily, token_signer, bot_pool, room_pool, scheduler, dispatcher, reaper
+    configure_logging()
+    if DAILY_API_KEY:
+        daily = DailyClient(DAILY_API_KEY, api_url=DAILY_API_URL)
+        if DAILY_TOKEN_MODE == "local":
+            token_signer = await create_token_signer(daily)
+    if BOT_DISPATCH == "nodes":
+        # Bots run on node.py workers; each node does its own admission control
+        dispatcher = NodeDispatcher(
+            node_timeout=NODE_TIMEOUT_SECONDS,
+            retry_after=ADMISSION_RETRY_AFTER,
+            secret=NODE_SHARED_SECRET,
+            on_session_failed=cleanup_failed_session,
+        )
+        await dispatcher.start()
+    else:
+        scheduler = SessionScheduler(
+            max_sessions=MAX_BOT_SESSIONS,
+            max_cpu_percent=MAX_HOST_CPU_PERCENT,
+            min_free_memory_mb=MIN_FREE_MEMORY_MB,
+            queue_size=ADMISSION_QUEUE_SIZE,
+            queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+            retry_after=ADMISSION_RETRY_AFTER,
+        )
+        await scheduler.start()
+        if BOT_POOL_SIZE > 0:
+            bot_pool = BotWorkerPool(size=BOT_POOL_SIZE, script_dir=SCRIPT_DIR, log_dir=BOT_LOG_DIR)
+            await bot_pool.start()
+    if ROOM_POOL_SIZE > 0 and daily:
+        room_pool = RoomPool(
+            daily=daily,
+            size=ROOM_POOL_SIZE,
+            session_exp_seconds=DAILY_ROOM_EXP_SECONDS,
+            max_idle_seconds=ROOM_POOL_MAX_IDLE_SECONDS,
+        )
+        await room_pool.start()
+    reaper = SessionReaper(
+        daily,
+        SCRIPT_DIR,
+        max_session_seconds=BOT_MAX_SESSION_SECONDS,
+        scheduler=scheduler,
+        grace=REAPER_GRACE_SECONDS,
+        interval=REAPER_INTERVAL_SECONDS,
+    )
+    if scheduler:
+        scheduler.on_session_exit = reaper.session_exited
+    await reaper.start()
+    try:
+        yield
+    finally:
+        await reaper.stop()
+        reaper = None
+        if room_pool:
+            await room_pool.stop()
+            room_pool = None
+        if bot_pool:
+            await bot_pool.stop()
+            bot_pool = None
+        if daily:
+            await daily.aclose()
+            daily = None
+        token_signer = None
+        if scheduler:
+            await scheduler.stop()
+            scheduler = None
+        if dispatcher:
+            await dispatcher.stop()
+            dispatcher = None
+        shutdown_logging()
+
+
+async def create_token_signer(daily: DailyClient) -> Optional[MeetingTokenSigner]:
+    """Set up local token signing, or return None to fall back to the REST API"""
+    domain_id = DAILY_DOMAIN_ID
+    if not domain_id:
+        try:
+            domain_id = await daily.get_domain_id()
+        except DailyAPIError as e:
+            logger.warning("Could not fetch Daily domain_id, using REST tokens: %s", e)
+            return None
+    return MeetingTokenSigner(DAILY_API_KEY, domain_id)
+
+
+def cleanup_failed_session(session_id: str, room_url: str, reason: str):
+    """Delete the room of a session whose node was lost, so it can't be rejoined"""
+    if daily:
+        asyncio.create_task(_delete_room_quietly(session_id))
+
+
+async def _delete_room_quietly(room_name: str):
+    try:
+        await daily.delete_room(room_name)
+    except DailyAPIError as e:
+        logger.warning("Failed to delete room %s: %s", room_name, e)
+
+
+app = FastAPI(title="Brea Agent Server", lifespan=lifespan)
 
 # CORS - allow all origins for development
 app.add_middleware(
@@ -30,20 +236,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-DAILY_API_KEY = os.getenv("DAILY_API_KEY")
-DAILY_API_URL = "https://api.daily.co/v1"
-
 
 class ConnectResponse(BaseModel):
     room_url: str
     token: str
     room_name: str
+    reused: bool = False
 
 
 class HealthResponse(BaseModel):
     status: str
     daily_configured: bool
     google_configured: bool
+    bot_pool: Optional[Dict[str, Any]] = None
+    room_pool: Optional[Dict[str, Any]] = None
+    daily_api: Optional[Dict[str, Any]] = None
+    voice_metrics: Optional[Dict[str, Any]] = None
+    sessions: Optional[Dict[str, Any]] = None
+    nodes: Optional[Dict[str, Any]] = None
+    reaper: Optional[Dict[str, Any]] = None
+    user_sessions: Optional[Dict[str, Any]] = None
+    profiles: Optional[Dict[str, Any]] = None
+
+
+class SessionMetricsReport(BaseModel):
+    session_id: str
+    user_id: str
+    observations: Dict[str, List[float]] = {}
+    ended: bool = False
+    end_reason: Optional[str] = None
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -53,6 +274,78 @@ async def health():
         status="ok",
         daily_configured=bool(DAILY_API_KEY),
         google_configured=bool(os.getenv("GOOGLE_AI_API_KEY")),
+        bot_pool=bot_pool.stats() if bot_pool else None,
+        room_pool=room_pool.stats() if room_pool else None,
+        daily_api=daily.stats() if daily else None,
+        voice_metrics=voice_metrics.stats(),
+        sessions=scheduler.stats() if scheduler else None,
+        nodes=dispatcher.stats() if dispatcher else None,
+        reaper=reaper.stats() if reaper else None,
+        user_sessions=user_sessions.stats(),
+        profiles=profiles.stats(),
+    )
+
+
+@app.post("/sessions/metrics")
+async def report_session_metrics(report: SessionMetricsReport):
+    """Receive a bot's periodic voice latency report"""
+    voice_metrics.record(
+        report.session_id, report.observations, ended=report.ended, end_reason=report.end_reason
+    )
+    if report.ended:
+        # The bot flushed this session's chips before its final report
+        profiles.invalidate(report.user_id)
+    return {"status": "ok"}
+
+
+@app.get("/users/{user_id}/profile")
+async def get_profile(user_id: str):
+    """What earlier sessions learned about a user, for the bot's opening context (null if new)"""
+    return {"profile": await profiles.get(user_id)}
+
+
+@app.delete("/users/{user_id}/profile")
+async def invalidate_profile(user_id: str):
+    """Drop a cached profile that changed elsewhere (e.g. edited in the app)"""
+    profiles.invalidate(user_id)
+    return {"status": "ok"}
+
+
+class NodeHeartbeat(BaseModel):
+    node_id: str
+    url: str
+    capacity: int
+    free: int
+    cpu_percent: Optional[float] = None
+    sessions: List[str] = []
+
+
+@app.post("/nodes/heartbeat")
+async def node_heartbeat(
+    heartbeat: NodeHeartbeat,
+    secret: Optional[str] = Header(None, alias=SECRET_HEADER),
+):
+    """Register a bot node / refresh its capacity and live sessions"""
+    if not dispatcher:
+        raise HTTPException(status_code=409, detail="Server is not in BOT_DISPATCH=nodes mode")
+    if NODE_SHARED_SECRET and secret != NODE_SHARED_SECRET:
+        raise HTTPException(status_code=403, detail="Bad node secret")
+    dispatcher.heartbeat(heartbeat.model_dump())
+    return {"status": "ok"}
+
+
+@app.get("/nodes")
+async def list_nodes():
+    """Registered bot nodes and their load"""
+    return {"nodes": dispatcher.nodes() if dispatcher else []}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Voice latency histograms across all sessions, in Prometheus text format"""
+    return PlainTextResponse(
+        voice_metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
     )
 
 
@@ -62,96 +355,129 @@ async def connect(user_id: str = Query(..., description="User ID from Firebase")
     Create a Daily room and spawn a Brea bot.
 
     This endpoint:
-    1. Creates a temporary Daily room (expires in 1 hour)
-    2. Generates a participant token for the user
-    3. Spawns a Pipecat bot process that joins the room
-    4. Returns the room URL and token for the client to join
+    1. Starts loading the user's stored profile for the bot (if not cached)
+    2. Reuses the user's live session if there is one, or joins a setup
+       already in progress for them (retries and double taps)
+    3. Otherwise starts a session (see start_session)
+    4. Generates a fresh participant token for the user
+    5. Returns the room URL and token for the client to join
     """
-    if not DAILY_API_KEY:
+    if not daily:
         raise HTTPException(status_code=500, detail="Daily API key not configured")
 
-    async with httpx.AsyncClient() as client:
-        # Create a Daily room with short expiry for dev (10 seconds)
-        # TODO: Change to 3600 (1 hour) for production
-        room_response = await client.post(
-            f"{DAILY_API_URL}/rooms",
-            headers={"Authorization": f"Bearer {DAILY_API_KEY}"},
-            json={
-                "properties": {
-                    "exp": int(time.time()) + 10,  # 10 seconds for dev
-                    "enable_chat": False,
-                    "enable_screenshare": False,
-                    "start_video_off": True,
-                    "start_audio_off": False,
-                }
-            },
+    # Overlaps the profile read with room and bot setup
+    profiles.prefetch(user_id)
+
+    session, reused = await user_sessions.get_or_create(user_id, lambda: start_session(user_id))
+    if reused:
+        logger.info(
+            "Reusing session for repeated /connect",
+            extra={"data": {"user_id": user_id, "room": session.room_name}},
         )
 
-        if room_response.status_code != 200:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to create Daily room: {room_response.text}",
-            )
+    # Generate a participant token for the user
+    try:
+        token = await issue_token(session.room_name, user_id)
+    except DailyAPIError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create meeting token: {e}")
+
+    return ConnectResponse(
+        room_url=session.room_url,
+        token=token,
+        room_name=session.room_name,
+        reused=reused,
+    )
+
+
+async def start_session(user_id: str) -> Tuple[str, str]:
+    """
+    Set up a new session and return its (room_name, room_url).
+
+    1. Admits the session against this host's (or the node fleet's) capacity
+       (503 + Retry-After if saturated)
+    2. Claims a pre-created Daily room from the pool (or creates one)
+    3. Hands the room to a warm bot worker (or spawns one) that joins it,
+       or dispatches it to the least-loaded node and returns once accepted
+    """
+    # Reserve a bot slot before doing any Daily work; may wait briefly for one
+    try:
+        if dispatcher:
+            if not dispatcher.has_capacity():
+                raise NodeUnavailableError("No bot node has capacity", dispatcher.retry_after)
+        elif scheduler:
+            await scheduler.acquire()
+    except (HostSaturatedError, NodeUnavailableError) as e:
+        raise _saturated(e)
+
+    try:
+        # Claim a pre-created room, or create one if the pool is off/empty
+        try:
+            if room_pool:
+                room_data = await room_pool.claim()
+            else:
+                room_data = await daily.create_room(room_properties(DAILY_ROOM_EXP_SECONDS))
+        except DailyAPIError as e:
+            raise HTTPException(status_code=500, detail=f"Failed to create Daily room: {e}")
 
-        room_data = room_response.json()
         room_name = room_data["name"]
         room_url = room_data["url"]
 
-        # Generate a participant token for the user
-        token_response = await client.post(
-            f"{DAILY_API_URL}/meeting-tokens",
-            headers={"Authorization": f"Bearer {DAILY_API_KEY}"},
-            json={
-                "properties": {
-                    "room_name": room_name,
-                    "user_id": user_id,
-                    "user_name": "User",
-                    "is_owner": False,
-                }
-            },
-        )
+        if dispatcher:
+            try:
+                await dispatcher.dispatch(room_url, user_id, room_name)
+            except NodeUnavailableError as e:
+                # Every node filled up since the capacity check; don't leave the room behind
+                asyncio.create_task(_delete_room_quietly(room_name))
+                raise _saturated(e)
+        # Hand the room to a pre-imported worker, or cold spawn if the pool is off
+        elif bot_pool:
+            process = await bot_pool.assign(room_url, user_id)
+        else:
+            process = spawn_bot(room_url, user_id)
+    except BaseException:
+        if scheduler:
+            scheduler.cancel()
+        raise
+    if scheduler:
+        scheduler.register(process, user_id, room_name)
+    return room_name, room_url
 
-        if token_response.status_code != 200:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to create meeting token: {token_response.text}",
-            )
 
-        token_data = token_response.json()
+def _saturated(e) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
-        # Spawn the bot process
-        # In production, you'd use a task queue like Celery or a process manager
-        spawn_bot(room_url, user_id)
 
-        return ConnectResponse(
-            room_url=room_url,
-            token=token_data["token"],
-            room_name=room_name,
+async def issue_token(room_name: str, user_id: str, is_owner: bool = False) -> str:
+    """Mint a participant token locally, or via POST /meeting-tokens as a fallback"""
+    exp_seconds = DAILY_TOKEN_EXP_SECONDS or None
+    if token_signer:
+        return token_signer.sign(
+            room_name,
+            user_id=user_id,
+            user_name="User",
+            is_owner=is_owner,
+            exp_seconds=exp_seconds,
         )
 
+    properties = {
+        "room_name": room_name,
+        "user_id": user_id,
+        "user_name": "User",
+        "is_owner": is_owner,
+    }
+    if exp_seconds:
+        properties["exp"] = int(time.time()) + exp_seconds
+    return await daily.create_meeting_token(properties)
 
-def spawn_bot(room_url: str, user_id: str):
+
+def spawn_bot(room_url: str, user_id: str) -> subprocess.Popen:
     """
-    Spawn a Pipecat bot process to join the room.
+    Cold-spawn a Pipecat bot process to join the room.
 
-    In production, consider:
-    - Using a process pool or task queue
-    - Running bots in separate containers
-    - Using a proper process manager
+    Used when the warm worker pool is disabled (BOT_POOL_SIZE=0). The
+    returned handle is polled by the scheduler, which also reaps it.
     """
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    bot_script = os.path.join(script_dir, "bot.py")
-
-    # Spawn the bot as a subprocess
-    # Using subprocess.Popen to not block the API response
-    subprocess.Popen(
-        ["python", bot_script, room_url, user_id],
-        cwd=script_dir,
-        # Redirect output to files for debugging
-        stdout=open(os.path.join(script_dir, f"bot_{user_id}.log"), "w"),
-        stderr=subprocess.STDOUT,
-    )
+    return cold_spawn(room_url, user_id, SCRIPT_DIR, BOT_LOG_DIR)
 
 
 if __name__ == "__main__":
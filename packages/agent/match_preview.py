@@ -0,0 +1,161 @@
+"""
+Live Match Preview
+
+Ranks candidates while the user is still talking. Every chip (from
+Gemini's chip tool or the IntelligenceExtractor) updates an
+IncrementalRanking, and the client gets a MATCH_PREVIEW server message
+over RTVI when the shortlist changes meaningfully:
+
+- The top candidate changed, or at least `min_change` of the shortlist did
+- At most one preview per `min_interval` seconds; a change inside the
+  window is sent at its end (latest shortlist only)
+- finish() sends the final shortlist at once, marked final, so it is on
+  the client by the time Brea says "Talk soon"
+
+The candidate pool loads in the background; chips that arrive before it
+is ready are replayed into the ranking once it is.
+
+    {"type": "MATCH_PREVIEW", "payload": {"candidates": [{"id": ..., "score": ...}],
+                                          "chips": 4, "final": false}}
+"""
+
+import time
+import asyncio
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Tuple
+
+from matching import CandidatePool, IncrementalRanking
+from outbound import OutboundChannel
+from agent_logging import get_logger
+
+logger = get_logger("match_preview")
+
+Shortlist = List[Tuple[str, float]]
+
+
+class MatchPreview:
+    """
+    Throttled shortlist previews for one session.
+
+    Args:
+        outbound: Session's outbound RTVI channel
+        k: Candidates per preview
+        min_interval: Minimum seconds between previews
+        min_change: Share of the shortlist that must change to send a preview
+    """
+
+    def __init__(
+        self,
+        outbound: OutboundChannel,
+        k: int = 5,
+        min_interval: float = 3.0,
+        min_change: float = 0.4,
+    ):
+        self.outbound = outbound
+        self.k = k
+        self.min_interval = min_interval
+        self.min_change = min_change
+        self.ranking: Optional[IncrementalRanking] = None
+        self._early_chips: List[Tuple[str, str]] = []
+        self._sent: Shortlist = []
+        self._sent_at = 0.0
+        self._pending: Optional[Shortlist] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._load_task: Optional[asyncio.Task] = None
+        self._finished = False
+
+        self.updates = 0
+        self.previews = 0
+        self.throttled = 0
+
+    def start(self, pool: Awaitable[CandidatePool], exclude_ids: Iterable[str] = ()):
+        """Build the ranking once `pool` resolves"""
+        self._load_task = asyncio.create_task(self._load(pool, list(exclude_ids)))
+
+    async def _load(self, pool: Awaitable[CandidatePool], exclude_ids: List[str]):
+        try:
+            self.ranking = IncrementalRanking(await pool, exclude_ids=exclude_ids)
+        except Exception as e:
+            logger.warning("Match preview disabled, candidate pool failed to load: %s", e)
+            return
+        chips, self._early_chips = self._early_chips, []
+        for category, label in chips:
+            self.on_chip(category, label)
+
+    def on_chip(self, category: str, label: str):
+        """Fold a chip into the ranking and preview the shortlist if it moved"""
+        if self._finished:
+            return
+        if self.ranking is None:
+            self._early_chips.append((category, label))
+            return
+        if not self.ranking.add_chip(category, label):
+            return
+        self.updates += 1
+        shortlist = self.ranking.top_k(self.k)
+        if not self._changed(shortlist):
+            return
+
+        self._pending = shortlist
+        wait = self._sent_at + self.min_interval - time.monotonic()
+        if wait <= 0:
+            self._send()
+        elif self._timer is None:
+            self.throttled += 1
+            self._timer = asyncio.get_running_loop().call_later(wait, self._send)
+
+    def _changed(self, shortlist: Shortlist) -> bool:
+        if not shortlist:
+            return False
+        if not self._sent or shortlist[0][0] != self._sent[0][0]:
+            return True
+        sent = {candidate_id for candidate_id, _ in self._sent}
+        new = sum(1 for candidate_id, _ in shortlist if candidate_id not in sent)
+        return new >= self.min_change * len(shortlist)
+
+    def _send(self, final: bool = False):
+        self._timer = None
+        shortlist = self._pending if self._pending is not None else self._sent
+        self._pending = None
+        if not shortlist and not final:
+            return
+        self.outbound.put(self._message(shortlist, final))
+        self._sent = shortlist
+        self._sent_at = time.monotonic()
+        self.previews += 1
+
+    def _message(self, shortlist: Shortlist, final: bool) -> Dict[str, Any]:
+        return {
+            "type": "MATCH_PREVIEW",
+            "payload": {
+                "candidates": [{"id": candidate_id, "score": round(score, 4)} for candidate_id, score in shortlist],
+                "chips": self.ranking.chips if self.ranking else 0,
+                "final": final,
+            },
+        }
+
+    def finish(self) -> Shortlist:
+        """Send the final shortlist now, bypassing the throttle, and return it"""
+        if self._finished:
+            return self._sent
+        self._finished = True
+        if self._timer is not None:
+            self._timer.cancel()
+        if self.ranking is not None:
+            self._pending = self.ranking.top_k(self.k)
+            self._send(final=True)
+        return self._sent
+
+    async def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._load_task is not None:
+            self._load_task.cancel()
+            try:
+                await self._load_task
+            except asyncio.CancelledError:
+                pass
+            self._load_task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"updates": self.updates, "previews": self.previews, "throttled": self.throttled}
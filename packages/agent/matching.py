@@ -0,0 +1,419 @@
+"""
+Candidate Pre-Scoring
+
+Cheap, batched compatibility scores for one user against a whole pool of
+candidate profiles, so the expensive Gemini sandbox simulation only runs
+on a shortlist. Profiles use the profile_snapshot() shape:
+{"dealbreakers": [...], "values": [...], "personalityTags": {...}}.
+
+- Labels are canonicalised with the chip extractor's pattern tables, so
+  "No Smoking" and "Smoking" are the same dealbreaker and "Close to
+  family" and "Family" the same value; unknown labels are kept as-is
+- Dealbreakers are bitmasks: a candidate is excluded when its red flags
+  hit the user's dealbreakers, or the user's hit the candidate's. Red
+  flags come from an optional "traits" list and a few personality tags
+  (IMPLIED_FLAGS)
+- The rest is a weighted sum of shared values, shared dealbreakers and
+  agreeing personality tags, computed for every candidate with a few
+  matrix-vector products over the pool's feature matrices
+
+Build a CandidatePool once per candidate set (it encodes every profile),
+then call top_k() per user. During a conversation, IncrementalRanking
+keeps one user's shortlist current as chips arrive: each chip only
+rescores the candidates that share its concept, tag or dealbreaker.
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from intelligence import IntelligenceExtractor, normalize_label, tokenize
+
+Profile = Dict[str, Any]
+
+# Share of the score from shared values, shared dealbreakers and agreeing personality tags
+DEFAULT_WEIGHTS = {"values": 0.5, "dealbreakers": 0.2, "personality": 0.3}
+
+# Personality tags that count as a red flag for a dealbreaker
+IMPLIED_FLAGS = {
+    ("conflict", "avoidant"): "poor communication",
+}
+
+# Personality tags whose values are canonicalised with a chip pattern table
+TAG_CATEGORIES = {"energy": "ENERGY", "humor": "HUMOR"}
+
+
+@lru_cache(maxsize=4096)
+def canonical(category: str, label: str) -> Tuple[str, ...]:
+    """Concept keys for a chip label: pattern table keys, or the normalised label itself"""
+    hits = [key for hit_category, key in IntelligenceExtractor.MATCHER.scan(label) if hit_category == category]
+    return tuple(hits) if hits else (" ".join(tokenize(label)),)
+
+
+def _concepts(category: str, labels: Optional[Iterable[str]]) -> List[str]:
+    found: Dict[str, None] = {}
+    for label in labels or ():
+        for concept in canonical(category, label):
+            if concept:
+                found[concept] = None
+    return list(found)
+
+
+def tag_value(tag: str, value: str) -> str:
+    """Canonical tag value, so "Chill 😌", "Chill Vibe" and "chill" are the same energy"""
+    category = TAG_CATEGORIES.get(tag)
+    return canonical(category, value)[0] if category else normalize_label(value)
+
+
+def _tags(profile: Profile) -> Dict[str, str]:
+    tags = {}
+    for tag, value in (profile.get("personalityTags") or {}).items():
+        value = tag_value(tag, str(value)) if value else ""
+        if value:
+            tags[tag] = value
+    return tags
+
+
+def _flags(profile: Profile) -> List[str]:
+    flags = _concepts("DEALBREAKER", profile.get("traits"))
+    flags += [IMPLIED_FLAGS[pair] for pair in _tags(profile).items() if pair in IMPLIED_FLAGS]
+    return flags
+
+
+class CandidatePool:
+    """
+    Candidate profiles encoded into feature matrices for batched scoring.
+
+    Args:
+        ids: Candidate ids, parallel to `profiles`
+        profiles: Candidate profiles (profile_snapshot() shape, optionally with "traits")
+        weights: Score weights, keyed like DEFAULT_WEIGHTS
+    """
+
+    def __init__(self, ids: List[str], profiles: List[Profile], weights: Optional[Dict[str, float]] = None):
+        if len(ids) != len(profiles):
+            raise ValueError("ids and profiles must be the same length")
+        self.ids = list(ids)
+        self._index = {candidate_id: i for i, candidate_id in enumerate(self.ids)}
+        weights = weights or DEFAULT_WEIGHTS
+        total = sum(weights.values()) or 1.0
+        self.weights = {name: weights.get(name, 0.0) / total for name in DEFAULT_WEIGHTS}
+
+        values = [_concepts("VALUE", p.get("values")) for p in profiles]
+        dealbreakers = [_concepts("DEALBREAKER", p.get("dealbreakers")) for p in profiles]
+        flags = [_flags(p) for p in profiles]
+        tags = [_tags(p) for p in profiles]
+
+        # Vocabularies: one column per concept / tag value, one tag group per tag
+        self._values = {c: i for i, c in enumerate(dict.fromkeys(c for row in values for c in row))}
+        self._dealbreakers = {
+            c: i for i, c in enumerate(dict.fromkeys(c for row in dealbreakers + flags for c in row))
+        }
+        self._tag_values = {pair: i for i, pair in enumerate(dict.fromkeys(p for row in tags for p in row.items()))}
+        self._tag_groups = {tag: i for i, tag in enumerate(dict.fromkeys(tag for row in tags for tag in row))}
+        self._words = max(1, (len(self._dealbreakers) + 63) // 64)
+        self._columns: Dict[Tuple[str, int], Tuple[np.ndarray, np.ndarray]] = {}
+        self._bit_row_cache: Dict[Tuple[str, str], np.ndarray] = {}
+
+        n = len(profiles)
+        self._value_matrix = np.zeros((n, len(self._values)), dtype=np.float32)
+        self._dealbreaker_matrix = np.zeros((n, len(self._dealbreakers)), dtype=np.float32)
+        self._tag_matrix = np.zeros((n, len(self._tag_values)), dtype=np.float32)
+        self._known_matrix = np.zeros((n, len(self._tag_groups)), dtype=np.float32)
+        self._dealbreaker_bits = np.zeros((n, self._words), dtype=np.uint64)
+        self._flag_bits = np.zeros((n, self._words), dtype=np.uint64)
+
+        for i in range(n):
+            self._value_matrix[i, [self._values[c] for c in values[i]]] = 1.0
+            self._dealbreaker_matrix[i, [self._dealbreakers[c] for c in dealbreakers[i]]] = 1.0
+            self._tag_matrix[i, [self._tag_values[pair] for pair in tags[i].items()]] = 1.0
+            self._known_matrix[i, [self._tag_groups[tag] for tag in tags[i]]] = 1.0
+            self._dealbreaker_bits[i] = self._bits(dealbreakers[i])
+            self._flag_bits[i] = self._bits(flags[i])
+
+        # Unit rows, so a dot product with a unit user vector is cosine similarity
+        for matrix in (self._value_matrix, self._dealbreaker_matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+    @classmethod
+    def from_file(cls, path: str, weights: Optional[Dict[str, float]] = None) -> "CandidatePool":
+        """Pool from a JSON list of profiles, each with an "id" """
+        with open(path) as f:
+            profiles = json.load(f)
+        return cls([str(p["id"]) for p in profiles], profiles, weights)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _column(self, matrix: str, column: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, weights) of the non-zero entries in one column of a feature matrix"""
+        key = (matrix, column)
+        if key not in self._columns:
+            values = getattr(self, matrix)[:, column]
+            rows = np.flatnonzero(values)
+            self._columns[key] = (rows, values[rows])
+        return self._columns[key]
+
+    def _bit_rows(self, bits: str, concept: str) -> np.ndarray:
+        """Rows whose dealbreaker or red flag bitmask has `concept` set"""
+        key = (bits, concept)
+        if key not in self._bit_row_cache:
+            column = self._dealbreakers.get(concept)
+            if column is None:
+                rows = np.zeros(0, dtype=np.int64)
+            else:
+                mask = np.uint64(1) << np.uint64(column % 64)
+                rows = np.flatnonzero(getattr(self, bits)[:, column // 64] & mask)
+            self._bit_row_cache[key] = rows
+        return self._bit_row_cache[key]
+
+    def _combine(self, value_dot, value_count, dealbreaker_dot, dealbreaker_count, agreeing, comparable):
+        """Weighted score from the raw per-candidate dot products and tag counts"""
+        personality = np.divide(agreeing, comparable, out=np.zeros_like(agreeing), where=comparable > 0)
+        scores = self.weights["personality"] * personality
+        if value_count:
+            scores += (self.weights["values"] / np.sqrt(value_count)) * value_dot
+        if dealbreaker_count:
+            scores += (self.weights["dealbreakers"] / np.sqrt(dealbreaker_count)) * dealbreaker_dot
+        return scores
+
+    def _bits(self, concepts: List[str]) -> np.ndarray:
+        bits = np.zeros(self._words, dtype=np.uint64)
+        for concept in concepts:
+            column = self._dealbreakers.get(concept)
+            if column is not None:
+                bits[column // 64] |= np.uint64(1) << np.uint64(column % 64)
+        return bits
+
+    @staticmethod
+    def _indicator(columns: List[Optional[int]], size: int) -> np.ndarray:
+        vector = np.zeros(size, dtype=np.float32)
+        vector[[c for c in columns if c is not None]] = 1.0
+        return vector
+
+    def excluded(self, profile: Profile) -> np.ndarray:
+        """Boolean mask of candidates ruled out by a dealbreaker, either way round"""
+        user_dealbreakers = self._bits(_concepts("DEALBREAKER", profile.get("dealbreakers")))
+        user_flags = self._bits(_flags(profile))
+        return (self._flag_bits & user_dealbreakers).any(axis=1) | (self._dealbreaker_bits & user_flags).any(axis=1)
+
+    def score(self, profile: Profile) -> np.ndarray:
+        """Score in [0, 1] for every candidate, -inf where a dealbreaker excludes it"""
+        values = _concepts("VALUE", profile.get("values"))
+        dealbreakers = _concepts("DEALBREAKER", profile.get("dealbreakers"))
+        tags = _tags(profile)
+
+        value_vector = self._indicator([self._values.get(c) for c in values], len(self._values))
+        dealbreaker_vector = self._indicator([self._dealbreakers.get(c) for c in dealbreakers], len(self._dealbreakers))
+        tag_vector = self._indicator([self._tag_values.get(pair) for pair in tags.items()], len(self._tag_values))
+        known_vector = self._indicator([self._tag_groups.get(tag) for tag in tags], len(self._tag_groups))
+
+        # Cosine similarities are normalised by all of the user's concepts, including
+        # ones no candidate has; personality is the share of comparable tags that agree
+        scores = self._combine(
+            self._value_matrix @ value_vector,
+            len(values),
+            self._dealbreaker_matrix @ dealbreaker_vector,
+            len(dealbreakers),
+            self._tag_matrix @ tag_vector,
+            self._known_matrix @ known_vector,
+        )
+        scores[self.excluded(profile)] = -np.inf
+        return scores
+
+    def top_k(self, profile: Profile, k: int = 10, exclude_ids: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """Best `k` (candidate_id, score) pairs, highest first, skipping excluded candidates"""
+        return self._best(self.score(profile), k, exclude_ids)
+
+    def _best(self, scores: np.ndarray, k: int, exclude_ids: Iterable[str]) -> List[Tuple[str, float]]:
+        for candidate_id in exclude_ids:
+            index = self._index.get(candidate_id)
+            if index is not None:
+                scores[index] = -np.inf
+
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in best if np.isfinite(scores[i])]
+
+
+class IncrementalRanking:
+    """
+    One user's shortlist against a CandidatePool, updated chip by chip.
+
+    Keeps the raw per-candidate terms of the score (value and dealbreaker
+    dot products, agreeing and comparable tags, dealbreaker conflicts) and
+    the running score vector. A chip adds one column of the pool's
+    features to the terms and rescores only the candidates it touches,
+    plus those already sharing a value or dealbreaker when the user's
+    count of them (the cosine normaliser) changes. Candidates no chip has
+    touched score 0, so top_k() only ranks the touched ones. Scores equal
+    CandidatePool.score() for the same profile.
+
+    Chip categories are the chip tool's and the IntelligenceExtractor's:
+    Dealbreaker, Value, Hobby and Preference (scored as values), Energy
+    and Humor (the energy and humor tags), and Style (whichever of the
+    pool's personality tags has that value).
+
+    Args:
+        pool: Candidates to rank
+        exclude_ids: Candidates never to return (e.g. the user themself)
+    """
+
+    def __init__(self, pool: CandidatePool, exclude_ids: Iterable[str] = ()):
+        self.pool = pool
+        n = len(pool)
+        self.profile: Profile = {"values": [], "dealbreakers": [], "personalityTags": {}}
+        self._values: Dict[str, None] = {}
+        self._dealbreakers: Dict[str, None] = {}
+        self._tags: Dict[str, str] = {}
+        self._value_dot = np.zeros(n, dtype=np.float32)
+        self._dealbreaker_dot = np.zeros(n, dtype=np.float32)
+        self._agreeing = np.zeros(n, dtype=np.float32)
+        self._comparable = np.zeros(n, dtype=np.float32)
+        self._conflicts = np.zeros(n, dtype=np.int32)
+        self._scores = np.zeros(n, dtype=np.float32)
+        # Rows sharing a value / dealbreaker (repeats are harmless), and rows any chip rescored
+        self._value_rows: List[np.ndarray] = []
+        self._dealbreaker_rows: List[np.ndarray] = []
+        self._touched = np.zeros(n, dtype=bool)
+        self._excluded = np.zeros(n, dtype=bool)
+        for candidate_id in exclude_ids:
+            index = pool._index.get(candidate_id)
+            if index is not None:
+                self._excluded[index] = True
+        self.chips = 0
+
+    def add_chip(self, category: str, label: str) -> bool:
+        """Fold one chip into the scores; False if it changed nothing"""
+        category = category.upper()
+        changed = False
+        if category == "DEALBREAKER":
+            for concept in _concepts("DEALBREAKER", [label]):
+                changed |= self._add_dealbreaker(concept)
+            if changed:
+                self.profile["dealbreakers"].append(label)
+        elif category in ("VALUE", "HOBBY", "PREFERENCE"):
+            for concept in _concepts("VALUE", [label]):
+                changed |= self._add_value(concept)
+            if changed:
+                self.profile["values"].append(label)
+        elif category in ("ENERGY", "HUMOR"):
+            changed = self._set_tag(category.lower(), label)
+        elif category == "STYLE":
+            for tag in {tag for tag, value in self.pool._tag_values if value == tag_value(tag, label)}:
+                changed |= self._set_tag(tag, label)
+        if changed:
+            self.chips += 1
+        return changed
+
+    def _add_value(self, concept: str) -> bool:
+        if concept in self._values:
+            return False
+        self._values[concept] = None
+        column = self.pool._values.get(concept)
+        if column is not None:
+            rows, weights = self.pool._column("_value_matrix", column)
+            self._value_dot[rows] += weights
+            self._value_rows.append(rows)
+        # One more value renormalises every candidate sharing an earlier one
+        self._rescore(*self._value_rows)
+        return True
+
+    def _add_dealbreaker(self, concept: str) -> bool:
+        if concept in self._dealbreakers:
+            return False
+        self._dealbreakers[concept] = None
+        flagged = ()
+        column = self.pool._dealbreakers.get(concept)
+        if column is not None:
+            rows, weights = self.pool._column("_dealbreaker_matrix", column)
+            self._dealbreaker_dot[rows] += weights
+            self._dealbreaker_rows.append(rows)
+            flagged = (self.pool._bit_rows("_flag_bits", concept),)
+            self._conflicts[flagged[0]] += 1
+        self._rescore(*self._dealbreaker_rows, *flagged)
+        return True
+
+    def _set_tag(self, tag: str, label: str) -> bool:
+        value = tag_value(tag, label)
+        old = self._tags.get(tag)
+        if not value or old == value:
+            return False
+        rows = self._tag_terms(tag, old, -1) if old is not None else []
+        self._tags[tag] = value
+        self.profile["personalityTags"][tag] = label
+        self._rescore(*rows, *self._tag_terms(tag, value, 1))
+        return True
+
+    def _tag_terms(self, tag: str, value: str, sign: int) -> List[np.ndarray]:
+        """Add (or remove) one tag value's terms; returns the rows touched"""
+        pool = self.pool
+        touched = []
+        column = pool._tag_values.get((tag, value))
+        if column is not None:
+            rows, _ = pool._column("_tag_matrix", column)
+            self._agreeing[rows] += sign
+            touched.append(rows)
+        group = pool._tag_groups.get(tag)
+        if group is not None:
+            rows, _ = pool._column("_known_matrix", group)
+            self._comparable[rows] += sign
+            touched.append(rows)
+        # Tags that are red flags exclude candidates with that dealbreaker
+        flag = IMPLIED_FLAGS.get((tag, value))
+        if flag:
+            rows = pool._bit_rows("_dealbreaker_bits", flag)
+            self._conflicts[rows] += sign
+            touched.append(rows)
+        return touched
+
+    def _rescore(self, *rows: np.ndarray):
+        """Recompute the running score of the given rows from their terms"""
+        if not rows:
+            return
+        rows = np.concatenate(rows)
+        scores = self.pool._combine(
+            self._value_dot[rows],
+            len(self._values),
+            self._dealbreaker_dot[rows],
+            len(self._dealbreakers),
+            self._agreeing[rows],
+            self._comparable[rows],
+        )
+        scores[(self._conflicts[rows] > 0) | self._excluded[rows]] = -np.inf
+        self._scores[rows] = scores
+        self._touched[rows] = True
+
+    def scores(self) -> np.ndarray:
+        """Score for every candidate, as CandidatePool.score() (excluded ids are -inf)"""
+        scores = self._scores.copy()
+        scores[self._excluded] = -np.inf
+        return scores
+
+    def top_k(self, k: int = 10) -> List[Tuple[str, float]]:
+        """Best `k` (candidate_id, score) pairs, highest first, ranking only rescored candidates"""
+        if k <= 0:
+            return []
+        rows = np.flatnonzero(self._touched)
+        scores = self._scores[rows]
+        keep = np.isfinite(scores)
+        rows, scores = rows[keep], scores[keep]
+        if len(rows) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        ids = self.pool.ids
+        shortlist = [(ids[i], float(score)) for i, score in zip(rows[order], scores[order])]
+        # Pad with untouched candidates, which all score 0
+        i = 0
+        while len(shortlist) < k and i < len(ids):
+            if not self._touched[i] and not self._excluded[i]:
+                shortlist.append((ids[i], 0.0))
+            i += 1
+        return shortlist
@@ -0,0 +1,211 @@
+"""
+Metrics
+
+Lightweight in-process latency histograms and timers shared by the
+agent server and bot processes, and the server-side registry that
+aggregates voice latency reported by bots for the /metrics endpoint.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterable
+
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Conversation-scale buckets (30s .. 1h) for session duration
+SESSION_BUCKETS_MS = (30_000, 60_000, 120_000, 300_000, 600_000, 900_000, 1_800_000, 3_600_000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.count += 1
+        self.sum_ms += value_ms
+        for i, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-th quantile"""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for i, bucket_count in enumerate(self.counts):
+            running += bucket_count
+            if running >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum_ms / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+    def prometheus_lines(self, name: str, help_text: str) -> List[str]:
+        """Prometheus text exposition of this histogram, in seconds"""
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{le="{bound / 1000:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.sum_ms / 1000:.6f}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class ToolCallTimer:
+    """
+    Per-call timings for LLM tool calls: received -> acked -> delivered.
+
+    Keeps the most recent `max_calls` calls for inspection, plus
+    histograms across all calls.
+    """
+
+    def __init__(self, max_calls: int = 256):
+        self.max_calls = max_calls
+        self.calls: "OrderedDict[str, Dict[str, Optional[float]]]" = OrderedDict()
+        self.ack_latency = LatencyHistogram()
+        self.delivery_latency = LatencyHistogram()
+        self.failures = 0
+
+    def received(self, call_id: str):
+        self.calls[call_id] = {"received": time.perf_counter(), "acked": None, "delivered": None}
+        while len(self.calls) > self.max_calls:
+            self.calls.popitem(last=False)
+
+    def acked(self, call_id: str) -> Optional[float]:
+        """Record the ack; returns the received -> acked turnaround in ms"""
+        call = self.calls.get(call_id)
+        if not call:
+            return None
+        call["acked"] = time.perf_counter()
+        turnaround_ms = (call["acked"] - call["received"]) * 1000
+        self.ack_latency.observe(turnaround_ms)
+        return turnaround_ms
+
+    def delivered(self, call_id: str, error: Optional[BaseException] = None):
+        call = self.calls.get(call_id)
+        if error is not None:
+            self.failures += 1
+            return
+        if call:
+            call["delivered"] = time.perf_counter()
+            self.delivery_latency.observe((call["delivered"] - call["received"]) * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": len(self.calls),
+            "failures": self.failures,
+            "received_to_acked": self.ack_latency.to_dict(),
+            "received_to_delivered": self.delivery_latency.to_dict(),
+        }
+
+
+# Voice latency metrics reported by bots: name -> (help text, buckets)
+VOICE_METRICS = {
+    "greeting_latency": ("Participant join to first greeting audio", LATENCY_BUCKETS_MS),
+    "response_latency": ("User end of speech to first bot audio", LATENCY_BUCKETS_MS),
+    "tool_call": ("Tool call received to result returned to the LLM", LATENCY_BUCKETS_MS),
+    "session_duration": ("Bot session duration", SESSION_BUCKETS_MS),
+}
+
+
+class VoiceMetricsRegistry:
+    """
+    Server-side aggregate of the voice latency observations pushed by bots.
+
+    Each bot reports periodically (also acting as a heartbeat), so a
+    session counts as live until it reports that it ended or goes quiet
+    for `stale_after` seconds. An end is counted once per session, even
+    if it never made a periodic report or went stale first.
+    """
+
+    # Recently ended session ids remembered, to count a repeated final report once
+    ENDED_MEMORY = 10000
+
+    def __init__(self, stale_after: float = 60.0, prefix: str = "brea"):
+        self.stale_after = stale_after
+        self.prefix = prefix
+        self.histograms = {
+            name: LatencyHistogram(buckets) for name, (_, buckets) in VOICE_METRICS.items()
+        }
+        self.sessions_ended = 0
+        self.ended_by_reason: Dict[str, int] = {}
+        self._live: Dict[str, float] = {}  # session id -> last report (monotonic)
+        self._ended: "OrderedDict[str, None]" = OrderedDict()
+
+    def record(
+        self,
+        session_id: str,
+        observations: Dict[str, Iterable[float]],
+        ended: bool = False,
+        end_reason: Optional[str] = None,
+    ):
+        """Merge one bot report; unknown metric names are ignored"""
+        for name, values in observations.items():
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                continue
+            for value_ms in values:
+                histogram.observe(value_ms)
+
+        if ended:
+            self._live.pop(session_id, None)
+            if session_id not in self._ended:
+                self._ended[session_id] = None
+                if len(self._ended) > self.ENDED_MEMORY:
+                    self._ended.popitem(last=False)
+                self.sessions_ended += 1
+                reason = end_reason or "unknown"
+                self.ended_by_reason[reason] = self.ended_by_reason.get(reason, 0) + 1
+        elif session_id not in self._ended:
+            self._live[session_id] = time.monotonic()
+
+    def live_sessions(self) -> int:
+        cutoff = time.monotonic() - self.stale_after
+        for session_id in [s for s, seen in self._live.items() if seen < cutoff]:
+            del self._live[session_id]
+        return len(self._live)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live_sessions": self.live_sessions(),
+            "sessions_ended": self.sessions_ended,
+            "ended_by_reason": dict(self.ended_by_reason),
+            **{name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+    def render_prometheus(self) -> str:
+        """All voice metrics in Prometheus text exposition format"""
+        lines = [
+            f"# HELP {self.prefix}_live_sessions Bot sessions that reported within the last {self.stale_after:g}s",
+            f"# TYPE {self.prefix}_live_sessions gauge",
+            f"{self.prefix}_live_sessions {self.live_sessions()}",
+            f"# HELP {self.prefix}_sessions_ended_total Bot sessions that reported their end, by reason",
+            f"# TYPE {self.prefix}_sessions_ended_total counter",
+        ]
+        for reason, count in sorted(self.ended_by_reason.items()):
+            lines.append(f'{self.prefix}_sessions_ended_total{{reason="{reason}"}} {count}')
+        for name, (help_text, _) in VOICE_METRICS.items():
+            lines.extend(
+                self.histograms[name].prometheus_lines(f"{self.prefix}_{name}_seconds", help_text)
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,243 @@
+"""
+Brea Bot Node
+
+Worker-node agent for multi-node dispatch. Runs bots on this host for an
+agent server started with BOT_DISPATCH=nodes:
+
+- Heartbeats its free capacity and live sessions to the agent server
+- POST /sessions admits a session (503 + Retry-After when saturated),
+  hands it to a warm worker or cold-spawns a bot, and returns at once
+- DELETE /sessions/{session_id} stops a session
+
+With BOT_HOST_MODE=tasks, sessions run as tasks inside the node process
+(see bot_host.py) instead of one process each: far less memory per
+session, but one core per node, so run one node per core.
+
+Several nodes can run on one box for testing, each on its own port:
+
+    python node.py --port 8201 --node-id node-1
+    python node.py --port 8202 --node-id node-2
+"""
+
+import os
+import socket
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Header
+from pydantic import BaseModel
+from dotenv import load_dotenv
+
+from dispatcher import SECRET_HEADER
+from scheduler import SessionScheduler, HostSaturatedError
+from worker_pool import BotWorkerPool, cold_spawn
+from bot_host import BotHost
+from reaper import SessionReaper
+import daily_client
+from agent_logging import configure_logging, shutdown_logging, get_logger
+
+load_dotenv()
+
+logger = get_logger("node")
+
+# Agent server to heartbeat to (bots also push their metrics there)
+DISPATCHER_URL = os.getenv("DISPATCHER_URL", "http://localhost:8000")
+NODE_SHARED_SECRET = os.getenv("NODE_SHARED_SECRET") or None
+NODE_HEARTBEAT_INTERVAL = float(os.getenv("NODE_HEARTBEAT_INTERVAL", "3"))
+NODE_PORT = int(os.getenv("NODE_PORT", "8200"))
+# Identity and address this node advertises (defaults: hostname:port, http://hostname:port)
+NODE_ID = os.getenv("NODE_ID")
+NODE_URL = os.getenv("NODE_URL")
+
+# How sessions run: "process" (one bot process each) or "tasks" (in this process)
+BOT_HOST_MODE = os.getenv("BOT_HOST_MODE", "process")
+
+# Same capacity settings as a standalone agent server; keep the queue
+# short so the dispatcher can move on to another node quickly
+BOT_POOL_SIZE = int(os.getenv("BOT_POOL_SIZE", "2"))
+MAX_BOT_SESSIONS = int(os.getenv("MAX_BOT_SESSIONS") or 4 * (os.cpu_count() or 1))
+MAX_HOST_CPU_PERCENT = float(os.getenv("MAX_HOST_CPU_PERCENT", "85"))
+MIN_FREE_MEMORY_MB = float(os.getenv("MIN_FREE_MEMORY_MB", "512"))
+NODE_QUEUE_TIMEOUT = float(os.getenv("NODE_QUEUE_TIMEOUT", "0.5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "10"))
+
+# Overdue/crashed bot cleanup (expired rooms are swept by the agent server)
+BOT_MAX_SESSION_SECONDS = float(os.getenv("BOT_MAX_SESSION_SECONDS", "1800"))
+REAPER_INTERVAL_SECONDS = float(os.getenv("REAPER_INTERVAL_SECONDS", "30"))
+REAPER_GRACE_SECONDS = float(os.getenv("REAPER_GRACE_SECONDS", "15"))
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_LOG_DIR = os.getenv("BOT_LOG_DIR") or SCRIPT_DIR
+
+
+class StartSessionRequest(BaseModel):
+    room_url: str
+    user_id: str
+    session_id: str
+
+
+def create_app(node_id: str, node_url: str) -> FastAPI:
+    scheduler: Optional[SessionScheduler] = None
+    bot_pool: Optional[BotWorkerPool] = None
+    bot_host: Optional[BotHost] = None
+    reaper: Optional[SessionReaper] = None
+
+    async def heartbeat_loop():
+        async with httpx.AsyncClient(
+            timeout=NODE_HEARTBEAT_INTERVAL,
+            headers={SECRET_HEADER: NODE_SHARED_SECRET} if NODE_SHARED_SECRET else None,
+        ) as client:
+            while True:
+                scheduler.reap()
+                stats = scheduler.stats()
+                free = 0 if stats["saturated"] else stats["max_sessions"] - stats["live"] - stats["reserved"]
+                try:
+                    response = await client.post(
+                        f"{DISPATCHER_URL.rstrip('/')}/nodes/heartbeat",
+                        json={
+                            "node_id": node_id,
+                            "url": node_url,
+                            "capacity": stats["max_sessions"],
+                            "free": max(0, free),
+                            "cpu_percent": stats["cpu_percent"],
+                            "sessions": list(scheduler.sessions()),
+                        },
+                    )
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    logger.warning("Heartbeat to %s failed: %s", DISPATCHER_URL, e)
+                await asyncio.sleep(NODE_HEARTBEAT_INTERVAL)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal scheduler, bot_pool, bot_host, reaper
+        configure_logging()
+        # Bots started here report their metrics to the agent server
+        os.environ.setdefault("AGENT_SERVER_URL", DISPATCHER_URL)
+
+        scheduler = SessionScheduler(
+            max_sessions=MAX_BOT_SESSIONS,
+            max_cpu_percent=MAX_HOST_CPU_PERCENT,
+            min_free_memory_mb=MIN_FREE_MEMORY_MB,
+            queue_size=MAX_BOT_SESSIONS,
+            queue_timeout=NODE_QUEUE_TIMEOUT,
+            retry_after=ADMISSION_RETRY_AFTER,
+        )
+        await scheduler.start()
+        if BOT_HOST_MODE == "tasks":
+            bot_host = BotHost()
+            await bot_host.start()
+        elif BOT_POOL_SIZE > 0:
+            bot_pool = BotWorkerPool(size=BOT_POOL_SIZE, script_dir=SCRIPT_DIR, log_dir=BOT_LOG_DIR)
+            await bot_pool.start()
+        reaper = SessionReaper(
+            daily_client.from_env(),
+            SCRIPT_DIR,
+            max_session_seconds=BOT_MAX_SESSION_SECONDS,
+            scheduler=scheduler,
+            grace=REAPER_GRACE_SECONDS,
+            interval=REAPER_INTERVAL_SECONDS,
+            sweep_rooms=False,
+        )
+        scheduler.on_session_exit = reaper.session_exited
+        await reaper.start()
+        heartbeat = asyncio.create_task(heartbeat_loop())
+        logger.info("Node %s serving at %s, reporting to %s", node_id, node_url, DISPATCHER_URL)
+        try:
+            yield
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            await reaper.stop()
+            if reaper.daily:
+                await reaper.daily.aclose()
+            if bot_pool:
+                await bot_pool.stop()
+            if bot_host:
+                await bot_host.stop()
+            await scheduler.stop()
+            shutdown_logging()
+
+    app = FastAPI(title="Brea Bot Node", lifespan=lifespan)
+
+    @app.post("/sessions", status_code=202)
+    async def start_session(
+        request: StartSessionRequest,
+        secret: Optional[str] = Header(None, alias=SECRET_HEADER),
+    ):
+        """Admit a session and start its bot; returns once the bot process is launched"""
+        if NODE_SHARED_SECRET and secret != NODE_SHARED_SECRET:
+            raise HTTPException(status_code=403, detail="Bad node secret")
+
+        try:
+            await scheduler.acquire()
+        except HostSaturatedError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+        try:
+            if bot_host:
+                process = bot_host.launch(request.room_url, request.user_id)
+            elif bot_pool:
+                process = await bot_pool.assign(request.room_url, request.user_id)
+            else:
+                process = cold_spawn(request.room_url, request.user_id, SCRIPT_DIR, BOT_LOG_DIR)
+        except BaseException:
+            scheduler.cancel()
+            raise
+        scheduler.register(process, request.user_id, request.session_id)
+        return {"node_id": node_id, "pid": process.pid}
+
+    @app.delete("/sessions/{session_id}")
+    async def end_session(
+        session_id: str,
+        secret: Optional[str] = Header(None, alias=SECRET_HEADER),
+    ):
+        """Stop a session's bot (it still deletes its room on the way out)"""
+        if NODE_SHARED_SECRET and secret != NODE_SHARED_SECRET:
+            raise HTTPException(status_code=403, detail="Bad node secret")
+        if not scheduler.end(session_id):
+            raise HTTPException(status_code=404, detail="No such session")
+        return {"status": "ending", "session_id": session_id}
+
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "ok",
+            "node_id": node_id,
+            "sessions": scheduler.stats() if scheduler else None,
+            "bot_pool": bot_pool.stats() if bot_pool else None,
+            "bot_host": bot_host.stats() if bot_host else None,
+            "reaper": reaper.stats() if reaper else None,
+        }
+
+    return app
+
+
+def _default_identity(port: int):
+    host = socket.gethostname()
+    return NODE_ID or f"{host}:{port}", NODE_URL or f"http://{host}:{port}"
+
+
+# For `uvicorn node:app` (identity from NODE_ID / NODE_URL / NODE_PORT)
+app = create_app(*_default_identity(NODE_PORT))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=NODE_PORT)
+    parser.add_argument("--node-id", help="Defaults to NODE_ID or hostname:port")
+    parser.add_argument("--url", help="Address the agent server reaches this node at (NODE_URL)")
+    args = parser.parse_args()
+
+    node_id, node_url = _default_identity(args.port)
+    uvicorn.run(
+        create_app(args.node_id or node_id, args.url or node_url),
+        host=args.host,
+        port=args.port,
+    )
@@ -0,0 +1,137 @@
+"""
+Frame Observer
+
+A single pass-through pipeline stage that routes frames to registered
+handlers by frame type, replacing a chain of per-concern FrameProcessors
+that each ran their own isinstance checks and push_frame hop.
+
+Handlers are registered per frame class and resolved once per concrete
+frame type via its MRO (most specific registration wins), so high-rate
+frames with no handlers (audio) cost one dict lookup on top of the
+unavoidable push.
+
+The stage itself only dispatches downstream frames. Frames a service
+pushes upstream never reach a stage placed after it: Gemini Live pushes
+the user's TranscriptionFrames upstream from the LLM. Handlers registered
+with upstream=True also get the upstream frames seen by upstream_tap(), a
+second pass-through stage to put in front of the LLM.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from pipecat.frames.frames import Frame
+from pipecat.processors.frame_processor import FrameProcessor, FrameDirection
+
+from agent_logging import get_logger
+
+logger = get_logger("observer")
+
+
+FrameHandler = Callable[[Frame], Awaitable[None]]
+
+
+class FrameObserver(FrameProcessor):
+    """
+    Type-dispatched observer stage.
+
+    Downstream frames are passed to the handlers registered for the most
+    specific matching frame class, then pushed on unchanged. Upstream
+    frames are pushed straight through here; the upstream_tap() stage
+    dispatches them. A failing handler is logged and never stops the frame.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Per direction: registrations, and their resolution per concrete frame class
+        self._handlers: Dict[FrameDirection, Dict[Type[Frame], List[FrameHandler]]] = {
+            FrameDirection.DOWNSTREAM: {},
+            FrameDirection.UPSTREAM: {},
+        }
+        self._dispatch: Dict[FrameDirection, Dict[type, Tuple[FrameHandler, ...]]] = {
+            FrameDirection.DOWNSTREAM: {},
+            FrameDirection.UPSTREAM: {},
+        }
+        self._tap: Optional["UpstreamTap"] = None
+
+    def on(self, frame_type: Type[Frame], handler: Optional[FrameHandler] = None, upstream: bool = False):
+        """
+        Register a handler for `frame_type` (and subclasses without their own entry).
+
+        With upstream=True the handler also gets `frame_type` frames flowing
+        upstream through upstream_tap() (e.g. Gemini Live's user
+        transcriptions), as well as downstream ones.
+
+        Can be used directly or as a decorator.
+        """
+        if handler is None:
+            def decorator(fn: FrameHandler) -> FrameHandler:
+                self.on(frame_type, fn, upstream=upstream)
+                return fn
+            return decorator
+
+        directions = (FrameDirection.DOWNSTREAM, FrameDirection.UPSTREAM) if upstream else (FrameDirection.DOWNSTREAM,)
+        for direction in directions:
+            self._handlers[direction].setdefault(frame_type, []).append(handler)
+            self._dispatch[direction].clear()
+        return handler
+
+    def ignore(self, frame_type: Type[Frame]):
+        """Stop `frame_type` from falling through to a base class's handlers"""
+        for direction, handlers in self._handlers.items():
+            handlers.setdefault(frame_type, [])
+            self._dispatch[direction].clear()
+
+    def upstream_tap(self) -> "UpstreamTap":
+        """The stage that dispatches upstream frames to upstream=True handlers (one per observer)"""
+        if self._tap is None:
+            self._tap = UpstreamTap(self)
+        return self._tap
+
+    def _resolve(self, frame_class: type, direction: FrameDirection) -> Tuple[FrameHandler, ...]:
+        registered = self._handlers[direction]
+        for base in frame_class.__mro__:
+            handlers = registered.get(base)
+            if handlers is not None:
+                return tuple(handlers)
+        return ()
+
+    async def dispatch(self, frame: Frame, direction: FrameDirection = FrameDirection.DOWNSTREAM):
+        """Run the handlers for `frame` flowing in `direction` (without pushing it anywhere)"""
+        frame_class = type(frame)
+        resolved = self._dispatch[direction]
+        handlers = resolved.get(frame_class)
+        if handlers is None:
+            handlers = resolved[frame_class] = self._resolve(frame_class, direction)
+        for handler in handlers:
+            try:
+                await handler(frame)
+            except Exception as e:
+                logger.exception("%s failed: %s", getattr(handler, "__qualname__", handler), e)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if direction is FrameDirection.DOWNSTREAM:
+            await self.dispatch(frame)
+
+        await self.push_frame(frame, direction)
+
+
+class UpstreamTap(FrameProcessor):
+    """
+    Pass-through stage feeding upstream frames to a FrameObserver's
+    upstream=True handlers. Put it directly before the LLM service, so
+    frames the LLM pushes upstream pass it before any aggregator takes them.
+    """
+
+    def __init__(self, observer: FrameObserver):
+        super().__init__()
+        self._observer = observer
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if direction is FrameDirection.UPSTREAM:
+            await self._observer.dispatch(frame, FrameDirection.UPSTREAM)
+
+        await self.push_frame(frame, direction)
@@ -0,0 +1,219 @@
+"""
+Outbound RTVI Channel
+
+Per-session queue between chip producers (Gemini tool calls, the
+IntelligenceExtractor) and the RTVI data channel, so a slow client never
+stalls the frame pipeline or the Gemini tool round trip.
+
+- put() never blocks: the queue is bounded and overflow follows a policy
+- Chips arriving within `coalesce_window` are sent as one CHIPS message
+- Queue depth, queueing delay and send latency are tracked
+- Producers can pass an on_sent callback to learn when (or whether) a
+  message was delivered, without waiting for it; every callback fires
+  exactly once, including for messages still unsent when the channel stops
+"""
+
+import time
+import asyncio
+from typing import Optional, Callable, Awaitable, Dict, Any, List, Tuple
+
+from metrics import LatencyHistogram
+from agent_logging import get_logger
+
+logger = get_logger("outbound")
+
+
+# Called once per message with None on delivery, or the exception if it failed/was dropped
+DeliveryCallback = Callable[[Optional[BaseException]], None]
+
+_Item = Tuple[Dict[str, Any], float, Optional[DeliveryCallback]]
+
+# What put() does when the queue is full
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+class QueueOverflowError(RuntimeError):
+    """Passed to on_sent when a message is dropped by the overflow policy"""
+
+
+class ChannelClosedError(RuntimeError):
+    """Passed to on_sent when the channel stops before the message is sent"""
+
+
+class OutboundChannel:
+    """
+    Bounded, coalescing outbound message queue for one session.
+
+    Args:
+        send: Coroutine that delivers one message (e.g. rtvi.send_server_message)
+        max_size: Maximum queued messages before the overflow policy applies
+        coalesce_window: Seconds to wait for more chips after the first one
+        max_batch: Maximum chips per CHIPS message
+        overflow: DROP_OLDEST or DROP_NEWEST
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Dict[str, Any]], Awaitable[Any]],
+        max_size: int = 64,
+        coalesce_window: float = 0.05,
+        max_batch: int = 16,
+        overflow: str = DROP_OLDEST,
+    ):
+        if overflow not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self._send = send
+        self.coalesce_window = coalesce_window
+        self.max_batch = max_batch
+        self.overflow = overflow
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.max_depth = 0
+        self.sent_messages = 0
+        self.sent_batches = 0
+        self.dropped = 0
+        self.send_failures = 0
+        self.queue_delay = LatencyHistogram()
+        self.send_latency = LatencyHistogram()
+
+    def start(self):
+        """Start the background sender"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 2.0):
+        """
+        Flush what is queued (up to `drain_timeout`) and stop the sender.
+
+        Messages still unsent after that get ChannelClosedError, and so
+        does anything put() afterwards.
+        """
+        self._closed = True
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            _, _, on_sent = self._queue.get_nowait()
+            self._queue.task_done()
+            _notify(on_sent, ChannelClosedError("Outbound channel stopped before sending"))
+
+    def put(self, message: Dict[str, Any], on_sent: Optional[DeliveryCallback] = None) -> bool:
+        """Queue a message without blocking; returns False if it was dropped"""
+        if self._closed:
+            _notify(on_sent, ChannelClosedError("Outbound channel is stopped"))
+            return False
+        item = (message, time.perf_counter(), on_sent)
+        if self._queue.full():
+            self.dropped += 1
+            if self.overflow == DROP_NEWEST:
+                _notify(on_sent, QueueOverflowError("Outbound queue full"))
+                return False
+            _, _, dropped_callback = self._queue.get_nowait()
+            self._queue.task_done()
+            _notify(dropped_callback, QueueOverflowError("Dropped from full outbound queue"))
+        self._queue.put_nowait(item)
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            items = [first]
+            sent = 0
+            try:
+                if _is_chip(first[0]) and self.coalesce_window > 0:
+                    # Let a burst of chips land before sending
+                    await asyncio.sleep(self.coalesce_window)
+                while not self._queue.empty():
+                    items.append(self._queue.get_nowait())
+
+                for batch in self._batches(items):
+                    await self._deliver(batch)
+                    sent += len(batch)
+            except asyncio.CancelledError:
+                # Stopped mid-batch: whatever was taken off the queue but not
+                # sent still owes its producer an answer
+                for _, _, on_sent in items[sent:]:
+                    _notify(on_sent, ChannelClosedError("Outbound channel stopped before sending"))
+                raise
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _batches(self, items: List[_Item]):
+        """Group consecutive chips into batches, keeping overall order"""
+        batch: List[_Item] = []
+        for item in items:
+            if _is_chip(item[0]) and len(batch) < self.max_batch:
+                batch.append(item)
+                continue
+            if batch:
+                yield batch
+                batch = []
+            if _is_chip(item[0]):
+                batch.append(item)
+            else:
+                yield [item]
+        if batch:
+            yield batch
+
+    async def _deliver(self, batch: List[_Item]):
+        if len(batch) == 1:
+            message = batch[0][0]
+        else:
+            message = {"type": "CHIPS", "payload": [item[0]["payload"] for item in batch]}
+
+        started = time.perf_counter()
+        try:
+            await self._send(message)
+        except Exception as e:
+            self.send_failures += 1
+            logger.warning("Failed to send %s: %s", message.get("type"), e)
+            for _, _, on_sent in batch:
+                _notify(on_sent, e)
+            return
+        finished = time.perf_counter()
+
+        self.send_latency.observe((finished - started) * 1000)
+        for _, queued_at, on_sent in batch:
+            self.queue_delay.observe((finished - queued_at) * 1000)
+            _notify(on_sent, None)
+        self.sent_messages += len(batch)
+        self.sent_batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, drop counts and latency histograms"""
+        return {
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth,
+            "sent_messages": self.sent_messages,
+            "sent_batches": self.sent_batches,
+            "dropped": self.dropped,
+            "send_failures": self.send_failures,
+            "queue_delay": self.queue_delay.to_dict(),
+            "send_latency": self.send_latency.to_dict(),
+        }
+
+
+def _notify(on_sent: Optional[DeliveryCallback], error: Optional[BaseException]):
+    if on_sent is None:
+        return
+    try:
+        on_sent(error)
+    except Exception as e:
+        logger.exception("Delivery callback failed: %s", e)
+
+
+def _is_chip(message: Dict[str, Any]) -> bool:
+    return message.get("type") == "CHIP"
@@ -0,0 +1,411 @@
+"""
+Session Persistence
+
+Write-behind storage for what a session produces: transcript turns and
+intelligence chips. The pipeline only appends to an in-memory buffer; a
+background task flushes batches to a sink every `flush_interval` seconds
+(sooner once `batch_size` records are waiting), and close() does a final
+flush when the session ends or is cancelled.
+
+Sinks, chosen by PERSISTENCE_URL:
+
+- sqlite:///path/to/brea.db   local SQLite file (tests, development)
+- http(s)://host/path         each batch POSTed as JSON
+- postgresql://...            the backend database: turns are appended to
+                              Session.transcript, Value and Dealbreaker
+                              chips to User.values / User.dealbreakers
+                              (needs `pip install asyncpg`)
+
+A failed flush keeps its records for the next one. Past `max_buffer`
+records the oldest are dropped (and counted), so a dead sink can't grow
+a bot's memory without bound.
+
+The SQLite and Postgres sinks also read back what earlier sessions learned
+about a user (load_profile), for the agent server's profile cache. The
+HTTP sink is write-only: its load_profile returns None, so with an http(s)
+PERSISTENCE_URL every user starts as a new user.
+"""
+
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+from pipecat.frames.frames import (
+    TextFrame,
+    TranscriptionFrame,
+    LLMFullResponseStartFrame,
+    LLMFullResponseEndFrame,
+)
+
+from observer import FrameObserver
+from agent_logging import get_logger
+
+logger = get_logger("persistence")
+
+
+class Sink:
+    """Where batches go. write() raises on failure so the batch is retried."""
+
+    async def write(
+        self,
+        session_id: str,
+        user_id: str,
+        turns: List[Dict[str, Any]],
+        chips: List[Dict[str, Any]],
+        ended: bool,
+    ):
+        raise NotImplementedError
+
+    async def load_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The user's stored profile in profile_snapshot() shape, or None if
+        there's nothing. Sinks that can't read back return None.
+        """
+        return None
+
+    async def close(self):
+        pass
+
+
+def _profile(dealbreakers, values, personality_tags=None, knowledge_gaps=None) -> Optional[Dict[str, Any]]:
+    if not (dealbreakers or values or personality_tags or knowledge_gaps):
+        return None
+    return {
+        "dealbreakers": list(dealbreakers),
+        "values": list(values),
+        "personalityTags": personality_tags or {},
+        "knowledgeGaps": list(knowledge_gaps or []),
+    }
+
+
+class SQLiteSink(Sink):
+    """Appends to a local SQLite file (safe to share between bot processes)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY, user_id TEXT, started_at INTEGER, ended_at INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS transcript_turns (
+            session_id TEXT, user_id TEXT, speaker TEXT, text TEXT, at INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS chips (
+            id TEXT PRIMARY KEY, session_id TEXT, user_id TEXT,
+            category TEXT, label TEXT, emoji TEXT, at INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS transcript_turns_session ON transcript_turns (session_id);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self.SCHEMA)
+
+    async def write(self, session_id, user_id, turns, chips, ended):
+        await asyncio.to_thread(self._write, session_id, user_id, turns, chips, ended)
+
+    def _write(self, session_id, user_id, turns, chips, ended):
+        now = int(time.time() * 1000)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, user_id, started_at) VALUES (?, ?, ?)",
+                (session_id, user_id, now),
+            )
+            if ended:
+                self._db.execute("UPDATE sessions SET ended_at = ? WHERE session_id = ?", (now, session_id))
+            self._db.executemany(
+                "INSERT INTO transcript_turns VALUES (?, ?, ?, ?, ?)",
+                [(session_id, user_id, t["speaker"], t["text"], t["at"]) for t in turns],
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO chips VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (c["id"], session_id, user_id, c["category"], c["label"], c.get("emoji"), c["at"])
+                    for c in chips
+                ],
+            )
+
+    async def load_profile(self, user_id):
+        return await asyncio.to_thread(self._load_profile, user_id)
+
+    def _load_profile(self, user_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT category, label FROM chips WHERE user_id = ? ORDER BY at", (user_id,)
+            ).fetchall()
+        by_category: Dict[str, List[str]] = {}
+        for category, label in rows:
+            labels = by_category.setdefault(category.lower(), [])
+            if label not in labels:
+                labels.append(label)
+        # Latest chip wins for single-valued tags
+        tags = {tag: by_category[tag][-1] for tag in ("energy", "humor") if by_category.get(tag)}
+        return _profile(by_category.get("dealbreaker", []), by_category.get("value", []), tags)
+
+    async def close(self):
+        await asyncio.to_thread(self._db.close)
+
+
+class HTTPSink(Sink):
+    """
+    POSTs {session_id, user_id, turns, chips, ended} to a URL.
+
+    Write-only: the endpoint has no read contract, so load_profile()
+    always returns None and returning users get no profile prefetch.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def write(self, session_id, user_id, turns, chips, ended):
+        response = await self._client.post(
+            self.url,
+            json={"session_id": session_id, "user_id": user_id, "turns": turns, "chips": chips, "ended": ended},
+        )
+        response.raise_for_status()
+
+    async def load_profile(self, user_id):
+        return None
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class PostgresSink(Sink):
+    """
+    Writes into the backend's Postgres schema (packages/backend/prisma).
+
+    The session row is keyed by the room name; `user_id` is the Firebase
+    UID. Batches for users the backend doesn't know are dropped. Chips in
+    other categories have no column yet and are kept by the other sinks only.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _get_pool(self):
+        async with self._pool_lock:
+            if self._pool is None:
+                import asyncpg  # optional dependency, only needed for this sink
+
+                self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+        return self._pool
+
+    async def write(self, session_id, user_id, turns, chips, ended):
+        pool = await self._get_pool()
+        values = [c["label"] for c in chips if c["category"].lower() == "value"]
+        dealbreakers = [c["label"] for c in chips if c["category"].lower() == "dealbreaker"]
+
+        async with pool.acquire() as conn, conn.transaction():
+            user_pk = await conn.fetchval('SELECT id FROM "User" WHERE "firebaseUid" = $1', user_id)
+            if user_pk is None:
+                logger.warning("No backend user for %s; dropping %d turns", user_id, len(turns))
+                return
+            await conn.execute(
+                """
+                INSERT INTO "Session" (id, "userId", transcript, "updatedAt", "endedAt")
+                VALUES ($1, $2, $3::text[]::jsonb[], now(), CASE WHEN $4 THEN now() END)
+                ON CONFLICT (id) DO UPDATE SET
+                    transcript = "Session".transcript || EXCLUDED.transcript,
+                    "updatedAt" = now(),
+                    "endedAt" = COALESCE(EXCLUDED."endedAt", "Session"."endedAt")
+                """,
+                session_id, user_pk, [json.dumps(turn) for turn in turns], ended,
+            )
+            if values or dealbreakers:
+                await conn.execute(
+                    """
+                    UPDATE "User" SET
+                        "values" = ARRAY(SELECT DISTINCT unnest("values" || $2::text[])),
+                        dealbreakers = ARRAY(SELECT DISTINCT unnest(dealbreakers || $3::text[])),
+                        "updatedAt" = now()
+                    WHERE id = $1
+                    """,
+                    user_pk, values, dealbreakers,
+                )
+
+    async def load_profile(self, user_id):
+        pool = await self._get_pool()
+        row = await pool.fetchrow(
+            'SELECT dealbreakers, "values", "personalityTags", "knowledgeGaps" FROM "User" WHERE "firebaseUid" = $1',
+            user_id,
+        )
+        if row is None:
+            return None
+        # asyncpg hands json/jsonb back as text
+        tags = json.loads(row["personalityTags"]) if row["personalityTags"] else None
+        gaps = [json.loads(gap) for gap in row["knowledgeGaps"] or []]
+        return _profile(row["dealbreakers"], row["values"], tags, gaps)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+def sink_from_url(url: str) -> Sink:
+    if url.startswith("sqlite:///"):
+        return SQLiteSink(url[len("sqlite:///"):])
+    if url.startswith(("http://", "https://")):
+        return HTTPSink(url)
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresSink(url)
+    raise ValueError(f"Unsupported PERSISTENCE_URL: {url}")
+
+
+_shared_sinks: Dict[str, Sink] = {}
+
+
+def get_sink(url: str) -> Optional[Sink]:
+    """The process-wide sink for `url` (sessions in a bot host share it), or None if unset"""
+    if not url:
+        return None
+    if url not in _shared_sinks:
+        _shared_sinks[url] = sink_from_url(url)
+    return _shared_sinks[url]
+
+
+class SessionWriter:
+    """
+    Buffers one session's transcript turns and chips and flushes them behind.
+
+    Args:
+        sink: Where batches are written
+        session_id: Session key (the room name)
+        user_id: User this session belongs to
+        flush_interval: Seconds between flushes
+        batch_size: Flush early once this many records are waiting
+        max_buffer: Records kept while the sink is failing before dropping the oldest
+    """
+
+    def __init__(
+        self,
+        sink: Sink,
+        session_id: str,
+        user_id: str,
+        flush_interval: float = 5.0,
+        batch_size: int = 50,
+        max_buffer: int = 5000,
+    ):
+        self.sink = sink
+        self.session_id = session_id
+        self.user_id = user_id
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+
+        self._turns: List[Dict[str, Any]] = []
+        self._chips: List[Dict[str, Any]] = []
+        self._response: List[str] = []
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.flushed = 0
+        self.flush_failures = 0
+        self.dropped = 0
+
+    def register(self, observer: FrameObserver):
+        # The user's turns arrive upstream from Gemini Live, through the observer's tap
+        observer.on(TranscriptionFrame, self.on_transcription, upstream=True)
+        observer.on(LLMFullResponseStartFrame, self.on_response_start)
+        observer.on(TextFrame, self.on_text)
+        observer.on(LLMFullResponseEndFrame, self.on_response_end)
+
+    async def on_transcription(self, frame: TranscriptionFrame):
+        self.add_turn("user", frame.text)
+
+    async def on_response_start(self, frame: LLMFullResponseStartFrame):
+        self._response = []
+
+    async def on_text(self, frame: TextFrame):
+        self._response.append(frame.text)
+
+    async def on_response_end(self, frame: LLMFullResponseEndFrame):
+        text = "".join(self._response).strip()
+        self._response = []
+        if text:
+            self.add_turn("brea", text)
+
+    def add_turn(self, speaker: str, text: str):
+        self._turns.append({"speaker": speaker, "text": text, "at": int(time.time() * 1000)})
+        self._added()
+
+    def add_chip(self, chip: Dict[str, Any]):
+        self._chips.append({**chip, "at": int(time.time() * 1000)})
+        self._added()
+
+    def _added(self):
+        overflow = len(self._turns) + len(self._chips) - self.max_buffer
+        if overflow > 0:
+            # Chips are few and feed the profile; shed transcript turns first
+            shed = min(overflow, len(self._turns))
+            del self._turns[:shed]
+            del self._chips[:overflow - shed]
+            self.dropped += overflow
+        if len(self._turns) + len(self._chips) >= self.batch_size:
+            self._wake.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flush loop and write everything left (marking the session ended)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if not await self.flush(ended=True):
+            logger.error(
+                "Final flush failed; %d turns and %d chips lost", len(self._turns), len(self._chips)
+            )
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self, ended: bool = False) -> bool:
+        """Write buffered records; on failure they stay buffered. Returns success."""
+        async with self._flush_lock:
+            if not self._turns and not self._chips and not ended:
+                return True
+            turns, self._turns = self._turns, []
+            chips, self._chips = self._chips, []
+            try:
+                await self.sink.write(self.session_id, self.user_id, turns, chips, ended)
+            except BaseException as e:
+                # Put the batch back in front of anything added meanwhile
+                self._turns[:0] = turns
+                self._chips[:0] = chips
+                if not isinstance(e, Exception):
+                    raise
+                self.flush_failures += 1
+                logger.warning("Failed to persist %d turns/%d chips: %s", len(turns), len(chips), e)
+                return False
+            self.flushed += len(turns) + len(chips)
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "flushed": self.flushed,
+            "buffered": len(self._turns) + len(self._chips),
+            "flush_failures": self.flush_failures,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,133 @@
+"""
+Profile Cache
+
+What earlier sessions learned about a returning user (dealbreakers,
+values, personality tags, knowledge gaps), kept in memory on the agent
+server so a bot can open the interview with it instead of asking again.
+
+- /connect prefetches the profile while the room and bot are set up, so
+  it is usually cached by the time the bot asks for it
+- Least recently used entries are evicted past `max_entries`, and every
+  entry expires `ttl` seconds after it was loaded
+- A user with no stored profile is cached too (new users are the common case)
+- invalidate() drops an entry, and discards a load already in flight, when
+  the profile changes (a session ended, the backend edited it)
+- A failed load is not cached; the bot then starts a fresh interview
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from agent_logging import get_logger
+
+logger = get_logger("profile_cache")
+
+Profile = Optional[Dict[str, Any]]
+
+
+class ProfileCache:
+    """
+    LRU + TTL cache of user profiles.
+
+    Args:
+        load: Reads a user's stored profile (None if there is none)
+        max_entries: Profiles kept before evicting the least recently used
+        ttl: Seconds a loaded profile is served before it is reloaded
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], Awaitable[Profile]],
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+    ):
+        self.load = load
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Profile, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.load_failures = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _cached(self, user_id: str) -> Tuple[bool, Profile]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False, None
+        profile, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            return False, None
+        self._entries.move_to_end(user_id)
+        return True, profile
+
+    def prefetch(self, user_id: str):
+        """Start loading the user's profile in the background unless it's cached"""
+        found, _ = self._cached(user_id)
+        if not found and user_id not in self._inflight:
+            self._start_load(user_id)
+
+    async def get(self, user_id: str) -> Profile:
+        """The user's profile, from cache or loaded now (None if new or unavailable)"""
+        found, profile = self._cached(user_id)
+        if found:
+            self.hits += 1
+            return profile
+        self.misses += 1
+        flight = self._inflight.get(user_id) or self._start_load(user_id)
+        try:
+            return await asyncio.shield(flight)
+        except Exception:
+            return None
+
+    def invalidate(self, user_id: str):
+        """Forget the user's profile; the next get() reloads it"""
+        dropped = self._entries.pop(user_id, None) is not None
+        # A load already running may have read the old profile
+        dropped = self._inflight.pop(user_id, None) is not None or dropped
+        if dropped:
+            self.invalidations += 1
+
+    def _start_load(self, user_id: str) -> asyncio.Task:
+        flight = asyncio.ensure_future(self._load(user_id))
+        # Retrieve the outcome even if nobody awaits it (prefetch)
+        flight.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[user_id] = flight
+        return flight
+
+    async def _load(self, user_id: str) -> Profile:
+        current = asyncio.current_task()
+        try:
+            profile = await self.load(user_id)
+        except Exception as e:
+            self.load_failures += 1
+            logger.warning("Failed to load profile for %s: %s", user_id, e)
+            raise
+        finally:
+            # Invalidated meanwhile: return what we read, but don't cache it
+            stale = self._inflight.get(user_id) is not current
+            if not stale:
+                del self._inflight[user_id]
+        if not stale:
+            self._entries[user_id] = (profile, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "load_failures": self.load_failures,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,267 @@
+"""
+Session Reaper
+
+Host-side backstop for bot session lifecycles. Bots end their own
+sessions on join, idle and duration timeouts (see lifecycle.py); the
+reaper frees whatever slips through:
+
+- Sessions still running past the max duration plus `grace` get SIGTERM
+  (the bot still cleans up), and are killed `grace` seconds later
+- Bot processes that old are killed even if no scheduler tracks them
+  (e.g. lost by a scheduler bug): cold-spawned `python bot.py` processes
+  from this directory, and warm pool workers, which rename themselves
+  "bot-<hex start time>" when they take a room (see
+  mark_session_process()). Only descendants of this process are
+  touched, so other servers' bots on the same host are left alone.
+- The room of a bot that exited abnormally is deleted, as the bot never
+  got to it
+- Daily rooms past their `exp` are deleted
+
+Sessions in a bot host (bot_host.py) share one long-lived process, so
+they are only reaped while a scheduler tracks them; an untracked host
+is left to its own sessions' duration timeouts. So are bots orphaned by
+a server that died: once reparented they are no longer our descendants.
+
+Reclaimed capacity is counted per cause in stats().
+"""
+
+import os
+import re
+import time
+import ctypes
+import signal
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from daily_client import DailyClient, DailyAPIError
+from scheduler import SessionScheduler
+from agent_logging import get_logger
+
+logger = get_logger("reaper")
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# Pages of GET /rooms read per sweep (100 rooms each)
+MAX_ROOM_PAGES = 20
+
+# Process name (/proc/<pid>/comm) of a warm pool worker running a session
+SESSION_COMM_RE = re.compile(r"bot-([0-9a-f]{8})")
+PR_SET_NAME = 15
+
+
+def mark_session_process():
+    """
+    Name this process "bot-<hex unix time>" so the reaper can tell it runs a
+    session, and since when (a pool worker's own start time is when it
+    was spawned idle, not when it took the room). No-op off Linux.
+    """
+    try:
+        ctypes.CDLL(None, use_errno=True).prctl(PR_SET_NAME, f"bot-{int(time.time()):08x}".encode(), 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _stat_fields(pid: int) -> List[str]:
+    """/proc/<pid>/stat fields after the command name: state, ppid, ..."""
+    with open(f"/proc/{pid}/stat") as f:
+        stat = f.read()
+    return stat[stat.rfind(")") + 2:].split()
+
+
+def _descends_from(pid: int, ancestor: int, max_depth: int = 16) -> bool:
+    """Whether `ancestor` is on pid's parent chain (pool workers are grandchildren, via the forkserver)"""
+    for _ in range(max_depth):
+        try:
+            pid = int(_stat_fields(pid)[1])
+        except (OSError, ValueError, IndexError):
+            return False
+        if pid == ancestor:
+            return True
+        if pid <= 1:
+            return False
+    return False
+
+
+def _bot_processes(bot_script: str, ancestor: int) -> Dict[int, float]:
+    """
+    PID -> session age in seconds of every `python <bot_script>` process and
+    marked pool worker descended from `ancestor` (Linux only)
+    """
+    try:
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        entries = [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+    except (OSError, ValueError):
+        return {}
+
+    now = time.time()
+    found = {}
+    for pid in entries:
+        try:
+            with open(f"/proc/{pid}/comm") as f:
+                marked = SESSION_COMM_RE.fullmatch(f.read().strip())
+            if marked:
+                age = now - int(marked.group(1), 16)
+            else:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    argv = f.read().split(b"\0")
+                if len(argv) < 2 or os.fsdecode(argv[1]) != bot_script:
+                    continue
+                age = uptime - int(_stat_fields(pid)[19]) / CLK_TCK
+        except OSError:
+            continue  # exited while we looked
+        if _descends_from(pid, ancestor):
+            found[pid] = age
+    return found
+
+
+class SessionReaper:
+    """
+    Periodically reclaims session capacity that would otherwise leak.
+
+    Args:
+        daily: Daily client for room deletion (None: leave rooms alone)
+        script_dir: Directory holding bot.py, to recognise stray cold-spawned bots
+        max_session_seconds: Bots' own session cap (BOT_MAX_SESSION_SECONDS); 0 disables
+            the overdue and stray-process checks
+        scheduler: Sessions on this host, if it runs bots
+        grace: Seconds past the cap before SIGTERM, and from SIGTERM to SIGKILL
+        interval: Seconds between sweeps
+        sweep_rooms: Delete expired Daily rooms (once per deployment is enough)
+    """
+
+    def __init__(
+        self,
+        daily: Optional[DailyClient],
+        script_dir: str,
+        max_session_seconds: float,
+        scheduler: Optional[SessionScheduler] = None,
+        grace: float = 15.0,
+        interval: float = 30.0,
+        sweep_rooms: bool = True,
+    ):
+        self.daily = daily
+        self.bot_script = os.path.join(script_dir, "bot.py")
+        self.max_session_seconds = max_session_seconds
+        self.scheduler = scheduler
+        self.grace = grace
+        self.interval = interval
+        self.sweep_rooms_enabled = sweep_rooms
+        self._terminated: Dict[str, float] = {}  # room -> when SIGTERM was sent
+        self._task: Optional[asyncio.Task] = None
+
+        self.sweeps = 0
+        self.reclaimed: Dict[str, int] = {
+            "overdue_terminated": 0,
+            "overdue_killed": 0,
+            "stray_processes": 0,
+            "crashed_session_rooms": 0,
+            "expired_rooms": 0,
+        }
+
+    async def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def session_exited(self, room_name: str, user_id: str, exit_code: Optional[int]):
+        """SessionScheduler exit hook: delete the room of a bot that died without cleaning up"""
+        if not exit_code:
+            return
+        logger.warning(
+            "Bot for room %s exited with %s", room_name, exit_code, extra={"data": {"user_id": user_id}}
+        )
+        if self.daily:
+            asyncio.create_task(self._delete_room(room_name, "crashed_session_rooms"))
+
+    def enforce_deadlines(self):
+        """SIGTERM sessions past the cap, and SIGKILL them if they are still there later"""
+        if not self.scheduler or not self.max_session_seconds:
+            return
+        now = time.monotonic()
+        deadline = self.max_session_seconds + self.grace
+        sessions = self.scheduler.sessions()
+        for room_name in [room for room in self._terminated if room not in sessions]:
+            del self._terminated[room_name]
+
+        for room_name, session in sessions.items():
+            if session["age_seconds"] < deadline:
+                continue
+            terminated_at = self._terminated.get(room_name)
+            if terminated_at is None:
+                logger.warning("Session in %s overran its %gs cap; terminating", room_name, self.max_session_seconds)
+                self.scheduler.end(room_name)
+                self._terminated[room_name] = now
+                self.reclaimed["overdue_terminated"] += 1
+            elif terminated_at > 0 and now - terminated_at >= self.grace:
+                logger.warning("Session in %s ignored SIGTERM; killing", room_name)
+                self.scheduler.end(room_name, force=True)
+                self._terminated[room_name] = -1.0  # killed; just wait for the reap
+                self.reclaimed["overdue_killed"] += 1
+
+    def kill_strays(self):
+        """Kill our bot processes older than the cap plus both grace periods, tracked or not"""
+        if not self.max_session_seconds:
+            return
+        limit = self.max_session_seconds + 2 * self.grace
+        for pid, age in _bot_processes(self.bot_script, os.getpid()).items():
+            if age < limit:
+                continue
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                continue
+            logger.warning("Killed stray bot process %d (%.0fs old)", pid, age)
+            self.reclaimed["stray_processes"] += 1
+
+    async def sweep_rooms(self):
+        """Delete Daily rooms whose `exp` has passed"""
+        if not self.daily or not self.sweep_rooms_enabled:
+            return
+        now = time.time()
+        expired: List[str] = []
+        starting_after = None
+        for _ in range(MAX_ROOM_PAGES):
+            rooms = await self.daily.list_rooms(starting_after=starting_after)
+            for room in rooms:
+                exp = (room.get("config") or {}).get("exp")
+                if exp and exp < now:
+                    expired.append(room["name"])
+            if len(rooms) < 100:
+                break
+            starting_after = rooms[-1]["id"]
+        for room_name in expired:
+            await self._delete_room(room_name, "expired_rooms")
+
+    async def _delete_room(self, room_name: str, cause: str):
+        try:
+            await self.daily.delete_room(room_name)
+        except DailyAPIError as e:
+            logger.warning("Failed to delete room %s: %s", room_name, e)
+            return
+        self.reclaimed[cause] += 1
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sweeps += 1
+            self.enforce_deadlines()
+            await asyncio.to_thread(self.kill_strays)
+            try:
+                await self.sweep_rooms()
+            except DailyAPIError as e:
+                logger.warning("Room sweep failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sweeps": self.sweeps,
+            "terminating": len([t for t in self._terminated.values() if t > 0]),
+            "reclaimed": dict(self.reclaimed),
+        }
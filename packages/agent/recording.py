@@ -0,0 +1,154 @@
+"""
+Frame Recordings
+
+Compact on-disk timelines of a bot session's frames, for replaying the
+agent processors offline (see benchmarks/bench_replay.py).
+
+Format: JSON Lines, gzip-compressed when the path ends in ".gz".
+The first line is a header object; each following line is one event:
+
+    {"format": "brea-frames", "version": 1, ...metadata}
+    [t_ms, kind, data]
+
+where t_ms is milliseconds since the recording started and kind is one of
+
+    user       final user transcription       data: text
+    interim    interim user transcription     data: text
+    start      LLM response start             data: null
+    text       LLM text chunk                 data: text
+    end        LLM response end               data: null
+    audio      bot audio frame                data: byte length
+    tool       LLM tool call                  data: {"id", "name", "args"}
+
+Audio content is not stored, only its size, so recordings hold the
+conversation transcript but no voice.
+"""
+
+import gzip
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pipecat.frames.frames import (
+    Frame,
+    TextFrame,
+    TranscriptionFrame,
+    InterimTranscriptionFrame,
+    LLMFullResponseStartFrame,
+    LLMFullResponseEndFrame,
+    TTSAudioRawFrame,
+)
+
+from observer import FrameObserver
+from agent_logging import get_logger
+
+logger = get_logger("recording")
+
+FORMAT = "brea-frames"
+VERSION = 1
+
+Event = Tuple[float, str, Any]
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def save_recording(path: str, events: List[Event], metadata: Optional[Dict[str, Any]] = None):
+    """Write `events` (in time order) to `path`"""
+    with _open(path, "w") as f:
+        f.write(json.dumps({"format": FORMAT, "version": VERSION, **(metadata or {})}) + "\n")
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def load_recording(path: str) -> Tuple[Dict[str, Any], List[Event]]:
+    """Read a recording; returns (header, events)"""
+    with _open(path, "r") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a {FORMAT} recording")
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported {FORMAT} version {header.get('version')} in {path}")
+        events = [tuple(json.loads(line)) for line in f if line.strip()]
+    return header, events
+
+
+def to_frames(events: List[Event]) -> Iterator[Tuple[float, Any]]:
+    """
+    Turn recorded events back into (t_ms, frame) pairs.
+
+    Tool calls are yielded as their {"id", "name", "args"} dict, since they
+    reach the bot as a function call rather than a frame.
+    """
+    audio_cache: Dict[int, bytes] = {}
+    for t_ms, kind, data in events:
+        if kind == "user":
+            yield t_ms, TranscriptionFrame(text=data, user_id="", timestamp="")
+        elif kind == "interim":
+            yield t_ms, InterimTranscriptionFrame(text=data, user_id="", timestamp="")
+        elif kind == "start":
+            yield t_ms, LLMFullResponseStartFrame()
+        elif kind == "text":
+            yield t_ms, TextFrame(text=data)
+        elif kind == "end":
+            yield t_ms, LLMFullResponseEndFrame()
+        elif kind == "audio":
+            audio = audio_cache.get(data)
+            if audio is None:
+                audio = audio_cache[data] = bytes(data)
+            yield t_ms, TTSAudioRawFrame(audio=audio, sample_rate=24000, num_channels=1)
+        elif kind == "tool":
+            yield t_ms, data
+        else:
+            raise ValueError(f"Unknown recording event kind: {kind}")
+
+
+class FrameRecorder:
+    """
+    Records a session's frame timeline from the FrameObserver.
+
+    Events are kept in memory and written once, on save(), so recording
+    adds no file I/O to the live pipeline.
+    """
+
+    def __init__(self, metadata: Optional[Dict[str, Any]] = None):
+        self.metadata = metadata or {}
+        self.events: List[Event] = []
+        self._started = time.monotonic()
+
+    def register(self, observer: FrameObserver):
+        # User transcriptions arrive upstream from Gemini Live, through the observer's tap
+        observer.on(TranscriptionFrame, self.on_frame, upstream=True)
+        observer.on(InterimTranscriptionFrame, self.on_frame, upstream=True)
+        observer.on(LLMFullResponseStartFrame, self.on_frame)
+        observer.on(TextFrame, self.on_frame)
+        observer.on(LLMFullResponseEndFrame, self.on_frame)
+        observer.on(TTSAudioRawFrame, self.on_frame)
+
+    def _add(self, kind: str, data: Any = None):
+        self.events.append((round((time.monotonic() - self._started) * 1000, 1), kind, data))
+
+    async def on_frame(self, frame: Frame):
+        # Most specific first: TranscriptionFrame is a TextFrame
+        if isinstance(frame, TranscriptionFrame):
+            self._add("user", frame.text)
+        elif isinstance(frame, InterimTranscriptionFrame):
+            self._add("interim", frame.text)
+        elif isinstance(frame, LLMFullResponseStartFrame):
+            self._add("start")
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            self._add("end")
+        elif isinstance(frame, TTSAudioRawFrame):
+            self._add("audio", len(frame.audio))
+        elif isinstance(frame, TextFrame):
+            self._add("text", frame.text)
+
+    def tool_call(self, tool_call_id: str, function_name: str, args: Dict[str, Any]):
+        self._add("tool", {"id": tool_call_id, "name": function_name, "args": dict(args)})
+
+    def save(self, path: str):
+        save_recording(path, self.events, self.metadata)
+        logger.info("Saved frame recording", extra={"data": {"path": path, "events": len(self.events)}})
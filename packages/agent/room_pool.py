@@ -0,0 +1,176 @@
+"""
+Daily Room Pool
+
+Keeps a background-filled pool of pre-created Daily rooms so /connect
+only has to claim one instead of waiting on POST /rooms.
+
+Pooled rooms are created with an expiry long enough to cover both their
+time waiting in the pool and a full session, and are recycled (deleted
+and replaced) once they have sat idle for `max_idle_seconds`.
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Any
+
+from daily_client import DailyClient
+from agent_logging import get_logger
+
+logger = get_logger("rooms")
+
+
+ROOM_PROPERTIES = {
+    "enable_chat": False,
+    "enable_screenshare": False,
+    "start_video_off": True,
+    "start_audio_off": False,
+    # Nobody lingers in a room past its exp, and the reaper can delete it
+    "eject_at_room_exp": True,
+}
+
+
+def room_properties(exp_seconds: int) -> Dict[str, Any]:
+    """Properties for a Brea room that expires `exp_seconds` from now"""
+    return {"exp": int(time.time()) + exp_seconds, **ROOM_PROPERTIES}
+
+
+class _PooledRoom:
+    __slots__ = ("name", "url", "created_at")
+
+    def __init__(self, name: str, url: str, created_at: float):
+        self.name = name
+        self.url = url
+        self.created_at = created_at
+
+
+class RoomPool:
+    """
+    Pool of ready-to-use Daily rooms.
+
+    - `size` rooms are kept ready and refilled in the background
+    - Rooms idle for longer than `max_idle_seconds` are deleted and replaced
+    - A claimed room always has at least `session_exp_seconds` left before expiry
+    - On a pool miss, claim() creates a room inline
+    """
+
+    def __init__(
+        self,
+        daily: DailyClient,
+        size: int,
+        session_exp_seconds: int,
+        max_idle_seconds: int = 600,
+        sweep_interval: float = 30.0,
+    ):
+        self.daily = daily
+        self.size = size
+        self.session_exp_seconds = session_exp_seconds
+        self.max_idle_seconds = max_idle_seconds
+        self.sweep_interval = sweep_interval
+        self._rooms: Deque[_PooledRoom] = deque()
+        self._pending = 0
+        self._refill_event = asyncio.Event()
+        self._tasks = []
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+        self.create_failures = 0
+
+    async def start(self):
+        """Start the background refill and recycle loops"""
+        self._tasks = [
+            asyncio.create_task(self._refill_loop()),
+            asyncio.create_task(self._sweep_loop()),
+        ]
+        self._refill_event.set()
+
+    async def stop(self):
+        """Stop background work and delete any unclaimed rooms"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        rooms = list(self._rooms)
+        self._rooms.clear()
+        await asyncio.gather(
+            *(self._delete(room.name) for room in rooms), return_exceptions=True
+        )
+
+    async def claim(self) -> Dict[str, Any]:
+        """Take a ready room from the pool, creating one inline on a miss"""
+        now = time.time()
+        while self._rooms:
+            room = self._rooms.popleft()
+            if now - room.created_at <= self.max_idle_seconds:
+                self.hits += 1
+                self._refill_event.set()
+                return {"name": room.name, "url": room.url}
+            self._recycle(room)
+
+        self.misses += 1
+        self._refill_event.set()
+        return await self.daily.create_room(room_properties(self.session_exp_seconds))
+
+    async def _create_pooled_room(self):
+        # Expiry covers the longest possible wait in the pool plus a full session
+        room = await self.daily.create_room(
+            room_properties(self.max_idle_seconds + self.session_exp_seconds)
+        )
+        self._rooms.append(_PooledRoom(room["name"], room["url"], time.time()))
+
+    async def _refill_one(self):
+        self._pending += 1
+        try:
+            await self._create_pooled_room()
+        except Exception as e:
+            self.create_failures += 1
+            logger.warning("Failed to pre-create room: %s", e)
+        finally:
+            self._pending -= 1
+
+    async def _refill_loop(self):
+        while True:
+            await self._refill_event.wait()
+            self._refill_event.clear()
+            missing = self.size - len(self._rooms) - self._pending
+            if missing > 0:
+                await asyncio.gather(*(self._refill_one() for _ in range(missing)))
+
+    async def _sweep_loop(self):
+        """Recycle rooms that have been idle too long"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            now = time.time()
+            fresh = deque()
+            for room in self._rooms:
+                if now - room.created_at > self.max_idle_seconds:
+                    self._recycle(room)
+                else:
+                    fresh.append(room)
+            self._rooms = fresh
+            self._refill_event.set()
+
+    def _recycle(self, room: _PooledRoom):
+        self.recycled += 1
+        asyncio.create_task(self._delete(room.name))
+
+    async def _delete(self, room_name: str):
+        try:
+            await self.daily.delete_room(room_name)
+        except Exception as e:
+            logger.warning("Failed to delete room %s: %s", room_name, e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool occupancy and hit/miss counters"""
+        claims = self.hits + self.misses
+        return {
+            "size": self.size,
+            "ready": len(self._rooms),
+            "creating": self._pending,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / claims, 3) if claims else None,
+            "recycled": self.recycled,
+            "create_failures": self.create_failures,
+        }
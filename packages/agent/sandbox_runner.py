@@ -0,0 +1,486 @@
+"""
+Sandbox Batch Runner
+
+Runs many sandbox simulations (user A, user B, scenario) at once, e.g. a
+nightly re-match of everyone against their pre-scored shortlist
+(matching.py), instead of one Gemini call per backend request.
+
+- Prompts and result sanitising mirror the backend's sandbox service
+  (packages/backend/src/services/sandbox.ts) for all three scenarios
+- At most `concurrency` simulations are in flight (an asyncio semaphore),
+  and a token bucket caps how many start per second
+- A failed call or unparseable reply is retried with exponential backoff;
+  jobs that still fail are recorded as failed, not given a made-up score
+- Results are buffered and written to the store in bulk. The store is the
+  checkpoint: a rerun skips every job already completed (failed ones are
+  tried again), so an interrupted batch resumes where it stopped
+- The LLM is pluggable: GeminiBackend for real runs, StubBackend (a
+  deterministic, offline reply with optional latency and failures) for
+  tests and throughput benchmarks
+
+    python sandbox_runner.py --profiles profiles.json --db sandbox.db [--shortlist 10]
+        [--backend stub|gemini] [--concurrency 16] [--rate 10]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import sqlite3
+import argparse
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from agent_logging import configure_logging, shutdown_logging, get_logger
+
+logger = get_logger("sandbox_runner")
+
+# Scenario templates, as in the backend's sandbox service
+SCENARIOS = {
+    "LIFESTYLE_COMPATIBILITY": {
+        "name": "The 10AM Saturday Plan",
+        "prompt": """You are simulating a conversation between two people planning their ideal Saturday morning.
+
+Agent A represents the first person, Agent B represents the second person.
+Based on their profiles, simulate how they would negotiate plans.
+Focus on: energy levels, planning preferences, and lifestyle compatibility.""",
+    },
+    "CONFLICT_RESOLUTION": {
+        "name": "The Restaurant Disagreement",
+        "prompt": """You are simulating a conversation where two people disagree about where to eat dinner.
+
+Agent A represents the first person, Agent B represents the second person.
+Based on their profiles, simulate how they would handle this minor conflict.
+Focus on: conflict style, communication patterns, and compromise ability.""",
+    },
+    "ENERGY_MATCH": {
+        "name": "The Weekend Adventure",
+        "prompt": """You are simulating a conversation about planning a spontaneous weekend trip.
+
+Agent A represents the first person, Agent B represents the second person.
+Based on their profiles, simulate their energy and enthusiasm levels.
+Focus on: spontaneity vs planning, energy matching, and excitement levels.""",
+    },
+}
+
+OUTPUT_FORMAT = """Generate a simulated conversation (5-8 exchanges) and then analyze the compatibility.
+
+Respond in this exact JSON format:
+{
+  "transcript": [
+    {"role": "AGENT_A", "content": "..."},
+    {"role": "AGENT_B", "content": "..."}
+  ],
+  "compatibilityScore": 0-100,
+  "confidenceLevel": "HIGH" | "MEDIUM" | "LOW",
+  "whyMatched": ["reason1", "reason2"],
+  "potentialFriction": ["friction1"],
+  "unknowns": [{"question": "...", "reason": "..."}],
+  "safety": {"status": "OK", "notes": ""}
+}"""
+
+
+class Job:
+    """One simulation: two users' profiles (profile_snapshot() shape) and a scenario"""
+
+    __slots__ = ("user_a", "user_b", "scenario", "profile_a", "profile_b")
+
+    def __init__(self, user_a: str, user_b: str, scenario: str, profile_a: Dict[str, Any], profile_b: Dict[str, Any]):
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        self.user_a = user_a
+        self.user_b = user_b
+        self.scenario = scenario
+        self.profile_a = profile_a
+        self.profile_b = profile_b
+
+    @property
+    def key(self) -> str:
+        return f"{self.user_a}:{self.user_b}:{self.scenario}"
+
+
+def _profile_lines(profile: Dict[str, Any]) -> str:
+    tags = profile.get("personalityTags")
+    return "\n".join([
+        f"- Values: {', '.join(profile.get('values') or []) or 'Not specified'}",
+        f"- Dealbreakers: {', '.join(profile.get('dealbreakers') or []) or 'None specified'}",
+        f"- Personality: {json.dumps(tags, separators=(',', ':')) if tags else 'Not specified'}",
+    ])
+
+
+def build_prompt(job: Job) -> str:
+    return (
+        f"{SCENARIOS[job.scenario]['prompt']}\n\n"
+        f"AGENT A PROFILE:\n{_profile_lines(job.profile_a)}\n\n"
+        f"AGENT B PROFILE:\n{_profile_lines(job.profile_b)}\n\n"
+        f"{OUTPUT_FORMAT}"
+    )
+
+
+class SimulationError(Exception):
+    """The model's reply could not be used"""
+
+
+def parse_output(text: str) -> Dict[str, Any]:
+    """The reply's JSON, sanitised like the backend does; raises SimulationError"""
+    match = re.search(r"\{[\s\S]*\}", text)
+    if not match:
+        raise SimulationError("No JSON found in response")
+    try:
+        parsed = json.loads(match.group(0))
+        score = min(100, max(0, int(parsed["compatibilityScore"])))
+    except (ValueError, KeyError, TypeError) as e:
+        raise SimulationError(f"Malformed simulation output: {e}")
+    return {
+        "compatibilityScore": score,
+        "confidenceLevel": parsed.get("confidenceLevel") or "MEDIUM",
+        "whyMatched": parsed.get("whyMatched") or [],
+        "potentialFriction": parsed.get("potentialFriction") or [],
+        "unknowns": parsed.get("unknowns") or [],
+        "transcript": parsed.get("transcript") or [],
+        "safety": parsed.get("safety") or {"status": "OK"},
+    }
+
+
+class SimulationBackend:
+    """Turns a prompt into the model's reply text"""
+
+    async def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class GeminiBackend(SimulationBackend):
+    """Gemini text model via google-genai (installed with pipecat's google extra)"""
+
+    def __init__(self, api_key: str, model: str = "gemini-2.0-flash-exp"):
+        from google import genai
+
+        self.model = model
+        self._client = genai.Client(api_key=api_key)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self._client.aio.models.generate_content(model=self.model, contents=prompt)
+        return response.text or ""
+
+
+class StubBackend(SimulationBackend):
+    """
+    Offline stand-in for the model: the same prompt always gets the same reply.
+
+    Args:
+        latency: Seconds each call takes (simulated model time)
+        failure_rate: Share of calls that raise, to exercise retries (random per call)
+        seed: Seed for the failures
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise ConnectionError("Stub backend failure")
+        digest = hashlib.sha256(prompt.encode()).digest()
+        score = digest[0] * 100 // 255
+        return json.dumps({
+            "transcript": [
+                {"role": "AGENT_A", "content": "How about brunch?"},
+                {"role": "AGENT_B", "content": "Only if there's coffee."},
+            ],
+            "compatibilityScore": score,
+            "confidenceLevel": ("HIGH", "MEDIUM", "LOW")[digest[1] % 3],
+            "whyMatched": ["Stub reason"],
+            "potentialFriction": ["Stub friction"] if score < 50 else [],
+            "unknowns": [],
+            "safety": {"status": "OK", "notes": ""},
+        })
+
+
+class ResultStore:
+    """Where results go, in batches; also the checkpoint of completed jobs"""
+
+    async def completed(self) -> Set[str]:
+        raise NotImplementedError
+
+    async def write(self, results: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SQLiteResultStore(ResultStore):
+    """One row per job key in a local SQLite file; the latest attempt wins"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sandbox_results (
+            key TEXT PRIMARY KEY, user_a TEXT, user_b TEXT, scenario TEXT,
+            status TEXT, compatibility_score INTEGER, confidence_level TEXT,
+            output TEXT, attempts INTEGER, error TEXT, finished_at INTEGER
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self.SCHEMA)
+
+    async def completed(self) -> Set[str]:
+        return await asyncio.to_thread(self._completed)
+
+    def _completed(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT key FROM sandbox_results WHERE status = 'ok'")}
+
+    async def write(self, results):
+        await asyncio.to_thread(self._write, results)
+
+    def _write(self, results):
+        rows = [
+            (
+                r["key"], r["user_a"], r["user_b"], r["scenario"], r["status"],
+                r["output"]["compatibilityScore"] if r["output"] else None,
+                r["output"]["confidenceLevel"] if r["output"] else None,
+                json.dumps(r["output"]) if r["output"] else None,
+                r["attempts"], r["error"], r["finished_at"],
+            )
+            for r in results
+        ]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO sandbox_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    async def close(self):
+        await asyncio.to_thread(self._db.close)
+
+
+class RateLimiter:
+    """Token bucket: `rate` acquisitions per second, bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class SandboxRunner:
+    """
+    Runs simulation jobs concurrently and stores their results in bulk.
+
+    Args:
+        backend: LLM backend
+        store: Result store / checkpoint
+        concurrency: Simulations in flight at once
+        rate: Simulations started per second (None: no limit)
+        max_attempts: Tries per job before it is recorded as failed
+        backoff: Seconds before the first retry; doubles on each one (with jitter)
+        batch_size: Results buffered before a bulk write
+        flush_interval: Seconds between bulk writes when results trickle in
+    """
+
+    def __init__(
+        self,
+        backend: SimulationBackend,
+        store: ResultStore,
+        concurrency: int = 16,
+        rate: Optional[float] = None,
+        max_attempts: int = 3,
+        backoff: float = 1.0,
+        batch_size: int = 200,
+        flush_interval: float = 5.0,
+    ):
+        self.backend = backend
+        self.store = store
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate) if rate else None
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._results: List[Dict[str, Any]] = []
+        self._flushed_at = time.monotonic()
+        self._flush_lock = asyncio.Lock()
+
+        self.skipped = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+
+    async def run(self, jobs: Iterable[Job]) -> Dict[str, Any]:
+        """Run every job not already completed in the store; returns stats()"""
+        started = time.monotonic()
+        done = await self.store.completed()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: Set[asyncio.Task] = set()
+        try:
+            for job in jobs:
+                if job.key in done:
+                    self.skipped += 1
+                    continue
+                # Bounds the tasks in existence too, so a huge job iterator is consumed lazily
+                await semaphore.acquire()
+                task = asyncio.create_task(self._run_job(job))
+                task.add_done_callback(lambda _: semaphore.release())
+                task.add_done_callback(tasks.discard)
+                tasks.add(task)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            # Interrupted or not, keep what finished so a rerun resumes from here
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.flush()
+        stats = self.stats()
+        stats["seconds"] = round(time.monotonic() - started, 2)
+        logger.info("Sandbox batch finished", extra={"data": stats})
+        return stats
+
+    async def _run_job(self, job: Job):
+        prompt = build_prompt(job)
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            if self.limiter:
+                await self.limiter.acquire()
+            try:
+                output = parse_output(await self.backend.generate(prompt))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt < self.max_attempts:
+                    self.retries += 1
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+                continue
+            self.succeeded += 1
+            await self._record(job, "ok", output, attempt, None)
+            return
+        self.failed += 1
+        logger.warning("Simulation %s failed after %d attempts: %s", job.key, self.max_attempts, error)
+        await self._record(job, "failed", None, self.max_attempts, error)
+
+    async def _record(self, job: Job, status: str, output, attempts: int, error: Optional[str]):
+        self._results.append({
+            "key": job.key,
+            "user_a": job.user_a,
+            "user_b": job.user_b,
+            "scenario": job.scenario,
+            "status": status,
+            "output": output,
+            "attempts": attempts,
+            "error": error,
+            "finished_at": int(time.time() * 1000),
+        })
+        if len(self._results) >= self.batch_size or time.monotonic() - self._flushed_at >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        """Write buffered results in one batch"""
+        async with self._flush_lock:
+            results, self._results = self._results, []
+            self._flushed_at = time.monotonic()
+            if not results:
+                return
+            try:
+                await self.store.write(results)
+            except BaseException:
+                # Keep them for the next flush rather than losing finished work
+                self._results[:0] = results
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "retries": self.retries,
+        }
+
+
+def shortlist_jobs(
+    profiles: List[Dict[str, Any]],
+    k: int = 10,
+    scenarios: Iterable[str] = tuple(SCENARIOS),
+) -> Iterator[Job]:
+    """Jobs for every user against their top-k pre-scored candidates, in every scenario"""
+    from matching import CandidatePool
+
+    ids = [str(profile["id"]) for profile in profiles]
+    pool = CandidatePool(ids, profiles)
+    by_id = dict(zip(ids, profiles))
+    scenarios = list(scenarios)
+    for user_id, profile in by_id.items():
+        for candidate_id, _ in pool.top_k(profile, k, exclude_ids=[user_id]):
+            for scenario in scenarios:
+                yield Job(user_id, candidate_id, scenario, profile, by_id[candidate_id])
+
+
+async def _main(args):
+    with open(args.profiles) as f:
+        profiles = json.load(f)
+    if args.backend == "gemini":
+        backend = GeminiBackend(os.environ["GOOGLE_AI_API_KEY"], model=args.model)
+    else:
+        backend = StubBackend(latency=args.stub_latency)
+    store = SQLiteResultStore(args.db)
+    runner = SandboxRunner(
+        backend,
+        store,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        max_attempts=args.max_attempts,
+    )
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    try:
+        stats = await runner.run(shortlist_jobs(profiles, k=args.shortlist, scenarios=scenarios))
+        print(json.dumps(stats))
+    finally:
+        await backend.close()
+        await store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", required=True, help="JSON list of profiles, each with an id")
+    parser.add_argument("--db", default="sandbox.db", help="SQLite results / checkpoint file")
+    parser.add_argument("--shortlist", type=int, default=10, help="Candidates per user")
+    parser.add_argument("--scenarios", default="", help="Comma-separated scenarios (default: all)")
+    parser.add_argument("--backend", choices=["stub", "gemini"], default="stub")
+    parser.add_argument("--model", default=os.getenv("SANDBOX_MODEL", "gemini-2.0-flash-exp"))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=None, help="Simulations started per second")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--stub-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    configure_logging()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        shutdown_logging()
@@ -0,0 +1,324 @@
+"""
+Session Scheduler
+
+Admission control for bot sessions on this host, so a burst of /connect
+calls queues or is turned away instead of oversubscribing CPU and memory
+and degrading audio for every live session.
+
+- Registry of live bot sessions by room (process or bot host task, user),
+  reaped as they exit
+- Per-host session cap, counting admitted-but-not-yet-started sessions
+- CPU and memory headroom checks from /proc (skipped where unavailable)
+- A short FIFO wait queue; callers give up at a deadline
+- HostSaturatedError carries a Retry-After hint for the 503
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from metrics import LatencyHistogram, SESSION_BUCKETS_MS
+from agent_logging import get_logger
+
+logger = get_logger("scheduler")
+
+
+class HostSaturatedError(RuntimeError):
+    """Raised by acquire() when no session slot frees up before the deadline"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class HostMonitor:
+    """Host CPU utilisation and available memory, sampled from /proc"""
+
+    def __init__(self):
+        self.cpu_percent: Optional[float] = None
+        self.memory_available_mb: Optional[float] = None
+        self._last_cpu = _read_cpu_times()
+
+    def sample(self):
+        cpu = _read_cpu_times()
+        if cpu and self._last_cpu:
+            busy = cpu[0] - self._last_cpu[0]
+            total = cpu[1] - self._last_cpu[1]
+            if total > 0:
+                self.cpu_percent = round(busy / total * 100, 1)
+        self._last_cpu = cpu
+        self.memory_available_mb = _read_memory_available_mb()
+
+
+def _read_cpu_times():
+    """(busy, total) jiffies across all CPUs, or None off Linux"""
+    try:
+        with open("/proc/stat") as f:
+            fields = [int(v) for v in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+    total = sum(fields[:8])  # guest time is already counted in user/nice
+    return total - idle, total
+
+
+def _read_memory_available_mb() -> Optional[float]:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class _Session:
+    __slots__ = ("pid", "user_id", "room_name", "process", "started_at")
+
+    def __init__(self, pid: int, user_id: str, room_name: str, process, started_at: float):
+        self.pid = pid
+        self.user_id = user_id
+        self.room_name = room_name
+        self.process = process
+        self.started_at = started_at
+
+
+def _is_alive(process) -> bool:
+    # subprocess.Popen (cold spawn), multiprocessing.Process (worker pool) or
+    # a bot host's HostedSession; the process calls also reap the child once
+    # it has exited
+    if hasattr(process, "poll"):
+        return process.poll() is None
+    return process.is_alive()
+
+
+def _exit_code(process) -> Optional[int]:
+    # Popen.returncode / Process.exitcode / HostedSession.exitcode
+    # (negative for a process killed by a signal)
+    if hasattr(process, "returncode"):
+        return process.returncode
+    return process.exitcode
+
+
+# Called with (room_name, user_id, exit_code) as each session is reaped
+SessionExitCallback = Callable[[str, str, Optional[int]], None]
+
+
+class SessionScheduler:
+    """
+    Admits bot sessions against a per-host cap and resource headroom.
+
+    Usage from /connect:
+
+        await scheduler.acquire()        # may wait, or raise HostSaturatedError
+        try:
+            ...claim room, issue token, start bot...
+        except Exception:
+            scheduler.cancel()
+            raise
+        scheduler.register(process, user_id, room_name)
+
+    Args:
+        max_sessions: Live + admitted sessions allowed on this host
+        max_cpu_percent: Refuse new sessions while host CPU is above this
+        min_free_memory_mb: Refuse new sessions while available memory is below this
+        queue_size: Callers allowed to wait for a slot at once
+        queue_timeout: Seconds a caller waits before giving up
+        retry_after: Retry-After seconds suggested to rejected callers
+        reap_interval: Seconds between liveness/host checks
+    """
+
+    def __init__(
+        self,
+        max_sessions: int,
+        max_cpu_percent: float = 85.0,
+        min_free_memory_mb: float = 512.0,
+        queue_size: int = 16,
+        queue_timeout: float = 5.0,
+        retry_after: int = 10,
+        reap_interval: float = 1.0,
+    ):
+        self.max_sessions = max_sessions
+        self.max_cpu_percent = max_cpu_percent
+        self.min_free_memory_mb = min_free_memory_mb
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.reap_interval = reap_interval
+        self.host = HostMonitor()
+
+        self._sessions: Dict[str, _Session] = {}
+        self._reserved = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self.on_session_exit: Optional[SessionExitCallback] = None
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0}
+        self.queue_wait = LatencyHistogram()
+        self.session_duration = LatencyHistogram(SESSION_BUCKETS_MS)
+
+    async def start(self):
+        """Start the background reaper"""
+        self.host.sample()
+        self._task = asyncio.create_task(self._reap_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(HostSaturatedError("Server shutting down", self.retry_after))
+
+    @property
+    def live(self) -> int:
+        return len(self._sessions)
+
+    def saturation(self) -> Optional[str]:
+        """Why a new session can't start right now, or None if it can"""
+        if self.live + self._reserved >= self.max_sessions:
+            return "session cap reached"
+        if self.host.cpu_percent is not None and self.host.cpu_percent > self.max_cpu_percent:
+            return f"CPU at {self.host.cpu_percent:.0f}%"
+        if (
+            self.host.memory_available_mb is not None
+            and self.host.memory_available_mb < self.min_free_memory_mb
+        ):
+            return f"{self.host.memory_available_mb:.0f}MB memory available"
+        return None
+
+    async def acquire(self):
+        """Reserve a session slot, waiting up to `queue_timeout` for one"""
+        self._wake()  # earlier waiters go first
+        reason = self.saturation()
+        if reason is None and not self._waiters:
+            self._reserve()
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self.rejected["queue_full"] += 1
+            raise HostSaturatedError(f"Host saturated ({reason or 'queue full'})", self.retry_after)
+
+        self.queued += 1
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.exception():
+                # Granted just as we timed out: hand the slot back
+                self.cancel()
+            self.rejected["timeout"] += 1
+            raise HostSaturatedError(
+                f"Host saturated ({self.saturation() or 'queue busy'})", self.retry_after
+            )
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.queue_wait.observe((time.monotonic() - started) * 1000)
+
+    def _reserve(self):
+        self._reserved += 1
+        self.admitted += 1
+
+    def cancel(self):
+        """Give back a slot from acquire() that did not turn into a session"""
+        self._reserved = max(0, self._reserved - 1)
+        self._wake()
+
+    def register(self, process, user_id: str, room_name: str):
+        """Turn a reserved slot into a live session for `process`"""
+        self._reserved = max(0, self._reserved - 1)
+        self._sessions[room_name] = _Session(process.pid, user_id, room_name, process, time.monotonic())
+
+    def has_session(self, room_name: str) -> bool:
+        return room_name in self._sessions
+
+    def end(self, room_name: str, force: bool = False) -> bool:
+        """
+        Stop the session in `room_name`; it is reaped once it has exited.
+
+        SIGTERM lets the bot clean up (final metrics, room deletion);
+        `force` kills it outright.
+        """
+        session = self._sessions.get(room_name)
+        if session is None:
+            return False
+        if force:
+            session.process.kill()
+        else:
+            session.process.terminate()
+        return True
+
+    def sessions(self) -> Dict[str, Dict[str, Any]]:
+        """Live sessions by room name"""
+        now = time.monotonic()
+        return {
+            room_name: {
+                "pid": session.pid,
+                "user_id": session.user_id,
+                "age_seconds": round(now - session.started_at, 1),
+            }
+            for room_name, session in self._sessions.items()
+        }
+
+    def _wake(self):
+        """Grant slots to waiters, in order, while there is room"""
+        while self._waiters and self.saturation() is None:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._reserve()
+            waiter.set_result(None)
+
+    def reap(self):
+        """Drop sessions whose bot process has exited"""
+        now = time.monotonic()
+        for room_name, session in list(self._sessions.items()):
+            if not _is_alive(session.process):
+                del self._sessions[room_name]
+                self.session_duration.observe((now - session.started_at) * 1000)
+                logger.info(
+                    "Bot session %s exited after %.0fs", session.pid, now - session.started_at,
+                    extra={"data": {"user_id": session.user_id, "room": session.room_name}},
+                )
+                if self.on_session_exit:
+                    try:
+                        self.on_session_exit(room_name, session.user_id, _exit_code(session.process))
+                    except Exception as e:
+                        logger.exception("Session exit callback failed: %s", e)
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            self.reap()
+            self.host.sample()
+            self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live": self.live,
+            "reserved": self._reserved,
+            "waiting": len(self._waiters),
+            "max_sessions": self.max_sessions,
+            "saturated": self.saturation(),
+            "cpu_percent": self.host.cpu_percent,
+            "memory_available_mb": (
+                round(self.host.memory_available_mb) if self.host.memory_available_mb is not None else None
+            ),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "queue_wait": self.queue_wait.to_dict(),
+            "session_duration": self.session_duration.to_dict(),
+        }
@@ -0,0 +1,119 @@
+"""
+User Session Index
+
+Makes /connect idempotent per user. A retried or double-tapped /connect
+gets the user's existing room instead of a second room and bot:
+
+- Concurrent calls for a user share one session setup (single flight);
+  the setup runs as its own task, so it completes, and is reused, even
+  if the caller that started it goes away
+- Later calls reuse the session while it is live and the entry is fresh:
+  each /connect refreshes it, and it expires `ttl` seconds after the
+  last one, so a stale entry never pins a user to an old room
+- A failed setup is not cached; every caller waiting on it gets the error
+
+The index is per server process; with several agent servers behind a
+load balancer, route a user's /connect calls to the same one.
+"""
+
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from agent_logging import get_logger
+
+logger = get_logger("session_index")
+
+
+class IndexedSession:
+    __slots__ = ("user_id", "room_name", "room_url", "created_at", "expires_at")
+
+    def __init__(self, user_id: str, room_name: str, room_url: str, expires_at: float):
+        self.user_id = user_id
+        self.room_name = room_name
+        self.room_url = room_url
+        self.created_at = time.monotonic()
+        self.expires_at = expires_at
+
+
+class UserSessionIndex:
+    """
+    user_id -> the session /connect set up for that user.
+
+    Args:
+        is_live: Whether the session in a room is still running
+        ttl: Seconds an entry stays reusable after the user's last /connect
+    """
+
+    def __init__(self, is_live: Callable[[str], bool], ttl: float = 60.0):
+        self.is_live = is_live
+        self.ttl = ttl
+        self._sessions: Dict[str, IndexedSession] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.created = 0
+        self.reused = 0
+        self.coalesced = 0
+
+    def lookup(self, user_id: str) -> Optional[IndexedSession]:
+        """The user's live, unexpired session, or None"""
+        session = self._sessions.get(user_id)
+        if session is None:
+            return None
+        if time.monotonic() >= session.expires_at or not self.is_live(session.room_name):
+            del self._sessions[user_id]
+            return None
+        return session
+
+    async def get_or_create(
+        self,
+        user_id: str,
+        create: Callable[[], Awaitable[Tuple[str, str]]],
+    ) -> Tuple[IndexedSession, bool]:
+        """
+        Return the user's session and whether it already existed.
+
+        `create` sets up a new session and returns (room_name, room_url);
+        it runs at most once at a time per user.
+        """
+        session = self.lookup(user_id)
+        if session is not None:
+            self.reused += 1
+            session.expires_at = time.monotonic() + self.ttl
+            return session, True
+
+        flight = self._inflight.get(user_id)
+        if flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(flight), True
+
+        flight = asyncio.ensure_future(self._create(user_id, create))
+        # Retrieve the outcome even if every caller has gone away
+        flight.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[user_id] = flight
+        return await asyncio.shield(flight), False
+
+    async def _create(self, user_id: str, create) -> IndexedSession:
+        try:
+            room_name, room_url = await create()
+            session = IndexedSession(user_id, room_name, room_url, time.monotonic() + self.ttl)
+            self._sessions[user_id] = session
+            self.created += 1
+            self._purge()
+            return session
+        finally:
+            del self._inflight[user_id]
+
+    def _purge(self):
+        now = time.monotonic()
+        for user_id in [u for u, s in self._sessions.items() if now >= s.expires_at]:
+            del self._sessions[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indexed": len(self._sessions),
+            "in_flight": len(self._inflight),
+            "created": self.created,
+            "reused": self.reused,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,154 @@
+"""
+Session Voice Metrics
+
+Per-bot voice latency instrumentation, pushed to the agent server which
+aggregates it across sessions and exposes it on /metrics.
+
+- participant join -> first greeting audio
+- user end of speech -> first bot audio
+- tool call turnaround (received -> result returned to the LLM)
+- session duration
+
+Gemini Live does not emit UserStoppedSpeakingFrame with server-side VAD,
+so end of speech falls back to the user's latest transcription since the
+last bot response (pushed upstream by the LLM, so it is registered with
+upstream=True). A local VAD's UserStoppedSpeakingFrame takes precedence
+when present.
+"""
+
+import time
+import asyncio
+from typing import Optional, Dict, List
+
+import httpx
+from pipecat.frames.frames import TranscriptionFrame, TTSStartedFrame, UserStoppedSpeakingFrame
+
+from observer import FrameObserver
+from agent_logging import get_logger
+
+logger = get_logger("session_metrics")
+
+
+class SessionMetrics:
+    """
+    Collects one session's voice latency and pushes it to the agent server.
+
+    Observations are buffered and sent every `push_interval` seconds (an
+    empty report still serves as a liveness heartbeat); whatever is left
+    is sent with the final report on stop().
+
+    Args:
+        session_id: Session key on the server (the room name)
+        user_id: User this session belongs to
+        push_url: Agent server metrics endpoint; None to only keep local totals
+        push_interval: Seconds between reports
+        client: HTTP client to report with (shared by sessions in a bot
+            host); one is created, and closed on stop(), if not given
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        user_id: str,
+        push_url: Optional[str] = None,
+        push_interval: float = 10.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.push_url = push_url
+        self.push_interval = push_interval
+        self.started_at = time.monotonic()
+
+        self._pending: Dict[str, List[float]] = {}
+        self._joined_at: Optional[float] = None
+        self._greeted = False
+        self._user_spoke_at: Optional[float] = None
+        self._vad_spoke_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._shared_client = client
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.totals: Dict[str, int] = {}
+        self.push_failures = 0
+
+    def register(self, observer: FrameObserver):
+        observer.on(TranscriptionFrame, self.on_transcription, upstream=True)
+        observer.on(UserStoppedSpeakingFrame, self.on_user_stopped_speaking)
+        observer.on(TTSStartedFrame, self.on_bot_audio_started)
+
+    def observe(self, name: str, value_ms: float):
+        self._pending.setdefault(name, []).append(round(value_ms, 1))
+        self.totals[name] = self.totals.get(name, 0) + 1
+
+    def participant_joined(self):
+        """Mark the moment the user joined (starts the greeting timer)"""
+        if self._joined_at is None:
+            self._joined_at = time.monotonic()
+
+    async def on_transcription(self, frame: TranscriptionFrame):
+        self._user_spoke_at = time.monotonic()
+
+    async def on_user_stopped_speaking(self, frame: UserStoppedSpeakingFrame):
+        self._vad_spoke_at = time.monotonic()
+
+    async def on_bot_audio_started(self, frame: TTSStartedFrame):
+        now = time.monotonic()
+        if not self._greeted:
+            if self._joined_at is not None:
+                self._greeted = True
+                self.observe("greeting_latency", (now - self._joined_at) * 1000)
+            return
+
+        spoke_at = self._vad_spoke_at or self._user_spoke_at
+        if spoke_at is not None:
+            self.observe("response_latency", (now - spoke_at) * 1000)
+        self._user_spoke_at = None
+        self._vad_spoke_at = None
+
+    def start(self):
+        """Start periodic reporting"""
+        if self.push_url and self._task is None:
+            self._client = self._shared_client or httpx.AsyncClient(timeout=5.0)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, end_reason: Optional[str] = None):
+        """Record the session duration and send the final report (with why the session ended)"""
+        self.observe("session_duration", (time.monotonic() - self.started_at) * 1000)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._push(ended=True, end_reason=end_reason)
+            if self._client is not self._shared_client:
+                await self._client.aclose()
+            self._client = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.push_interval)
+            await self._push()
+
+    async def _push(self, ended: bool = False, end_reason: Optional[str] = None):
+        observations, self._pending = self._pending, {}
+        report = {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "observations": observations,
+            "ended": ended,
+        }
+        if end_reason:
+            report["end_reason"] = end_reason
+        try:
+            response = await self._client.post(self.push_url, json=report)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            # Keep the observations for the next report
+            self.push_failures += 1
+            for name, values in observations.items():
+                self._pending.setdefault(name, [])[:0] = values
+            logger.warning("Failed to push session metrics: %s", e)
@@ -0,0 +1,255 @@
+"""
+Bot Worker Pool
+
+Keeps a warm pool of idle bot processes that have already imported
+bot.py's dependencies (pipecat, Daily, Gemini Live), so /connect only
+has to hand a room to a worker instead of paying the cold start.
+
+Workers are forked from a multiprocessing forkserver that preloads the
+bot module once. Each idle worker blocks on a pipe until it is assigned
+a (room_url, user_id) pair, then sets up its per-user log files and
+runs bot.main().
+"""
+
+import os
+import time
+import asyncio
+import subprocess
+import multiprocessing
+from collections import deque
+from typing import Optional, Deque, Dict, Any, Union
+
+from agent_logging import configure_logging, get_logger
+
+logger = get_logger("pool")
+
+
+class WorkerSpawnError(RuntimeError):
+    """Raised when a bot worker dies or misbehaves before reporting ready"""
+
+
+def _worker_entry(conn, script_dir: str, log_dir: str):
+    """Child process entry point: report ready, wait for a room, run the bot"""
+    import bot  # already imported by the forkserver preload, so this is cheap
+
+    conn.send("ready")
+    try:
+        assignment = conn.recv()
+    except EOFError:
+        return
+
+    if assignment is None:
+        # Pool is shutting down
+        conn.close()
+        return
+
+    room_url, user_id = assignment
+    conn.close()
+    os.chdir(script_dir)
+
+    # Lets the reaper find this session if the server loses track of it
+    from reaper import mark_session_process
+
+    mark_session_process()
+
+    # Match the cold-spawn behaviour: raw output to bot_{user_id}.out,
+    # structured logs to the rotating bot_{user_id}.log owned by this process
+    out_fd = os.open(
+        os.path.join(log_dir, f"bot_{user_id}.out"), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644
+    )
+    os.dup2(out_fd, 1)
+    os.dup2(out_fd, 2)
+    os.close(out_fd)
+    configure_logging(log_file=os.path.join(log_dir, f"bot_{user_id}.log"))
+
+    asyncio.run(bot.main(room_url, user_id))
+
+
+def cold_spawn(room_url: str, user_id: str, script_dir: str, log_dir: str) -> subprocess.Popen:
+    """Start a fresh `python bot.py` process for the room (no warm worker)"""
+    bot_script = os.path.join(script_dir, "bot.py")
+
+    # Spawn the bot as a subprocess
+    # Using subprocess.Popen to not block the API response.
+    # The bot writes its own rotating bot_{user_id}.log; raw stdout/stderr
+    # (pipecat output, crashes) go to bot_{user_id}.out. The child keeps its
+    # own copy of the descriptor, so ours is closed as soon as it has started.
+    with open(os.path.join(log_dir, f"bot_{user_id}.out"), "w") as out:
+        return subprocess.Popen(
+            ["python", bot_script, room_url, user_id],
+            cwd=script_dir,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+        )
+
+
+class _Worker:
+    """An idle worker process and the parent end of its control pipe"""
+
+    __slots__ = ("process", "conn", "spawned_at")
+
+    def __init__(self, process, conn, spawned_at: float):
+        self.process = process
+        self.conn = conn
+        self.spawned_at = spawned_at
+
+
+class BotWorkerPool:
+    """
+    Warm pool of pre-imported bot worker processes.
+
+    - `size` idle workers are kept ready at all times
+    - Used workers are replaced in the background
+    - If the pool is empty, assign() spawns a worker on demand and waits for it
+    - Spawn-to-ready latency is tracked for the last `latency_window` spawns
+    """
+
+    def __init__(self, size: int, script_dir: str, log_dir: Optional[str] = None, latency_window: int = 100):
+        self.size = size
+        self.script_dir = script_dir
+        self.log_dir = log_dir or script_dir
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._ctx.set_forkserver_preload(["bot"])
+        self._idle: Deque[_Worker] = deque()
+        self._pending = 0
+        self._refill_event = asyncio.Event()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._spawn_latencies: Deque[float] = deque(maxlen=latency_window)
+        self._assigned = 0
+        self._cold_assigns = 0
+
+    async def start(self):
+        """Fill the pool and start the background refill loop"""
+        self._refill_task = asyncio.create_task(self._refill_loop())
+        self._refill_event.set()
+
+    async def stop(self):
+        """Stop refilling and release all idle workers"""
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+        workers = list(self._idle)
+        self._idle.clear()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            worker.conn.close()
+        # Wait for them off the event loop, all at once
+        await asyncio.gather(*(asyncio.to_thread(worker.process.join, 1) for worker in workers))
+
+    async def assign(
+        self, room_url: str, user_id: str
+    ) -> Union[multiprocessing.process.BaseProcess, subprocess.Popen]:
+        """
+        Hand a room to an idle worker and return its process.
+
+        Falls back to spawning a fresh worker if none are warm, and to a
+        plain `python bot.py` process if that worker dies before it is ready.
+        """
+        worker = self._take_idle()
+        if worker is None:
+            self._cold_assigns += 1
+            try:
+                worker = await self._spawn_ready_worker()
+            except WorkerSpawnError as e:
+                logger.warning("Bot worker failed to start, spawning bot.py instead: %s", e)
+                self._assigned += 1
+                self._refill_event.set()
+                return cold_spawn(room_url, user_id, self.script_dir, self.log_dir)
+
+        worker.conn.send((room_url, user_id))
+        worker.conn.close()
+        self._assigned += 1
+        self._refill_event.set()
+        return worker.process
+
+    def _take_idle(self) -> Optional[_Worker]:
+        """Pop the first idle worker that is still alive"""
+        while self._idle:
+            worker = self._idle.popleft()
+            if worker.process.is_alive():
+                return worker
+            worker.conn.close()
+        return None
+
+    async def _spawn_ready_worker(self) -> _Worker:
+        """Start a worker process and wait until it reports ready"""
+        parent_conn, child_conn = self._ctx.Pipe()
+        spawned_at = time.monotonic()
+        process = self._ctx.Process(
+            target=_worker_entry,
+            args=(child_conn, self.script_dir, self.log_dir),
+            name="brea-bot-worker",
+        )
+        process.start()
+        child_conn.close()
+
+        loop = asyncio.get_running_loop()
+        try:
+            message = await loop.run_in_executor(None, parent_conn.recv)
+        except (EOFError, OSError) as e:
+            # The worker exited (or its pipe broke) before reporting ready
+            parent_conn.close()
+            await loop.run_in_executor(None, process.join, 1)
+            raise WorkerSpawnError(f"Bot worker exited before ready (exit code {process.exitcode})") from e
+        if message != "ready":
+            parent_conn.close()
+            process.terminate()
+            await loop.run_in_executor(None, process.join, 1)
+            raise WorkerSpawnError(f"Bot worker sent unexpected message: {message!r}")
+
+        self._spawn_latencies.append(time.monotonic() - spawned_at)
+        return _Worker(process, parent_conn, spawned_at)
+
+    async def _refill_loop(self):
+        """Top the pool back up to `size` whenever a worker is taken"""
+        while True:
+            await self._refill_event.wait()
+            self._refill_event.clear()
+
+            # Reap finished bot processes so they don't linger as zombies
+            multiprocessing.active_children()
+
+            missing = self.size - len(self._idle) - self._pending
+            if missing > 0:
+                await asyncio.gather(*(self._refill_one() for _ in range(missing)))
+
+    async def _refill_one(self):
+        self._pending += 1
+        try:
+            self._idle.append(await self._spawn_ready_worker())
+        except Exception as e:
+            logger.warning("Failed to spawn bot worker: %s", e)
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool occupancy and spawn-to-ready latency summary"""
+        latencies = sorted(self._spawn_latencies)
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "spawning": self._pending,
+            "assigned": self._assigned,
+            "cold_assigns": self._cold_assigns,
+            "spawn_to_ready_ms": {
+                "last": round(self._spawn_latencies[-1] * 1000, 1) if latencies else None,
+                "p50": _percentile_ms(latencies, 0.50),
+                "p95": _percentile_ms(latencies, 0.95),
+                "max": round(latencies[-1] * 1000, 1) if latencies else None,
+            },
+        }
+
+
+def _percentile_ms(sorted_values, q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return round(sorted_values[index] * 1000, 1)